@@ -0,0 +1,243 @@
+import os # path of the saved cache
+import re # query normalization
+import time # entry age and lookup timing
+import zlib # stable hashing of features (hash() changes between runs)
+import atexit # save the cache when the program exits
+import pickle # fast load of the saved cache
+import threading # the cache is shared by concurrent tasks
+import numpy as np # the query vectors live in one matrix
+from ContextBuilder import StopWords # words that carry no meaning for matching
+
+# Where the cache is saved between runs.
+AnswerCachePath = os.path.join("Data", "AnswerCache.pickle")
+
+# Cosine similarity a cached query needs before its answer is reused.
+AnswerCacheThreshold = 0.9
+
+# Size of the hashed feature space, number of answers kept and how long they stay valid.
+AnswerCacheDimensions = 2048
+AnswerCacheEntries = 1000
+AnswerCacheTTL = 7 * 24 * 3600
+
+# Shorter queries ("why?", "ok", "go on") are too vague to mean the same thing in another conversation.
+MinCacheableChars = 8
+
+# Queries whose answer depends on the time, fresh facts or the conversation so far (including
+# follow-ups such as "why", "continue" or "and in java?"), and creative requests where a repeated
+# answer would be wrong, are never cached.
+VolatileQuery = re.compile(
+    r"\b(?:time|date|today|tonight|tomorrow|yesterday|now|news|latest|current|weather|price|score|"
+    r"it|that|this|those|these|them|he|she|they|more|again|previous|earlier|above|you said|i said|my|"
+    r"why|yes|no|continue|go on|elaborate|example|examples|summarize|summarise|summary|instead|same|"
+    r"write|joke|poem|story|random|another)\b|^(?:and|but|also|so|what about|how about)\b"
+)
+
+Contractions = [
+    (re.compile(r"'s\b"), " is"),
+    (re.compile(r"'re\b"), " are"),
+    (re.compile(r"n't\b"), " not"),
+    (re.compile(r"\b(what|who|where|how)s\b"), r"\1 is"),  # "whats python" typed without the apostrophe
+]
+WordPattern = re.compile(r"[a-z0-9]+")
+
+def NormalizeQuery(query):
+    """Lowercase, expand common contractions and keep only words."""
+    text = query.lower().replace("’", "'")
+    for pattern, replacement in Contractions:
+        text = pattern.sub(replacement, text)
+    return " ".join(WordPattern.findall(text))
+
+def _content_words(normalized):
+    words = normalized.split()
+    return [word for word in words if word not in StopWords] or words
+
+def _features(normalized):
+    """Weighted features of a query: its content words, their character trigrams and word bigrams."""
+    content = _content_words(normalized)
+    features = []
+    for word in content:
+        features.append((f"w:{word}", 1.0))
+        padded = f"<{word}>"
+        # Trigrams make "colour"/"color" and small typos land close together.
+        features.extend((f"c:{padded[i:i + 3]}", 0.3) for i in range(len(padded) - 2))
+    # Bigrams keep the order: "convert miles to km" is not "convert km to miles".
+    features.extend((f"b:{first} {second}", 1.0) for first, second in zip(content, content[1:]))
+    return features
+
+def SameOrder(query, other):
+    """False when two queries use the same content words in a different order (the reverse question)."""
+    words, other_words = _content_words(NormalizeQuery(query)), _content_words(NormalizeQuery(other))
+    return words == other_words or sorted(words) != sorted(other_words)
+
+def QueryVector(query, dimensions=AnswerCacheDimensions):
+    """L2-normalized hashed feature vector of a query."""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for feature, weight in _features(NormalizeQuery(query)):
+        vector[zlib.crc32(feature.encode("utf-8")) % dimensions] += weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def IsCacheable(query):
+    """Whether an answer to query may be stored and reused."""
+    normalized = NormalizeQuery(query)
+    # A query made only of stopwords ("what is it", "why") has nothing to match on but its context.
+    if len(normalized) < MinCacheableChars or not any(word not in StopWords for word in normalized.split()):
+        return False
+    return not VolatileQuery.search(normalized)
+
+class SemanticAnswerCache:
+    """Reuses answers to earlier questions that mean the same thing ("what is python" / "what's python?").
+
+    Every cached query is a row of one float32 matrix, so a lookup is one matrix-vector product.
+    Rows are recycled least recently used first, and the whole cache is pickled to disk.
+    """
+
+    def __init__(self, path=AnswerCachePath, threshold=AnswerCacheThreshold, max_entries=AnswerCacheEntries,
+                 dimensions=AnswerCacheDimensions, ttl=AnswerCacheTTL):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dimensions = dimensions
+        self.ttl = ttl
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "skipped": 0, "stores": 0, "evictions": 0,
+                      "latency_saved": 0.0, "lookup_time": 0.0}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._clear_rows()
+        self._load()
+        atexit.register(self.save)
+
+    def _clear_rows(self):
+        self.matrix = np.zeros((self.max_entries, self.dimensions), dtype=np.float32)
+        self.queries = [None] * self.max_entries
+        self.answers = [None] * self.max_entries
+        self.latencies = np.zeros(self.max_entries)   # seconds the original answer took
+        self.created = np.zeros(self.max_entries)
+        self.last_used = np.zeros(self.max_entries)  # 0 marks a free row
+        self.rows = {}  # normalized query -> row
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                saved = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            print(f"Starting with an empty answer cache ({e})")
+            return
+        # Vectors are rebuilt, so a change of dimensions or features never leaves stale rows behind.
+        now = time.time()
+        entries = [entry for entry in saved if now - entry["created"] < self.ttl]
+        entries.sort(key=lambda entry: entry["last_used"])
+        for entry in entries[-self.max_entries:]:
+            self._put(entry["query"], entry["answer"], entry["latency"], entry["created"], entry["last_used"])
+
+    def save(self):
+        """Write the cache to disk if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = [
+                {"query": self.queries[row], "answer": self.answers[row], "latency": float(self.latencies[row]),
+                 "created": float(self.created[row]), "last_used": float(self.last_used[row])}
+                for row in self.rows.values()
+            ]
+            self._dirty = False
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
+
+    def _put(self, query, answer, latency, created, last_used):
+        """Store an entry in its existing row, a free row or the least recently used one (caller holds the lock)."""
+        key = NormalizeQuery(query)
+        row = self.rows.get(key)
+        if row is None:
+            row = int(np.argmin(self.last_used))
+            if self.last_used[row]:
+                del self.rows[NormalizeQuery(self.queries[row])]
+                self.stats["evictions"] += 1
+            self.rows[key] = row
+        self.matrix[row] = QueryVector(query, self.dimensions)
+        self.queries[row] = query
+        self.answers[row] = answer
+        self.latencies[row] = latency
+        self.created[row] = created
+        self.last_used[row] = last_used
+
+    def _best(self, scores, now):
+        """Index of the best live row for one row of scores, or None."""
+        scores = np.where((self.last_used > 0) & (now - self.created < self.ttl), scores, -1.0)
+        row = int(np.argmax(scores))
+        return row if scores[row] >= self.threshold else None
+
+    def lookup_many(self, queries):
+        """Return the cached answer (or None) for each query, scoring all of them in one matrix product."""
+        started = time.perf_counter()
+        results = [None] * len(queries)
+        cacheable = [i for i, query in enumerate(queries) if IsCacheable(query)]
+        with self._lock:
+            self.stats["lookups"] += len(queries)
+            self.stats["skipped"] += len(queries) - len(cacheable)
+            if cacheable and self.rows:
+                vectors = np.stack([QueryVector(queries[i], self.dimensions) for i in cacheable])
+                scores = vectors @ self.matrix.T
+                now = time.time()
+                for position, i in enumerate(cacheable):
+                    row = self._best(scores[position], now)
+                    if row is not None and SameOrder(queries[i], self.queries[row]):
+                        results[i] = self.answers[row]
+                        self.last_used[row] = now
+                        self.stats["latency_saved"] += float(self.latencies[row])
+                        self._dirty = True
+            hits = sum(result is not None for result in results)
+            self.stats["hits"] += hits
+            self.stats["misses"] += len(cacheable) - hits
+            elapsed = time.perf_counter() - started
+            self.stats["lookup_time"] += elapsed
+            # What the lookups themselves cost is taken off the time they saved.
+            if hits:
+                self.stats["latency_saved"] -= elapsed
+        return results
+
+    def lookup(self, query):
+        """Return the cached answer to a query that means the same thing, or None."""
+        return self.lookup_many([query])[0]
+
+    def store(self, query, answer, latency=0.0):
+        """Remember the answer to query; latency is how long producing it took."""
+        if not answer or not IsCacheable(query):
+            return
+        now = time.time()
+        with self._lock:
+            self._put(query, answer, latency, now, now)
+            self.stats["stores"] += 1
+            self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._clear_rows()
+            self._dirty = True
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get_stats(self):
+        """Lookup, hit and eviction counts, the hit rate and the seconds of generation saved."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self.rows)
+        answered = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / answered if answered else 0.0
+        stats["avg_lookup_ms"] = stats["lookup_time"] / stats["lookups"] * 1000 if stats["lookups"] else 0.0
+        return stats
+
+# The cache in front of the chatbot.
+AnswerCache = SemanticAnswerCache()
+
+def GetAnswerCacheStats():
+    """Return the answer cache's statistics."""
+    return AnswerCache.get_stats()
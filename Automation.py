@@ -0,0 +1,419 @@
+import os # index sources, process list and launching
+import re # name normalization
+import sys # platform checks
+import json # the index is saved as JSON
+import time # resolution timing and refresh throttling
+import shlex # splitting Exec= command lines
+import signal # closing applications on Linux
+import asyncio # running several commands at once
+import threading # background index refresh
+import subprocess # launching applications
+import webbrowser # fallback for names that are not installed apps
+import urllib.parse # quoting the fallback search
+from SpellCorrector import SymSpellIndex # fast fuzzy matching of app names
+
+# Where the index of launchable applications is saved between runs.
+AppIndexPath = os.path.join("Data", "AppIndex.json")
+AppIndexVersion = 2
+
+# A failed lookup rescans the sources (for newly installed apps) at most this often.
+RefreshInterval = 30.0
+
+# A misspelt name only matches an app whose name is at least this similar (1 - edits / length).
+FuzzyMinSimilarity = 0.8
+
+# Extra names people use for applications (alias -> name or executable in the index).
+AppAliases = {
+    "browser": "firefox",
+    "vs code": "code",
+    "vscode": "code",
+    "visual studio code": "code",
+    "terminal": "gnome-terminal",
+    "file manager": "nautilus",
+    "files": "nautilus",
+    "calculator": "gnome-calculator",
+    "notepad": "gedit" if sys.platform.startswith("linux") else "notepad",
+    "text editor": "gedit",
+    "word": "winword",
+    "excel": "excel",
+    "powerpoint": "powerpnt",
+}
+
+# Exec= field codes from the desktop entry specification; they are filled in by file managers, not us.
+FieldCode = re.compile(r"^%[fFuUdDnNickvm]$")
+
+def IndexSources():
+    """(folder, kind, recursive) for every place launchable applications are found on this system."""
+    sources = []
+    if os.name == "nt":
+        for base in (os.environ.get("ProgramData"), os.environ.get("APPDATA")):
+            if base:
+                sources.append((os.path.join(base, "Microsoft", "Windows", "Start Menu", "Programs"), "shortcut", True))
+    else:
+        data_home = os.environ.get("XDG_DATA_HOME", os.path.join(os.path.expanduser("~"), ".local", "share"))
+        data_dirs = os.environ.get("XDG_DATA_DIRS", "/usr/local/share:/usr/share").split(":")
+        for base in [data_home] + data_dirs + ["/var/lib/flatpak/exports/share", os.path.expanduser("~/.local/share/flatpak/exports/share")]:
+            sources.append((os.path.join(base, "applications"), "desktop", True))
+        sources.append(("/var/lib/snapd/desktop/applications", "desktop", False))
+    for folder in os.environ.get("PATH", "").split(os.pathsep):
+        if folder:
+            sources.append((folder, "path", False))
+    # The same folder can appear more than once (e.g. twice on PATH).
+    seen = set()
+    return [source for source in sources if not (source[0] in seen or seen.add(source[0]))]
+
+def NormalizeName(name):
+    """Lowercase words only, without '.exe' or a leading 'the'."""
+    name = name.lower().strip()
+    if name.endswith(".exe"):
+        name = name[:-4]
+    words = re.findall(r"[a-z0-9+]+", name)
+    if words and words[0] == "the":
+        words = words[1:]
+    return " ".join(words)
+
+def _process_name(argv):
+    """The executable name that shows up in the process list for a command line."""
+    tokens = list(argv)
+    # env VAR=value program ...
+    while tokens and (os.path.basename(tokens[0]) == "env" or "=" in tokens[0]):
+        tokens.pop(0)
+    if not tokens:
+        return ""
+    if os.path.basename(tokens[0]) == "flatpak" and len(tokens) > 2:
+        return tokens[-1].split(".")[-1].lower()
+    return os.path.basename(tokens[0])
+
+def ParseDesktopEntry(path):
+    """Return the application described by a .desktop file, or None for hidden or non-application entries."""
+    values = {}
+    section = None
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("["):
+                    section = line
+                elif section == "[Desktop Entry]" and "=" in line:
+                    key, _, value = line.partition("=")
+                    values.setdefault(key.strip(), value.strip())
+    except OSError:
+        return None
+
+    if values.get("Type", "Application") != "Application" or "Exec" not in values:
+        return None
+    if values.get("Hidden") == "true" or values.get("NoDisplay") == "true":
+        return None
+    try:
+        argv = [token.replace("%%", "%") for token in shlex.split(values["Exec"]) if not FieldCode.match(token)]
+    except ValueError:
+        return None
+    if not argv:
+        return None
+    desktop_id = os.path.splitext(os.path.basename(path))[0]
+    return {"name": values.get("Name", desktop_id), "exec": argv, "process": _process_name(argv), "id": desktop_id}
+
+def _entries_for(path, kind):
+    """Index entries for one file of a source folder."""
+    name = os.path.basename(path)
+    if kind == "desktop":
+        if not name.endswith(".desktop"):
+            return []
+        entry = ParseDesktopEntry(path)
+        return [entry] if entry else []
+    if kind == "shortcut":
+        stem, extension = os.path.splitext(name)
+        if extension.lower() not in (".lnk", ".url"):
+            return []
+        return [{"name": stem, "exec": [path], "process": "", "id": stem, "shortcut": True}]
+    # PATH executables
+    if name.startswith(".") or not os.access(path, os.X_OK):
+        return []
+    stem = os.path.splitext(name)[0] if os.name == "nt" else name
+    return [{"name": stem, "exec": [path], "process": name, "id": stem, "path_only": True}]
+
+def _aliases_for(entry):
+    """Names an application can be asked for by."""
+    names = {NormalizeName(entry["name"]), NormalizeName(entry["id"].replace("-", " ").replace("_", " "))}
+    # Reverse-DNS ids such as org.mozilla.firefox -> firefox
+    names.add(NormalizeName(entry["id"].split(".")[-1]))
+    if entry.get("process"):
+        names.add(NormalizeName(entry["process"]))
+    words = NormalizeName(entry["name"]).split()
+    # Only real applications get the short name; for PATH tools it would turn "systemd-notify" into "notify".
+    if len(words) > 1 and not entry.get("path_only"):
+        names.add(" ".join(words[1:]))  # "google chrome" -> "chrome"
+    names.discard("")
+    return names
+
+class AppIndex:
+    """A persistent index of launchable applications with exact and fuzzy name lookup.
+
+    Every source folder remembers its modification time and the modification time of each file,
+    so a refresh only re-reads folders that changed and only re-parses files that changed.
+    """
+
+    def __init__(self, path=AppIndexPath, sources=None):
+        self.path = path
+        self.sources = sources
+        self.folders = {}  # folder -> {"mtime", "kind", "files": {path: {"mtime", "entries"}}, "subfolders"}
+        self.aliases = {}  # normalized name -> entry
+        self.fuzzy = SymSpellIndex(max_distance=2)  # names of desktop entries and shortcuts only
+        self.last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Rebuilding the application index ({e})")
+            return
+        if saved.get("version") == AppIndexVersion:
+            self.folders = saved["folders"]
+            self._rebuild_aliases()
+            self._ready.set()
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._lock:
+            data = json.dumps({"version": AppIndexVersion, "folders": self.folders})
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(temp_path, self.path)
+
+    def _scan(self, folder, kind, recursive, folders, known):
+        """Update one folder (and, if recursive, its subfolders) into folders; returns True if anything changed."""
+        try:
+            mtime = os.stat(folder).st_mtime
+        except OSError:
+            return folder in known
+        old = known.get(folder)
+        if old and old["mtime"] == mtime and old["kind"] == kind:
+            # No file was added, removed or replaced here, so the entries stand; subfolders have their own mtime.
+            folders[folder] = old
+            changed = False
+            for subfolder in old.get("subfolders", []):
+                changed = self._scan(subfolder, kind, recursive, folders, known) or changed
+            return changed
+
+        files = {}
+        subfolders = []
+        old_files = old["files"] if old else {}
+        try:
+            with os.scandir(folder) as listing:
+                for item in listing:
+                    try:
+                        if item.is_dir():
+                            if recursive:
+                                subfolders.append(item.path)
+                            continue
+                        file_mtime = item.stat().st_mtime
+                    except OSError:
+                        continue
+                    previous = old_files.get(item.path)
+                    if previous and previous["mtime"] == file_mtime:
+                        files[item.path] = previous
+                    else:
+                        files[item.path] = {"mtime": file_mtime, "entries": _entries_for(item.path, kind)}
+        except OSError:
+            return folder in known
+        folders[folder] = {"mtime": mtime, "kind": kind, "files": files, "subfolders": subfolders}
+        for subfolder in subfolders:
+            self._scan(subfolder, kind, recursive, folders, known)
+        return True
+
+    def refresh(self):
+        """Bring the index up to date with its sources; returns True if anything changed."""
+        with self._lock:
+            known = dict(self.folders)
+        folders = {}
+        changed = False
+        for folder, kind, recursive in (self.sources or IndexSources()):
+            changed = self._scan(folder, kind, recursive, folders, known) or changed
+        # Folders that disappeared
+        changed = changed or set(folders) != set(known)
+        with self._lock:
+            self.last_refresh = time.monotonic()
+            if changed:
+                self.folders = folders
+                self._rebuild_aliases()
+        self._ready.set()
+        if changed:
+            self.save()
+        return changed
+
+    def _rebuild_aliases(self):
+        """Map every alias to its entry (caller holds the lock or owns the index)."""
+        aliases = {}
+        # PATH entries first so desktop entries and shortcuts win when both use a name.
+        order = {"path": 0, "desktop": 1, "shortcut": 1}
+        for folder_data in sorted(self.folders.values(), key=lambda data: order.get(data["kind"], 0)):
+            for file_data in folder_data["files"].values():
+                for entry in file_data["entries"]:
+                    for alias in _aliases_for(entry):
+                        aliases[alias] = entry
+        for alias, target in AppAliases.items():
+            if target in aliases:
+                aliases.setdefault(alias, aliases[target])
+        # Bare PATH executables must be asked for by their exact name: a typo of an app name
+        # ("spotify", "mail") must not land on an unrelated tool ("systemd-notify", "tail").
+        fuzzy = SymSpellIndex(max_distance=2)
+        for alias, entry in aliases.items():
+            if not entry.get("path_only"):
+                fuzzy.add_word(alias)
+        self.aliases = aliases
+        self.fuzzy = fuzzy
+
+    def resolve(self, name, fuzzy=True):
+        """Return the index entry for an app name, allowing small typos in application names unless fuzzy is False, or None."""
+        self._ready.wait()
+        key = NormalizeName(name)
+        with self._lock:
+            entry = self.aliases.get(key)
+            if entry is None and fuzzy and len(key) >= 4:
+                match = self.fuzzy.lookup(key, max_distance=1 if len(key) < 7 else 2)
+                if match and 1 - match[1] / max(len(key), len(match[0])) >= FuzzyMinSimilarity:
+                    entry = self.aliases[match[0]]
+        return entry
+
+    def __len__(self):
+        return len(self.aliases)
+
+# Lookup and command statistics.
+AutomationStats = {"resolved": 0, "unresolved": 0, "resolve_time": 0.0, "opened": 0, "closed": 0}
+_stats_lock = threading.Lock()
+
+# The index used by OpenApp and CloseApp; it is brought up to date in the background at startup.
+Apps = AppIndex()
+threading.Thread(target=Apps.refresh, name="AppIndexRefresh", daemon=True).start()
+
+def ResolveApp(name, fuzzy=True):
+    """Find an installed application by name; a miss triggers an occasional rescan for new installs."""
+    started = time.perf_counter()
+    entry = Apps.resolve(name, fuzzy)
+    if entry is None and time.monotonic() - Apps.last_refresh > RefreshInterval and Apps.refresh():
+        entry = Apps.resolve(name, fuzzy)
+    with _stats_lock:
+        AutomationStats["resolved" if entry else "unresolved"] += 1
+        AutomationStats["resolve_time"] += time.perf_counter() - started
+    return entry
+
+def OpenApp(app):
+    """Launch an application; names that are not installed apps are searched on the web instead."""
+    entry = ResolveApp(app)
+    if entry is None:
+        webbrowser.open(f"https://www.google.com/search?q={urllib.parse.quote(app)}")
+        return f"I couldn't find {app} on this computer, so I searched for it."
+    try:
+        if entry.get("shortcut"):
+            os.startfile(entry["exec"][0])
+        else:
+            subprocess.Popen(entry["exec"], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL, start_new_session=True)
+    except OSError as e:
+        return f"Sorry, I couldn't open {entry['name']}: {e}"
+    with _stats_lock:
+        AutomationStats["opened"] += 1
+    return f"Opening {entry['name']}."
+
+def _running(process_name):
+    """Process ids whose executable is process_name (from /proc on Linux, from ps elsewhere)."""
+    if not os.path.isdir("/proc"):
+        return _running_ps(process_name)
+    pids = []
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                argv0 = f.read().split(b"\0", 1)[0].decode("utf-8", "replace")
+            with open(f"/proc/{pid}/comm", "r") as f:
+                comm = f.read().strip()
+        except OSError:
+            continue
+        # comm is cut at 15 characters, so the command line decides for long names.
+        if os.path.basename(argv0) == process_name or comm == process_name[:15]:
+            pids.append(int(pid))
+    return pids
+
+def _running_ps(process_name):
+    """Process ids whose executable is process_name, for systems without /proc (macOS, BSD)."""
+    try:
+        listing = subprocess.run(["ps", "-axo", "pid=,comm="], capture_output=True, text=True, timeout=5).stdout
+    except (OSError, subprocess.SubprocessError):
+        return []
+    pids = []
+    for line in listing.splitlines():
+        pid, _, command = line.strip().partition(" ")
+        if pid.isdigit() and int(pid) != os.getpid() and os.path.basename(command.strip()) == process_name:
+            pids.append(int(pid))
+    return pids
+
+def CloseApp(app):
+    """Close every running instance of an installed application.
+
+    Only names that resolve exactly to an app in the index are closed, never a raw or corrected name
+    and never a command-line tool found on PATH: "quit python" or a typo must not end other programs.
+    """
+    entry = ResolveApp(app, fuzzy=False)
+    if entry is None or entry.get("path_only"):
+        return f"I don't know an app called {app}, so I didn't close anything."
+    process_name = entry.get("process") or NormalizeName(entry["name"]).replace(" ", "")
+    if os.name == "nt":
+        result = subprocess.run(["taskkill", "/im", f"{os.path.splitext(process_name)[0]}.exe", "/f"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        closed = result.returncode == 0
+    else:
+        pids = _running(process_name)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        closed = bool(pids)
+    if not closed:
+        return f"{entry['name']} is not running."
+    with _stats_lock:
+        AutomationStats["closed"] += 1
+    return f"Closing {entry['name']}."
+
+# Command prefix -> handler.
+AutomationCommands = {"open": OpenApp, "close": CloseApp}
+
+async def TranslateAndExecute(commands):
+    """Run commands such as 'open chrome' and 'close firefox' at the same time; returns their results in order."""
+    jobs = []
+    for command in commands:
+        action, _, argument = command.partition(" ")
+        handler = AutomationCommands.get(action)
+        if handler and argument.strip():
+            jobs.append(asyncio.to_thread(handler, argument.strip()))
+        else:
+            jobs.append(asyncio.sleep(0, result=f"Sorry, I can't do '{command}'."))
+    return await asyncio.gather(*jobs)
+
+def Automation(commands):
+    """Blocking wrapper around TranslateAndExecute."""
+    return asyncio.run(TranslateAndExecute(commands))
+
+def GetAutomationStats():
+    """Return lookup counts, average resolution time in microseconds and the index size."""
+    with _stats_lock:
+        stats = dict(AutomationStats)
+    lookups = stats["resolved"] + stats["unresolved"]
+    stats["avg_resolve_us"] = stats["resolve_time"] / lookups * 1e6 if lookups else 0.0
+    stats["indexed_names"] = len(Apps)
+    return stats
+
+# Main program entry point.
+if __name__ == "__main__":
+    while True:
+        print(Automation([command.strip() for command in input("Enter commands: ").split(",")]))
@@ -0,0 +1,223 @@
+import os # output and checkpoint paths
+import sys # exit codes
+import json # JSONL input and output
+import time # per-query timing
+import argparse # command-line options
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED # bounded worker pool
+from RateLimiter import AdaptiveRateLimiter, RateLimited # per-provider token buckets
+from Cache import PersistentLRUCache # batch-private copies of the decision and search caches
+
+# Requests per second each provider gets at the start of a run (adjusted on 429s).
+ProviderRates = {
+    "cohere": 1.0,   # FirstLayerDMM classification
+    "groq": 0.5,     # chat and realtime completions
+    "search": 2.0,   # search result pages
+}
+
+def ReadQueries(path):
+    """Yield (id, query) from a JSONL file of {"id": ..., "query": ...} objects or plain JSON strings.
+
+    Lines without an id are numbered by their line number.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                yield str(number), record
+            else:
+                yield str(record.get("id", number)), record["query"]
+
+def CompletedIds(path, retry_errors=True):
+    """Ids already in the output file; with retry_errors, ids whose last record failed are run again."""
+    done = {}
+    if os.path.isfile(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short when the last run was killed
+                done[record["id"]] = not record.get("error")
+    return {record_id for record_id, ok in done.items() if ok or not retry_errors}
+
+def _private_cache(cache, folder):
+    """A cache with the same settings as cache, stored in folder instead of Data/."""
+    return PersistentLRUCache(os.path.join(folder, os.path.basename(cache.path)), max_entries=cache.max_entries,
+                              ttl=cache.ttl, table=cache.table, stale_ratio=cache.stale_ratio)
+
+def SetUp(options):
+    """Import the assistant with a private conversation log and caches, and rate-limited provider calls."""
+    import ChatStore
+
+    # Replayed queries must neither see nor change the user's conversation: each one starts with
+    # no history, and the turns are written to a log next to the results instead.
+    log_path = os.path.splitext(options.output)[0] + ".chatlog.jsonl"
+    ChatStore.ChatLog = ChatStore.ConversationStore(path=log_path, recent_size=0, legacy_paths=[])
+
+    import Main
+    import Modal
+    import ModelRouter
+    import RealtimeSearchEngine
+    import SpellCorrector
+    import AnswerCache
+
+    # Nor may they fill the user's caches: decisions, search results, learned spellings and answers
+    # go to a folder next to the results (kept between runs, so a resumed batch reuses them).
+    cache_folder = os.path.splitext(options.output)[0] + ".caches"
+    os.makedirs(cache_folder, exist_ok=True)
+    Modal.DecisionCache = _private_cache(Modal.DecisionCache, cache_folder)
+    RealtimeSearchEngine.SearchCache = _private_cache(RealtimeSearchEngine.SearchCache, cache_folder)
+    SpellCorrector.Corrector.path = os.path.join(cache_folder, os.path.basename(SpellCorrector.Corrector.path))
+    answers = AnswerCache.AnswerCache
+    answers.path = os.path.join(cache_folder, os.path.basename(answers.path))
+    answers.clear()
+    answers._load()
+
+    rates = dict(ProviderRates)
+    rates.update(options.rate)
+    limiters = {name: AdaptiveRateLimiter(name, rate) for name, rate in rates.items()}
+    Modal.co.chat = RateLimited(limiters["cohere"], Modal.co.chat)
+    if ModelRouter.Client is not None:
+        completions = ModelRouter.Client.chat.completions
+        completions.create = RateLimited(limiters["groq"], completions.create)
+    RealtimeSearchEngine.SearchSession.get = RateLimited(limiters["search"], RealtimeSearchEngine.SearchSession.get)
+
+    if options.no_answer_cache:
+        answers.threshold = float("inf")
+        answers.store = lambda *args, **kwargs: None
+
+    return Main, Modal, limiters
+
+def LLMAnswer(prefix, argument):
+    """Answer a general, realtime or content task through its stream; returns (answer, error or None).
+
+    The engines answer failures with an apology instead of raising; their done event says so.
+    """
+    from Chatbot import ChatbotStream, AnswerModifier
+    from RealtimeSearchEngine import RealtimeSearchEngineStream
+
+    if prefix == "realtime":
+        events = RealtimeSearchEngineStream(argument)
+    else:
+        events = ChatbotStream(f"Write {argument}" if prefix == "content" else argument)  # as Main.ContentTask
+    for event in events:
+        if event["type"] == "done":
+            return AnswerModifier(event["text"].strip()), event.get("error")
+    return None, "no answer"
+
+def RunQuery(Main, Modal, record_id, query, classify_only):
+    """Classify one query and answer its LLM tasks; automation tasks are listed but not performed.
+
+    A failed classification or answer sets "error", so a resumed run tries the query again.
+    """
+    started = time.perf_counter()
+    result = {"id": record_id, "query": query}
+    try:
+        tasks = Modal.FirstLayerDMM(query)
+        result["tasks"] = tasks
+        failed = [task for task in tasks if task.startswith("error")]
+        if failed:
+            result["error"] = failed[0]
+        elif not classify_only:
+            answers = []
+            for task in tasks:
+                resolved = Main.ResolveTask(task)
+                if resolved is None:
+                    answers.append({"task": task, "answer": None, "skipped": "unknown task"})
+                    continue
+                prefix, argument, category, handler = resolved
+                if category != "llm":
+                    answers.append({"task": task, "answer": None, "skipped": category})
+                    continue
+                task_started = time.perf_counter()
+                answer, error = LLMAnswer(prefix, argument)
+                answers.append({"task": task, "answer": answer, "seconds": round(time.perf_counter() - task_started, 3)})
+                if error:
+                    answers[-1]["error"] = error
+                    result.setdefault("error", f"{task}: {error}")
+            result["answers"] = answers
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+def Run(options):
+    """Process every query not yet in the output file; returns (processed, errors)."""
+    Main, Modal, limiters = SetUp(options)
+
+    if options.restart and os.path.exists(options.output):
+        os.remove(options.output)
+    skip = CompletedIds(options.output, retry_errors=not options.keep_errors)
+    if skip:
+        print(f"Resuming: {len(skip)} queries already done.")
+
+    processed = errors = 0
+    started = time.perf_counter()
+    # Only a few queries are held in memory at a time, however big the input is.
+    max_in_flight = options.workers * 2
+    with open(options.output, "a", encoding="utf-8") as output, ThreadPoolExecutor(max_workers=options.workers) as pool:
+        running = set()
+
+        def collect():
+            """Write the results of the queries that have finished (waits for at least one)."""
+            nonlocal processed, errors
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                running.discard(future)
+                result = future.result()
+                # Each result is on disk before the next is collected, so a crash loses only queries in flight.
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+                processed += 1
+                errors += 1 if "error" in result else 0
+                if processed % options.progress_every == 0:
+                    elapsed = time.perf_counter() - started
+                    print(f"{processed} done, {errors} errors, {processed / elapsed:.2f} queries/s")
+
+        for record_id, query in ReadQueries(options.input):
+            if record_id in skip:
+                continue
+            if len(running) >= max_in_flight:
+                collect()
+            running.add(pool.submit(RunQuery, Main, Modal, record_id, query, options.classify_only))
+        while running:
+            collect()
+
+    elapsed = time.perf_counter() - started
+    print(f"Finished: {processed} queries in {elapsed:.1f}s, {errors} errors")
+    for name, limiter in limiters.items():
+        stats = limiter.get_stats()
+        print(f"  {name}: {stats['acquired']} requests, {stats['throttled']} throttled, "
+              f"{stats['waited']:.1f}s waiting, final rate {stats['rate']:.2f}/s")
+    return processed, errors
+
+def _rate(text):
+    name, _, value = text.partition("=")
+    if name not in ProviderRates or not value:
+        raise argparse.ArgumentTypeError(f"expected one of {', '.join(ProviderRates)} as name=requests_per_second")
+    return name, float(value)
+
+def ParseArguments(argv=None):
+    parser = argparse.ArgumentParser(description="Replay logged queries through the classifier and the answer engines.")
+    parser.add_argument("input", help="JSONL file of {\"id\": ..., \"query\": ...} lines")
+    parser.add_argument("output", help="JSONL results file; results already in it are skipped")
+    parser.add_argument("--workers", type=int, default=4, help="queries processed at the same time")
+    parser.add_argument("--rate", type=_rate, action="append", default=[], metavar="PROVIDER=RPS",
+                        help="starting requests per second for cohere, groq or search")
+    parser.add_argument("--classify-only", action="store_true", help="only run FirstLayerDMM")
+    parser.add_argument("--no-answer-cache", action="store_true", help="always ask the model, even for repeated questions, and keep no answers")
+    parser.add_argument("--restart", action="store_true", help="discard the existing output instead of resuming")
+    parser.add_argument("--keep-errors", action="store_true", help="do not retry queries that failed in an earlier run")
+    parser.add_argument("--progress-every", type=int, default=50, help="print progress every N queries")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    options = ParseArguments()
+    try:
+        processed, errors = Run(options)
+    except KeyboardInterrupt:
+        print("\nStopped; run the same command again to resume.")
+        sys.exit(130)
+    sys.exit(1 if errors else 0)
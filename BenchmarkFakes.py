@@ -0,0 +1,137 @@
+import os # fixture paths
+import json # recorded responses
+import time # simulated latency
+import types # lightweight response objects shaped like the SDKs'
+import threading # the stub server runs in the background
+import urllib.parse # reading the search query from stub requests
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler # local stand-in for Bing
+
+# Saved Bing pages and recorded model responses.
+FixtureFolder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Fixtures")
+RecordedResponsesPath = os.path.join(FixtureFolder, "recorded_responses.json")
+
+def LoadRecordedResponses(path=RecordedResponsesPath):
+    """Return {"cohere": {query: decision}, "groq": [[keyword, answer], ...], "default_answer": str}."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+class FakeCohere:
+    """Stands in for cohere.Client: replays recorded decisions after a fixed latency."""
+
+    def __init__(self, recorded=None, latency=0.05):
+        self.recorded = (recorded or LoadRecordedResponses())["cohere"]
+        self.latency = latency
+        self.calls = 0
+
+    def chat(self, message, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        decision = self.recorded.get(" ".join(message.lower().split()), f"general {message}")
+        return types.SimpleNamespace(text=decision)
+
+class _FakeModels:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def list(self):
+        time.sleep(self.owner.list_latency)
+        return types.SimpleNamespace(data=[types.SimpleNamespace(id=model_id) for model_id in self.owner.model_ids])
+
+class _FakeCompletions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, model, messages, stream=False, **kwargs):
+        return self.owner._complete(model, messages, stream)
+
+class FakeGroq:
+    """Stands in for groq.Groq: answers from recorded text with a time-to-first-token and a token rate.
+
+    llm_timings collects (model, seconds from request to last token) for every completion.
+    """
+
+    def __init__(self, api_key=None, recorded=None, ttft=0.05, tokens_per_second=400.0, list_latency=0.02,
+                 model_ids=("whisper-large-v3", "llama-3.1-8b-instant", "llama-3.3-70b-versatile", "groq/compound")):
+        recorded = recorded or LoadRecordedResponses()
+        self.answers = recorded["groq"]
+        self.default_answer = recorded["default_answer"]
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.list_latency = list_latency
+        self.model_ids = list(model_ids)
+        self.llm_timings = []
+        self.models = _FakeModels(self)
+        self.chat = types.SimpleNamespace(completions=_FakeCompletions(self))
+
+    def _answer_for(self, messages):
+        question = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "").lower()
+        for keyword, answer in self.answers:
+            if keyword in question:
+                return answer
+        return self.default_answer
+
+    def _complete(self, model, messages, stream):
+        started = time.perf_counter()
+        words = [word + " " for word in self._answer_for(messages).split(" ")]
+        delay = 1.0 / self.tokens_per_second
+
+        if not stream:
+            time.sleep(self.ttft + delay * len(words))
+            self.llm_timings.append((model, time.perf_counter() - started))
+            message = types.SimpleNamespace(content="".join(words).strip())
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+        def chunks():
+            time.sleep(self.ttft)
+            for word in words:
+                yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=word))])
+                time.sleep(delay)
+            self.llm_timings.append((model, time.perf_counter() - started))
+        return chunks()
+
+class _BingStubHandler(BaseHTTPRequestHandler):
+    pages = {}
+    latency = 0.0
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query).get("q", [""])[0].lower()
+        time.sleep(self.latency)
+        # Pick the saved page whose name shares a keyword with the query.
+        body = self.pages["default"]
+        for keywords, page in self.pages.items():
+            if keywords != "default" and any(word in query for word in keywords):
+                body = page
+                break
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class BingStubServer:
+    """Local HTTP server that answers search requests with the saved Bing pages in Fixtures/."""
+
+    def __init__(self, latency=0.02):
+        pages = {}
+        for name in sorted(os.listdir(FixtureFolder)):
+            if name.startswith("bing_") and name.endswith(".html"):
+                with open(os.path.join(FixtureFolder, name), "r", encoding="utf-8") as f:
+                    # bing_networth_elon_musk.html -> ("networth", "elon", "musk")
+                    pages[tuple(name[len("bing_"):-len(".html")].split("_"))] = f.read()
+        pages["default"] = next(iter(pages.values()))
+        handler = type("BingStubHandler", (_BingStubHandler,), {"pages": pages, "latency": latency})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
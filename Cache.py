@@ -0,0 +1,220 @@
+import os # used to create the folder that holds the cache database
+import json # values are stored as JSON text in SQLite
+import time # used for TTL expiry and last-used timestamps
+import sqlite3 # on-disk backing store so the cache survives restarts
+import atexit # pending last-used times are written when the program exits
+import threading # the cache is shared between threads
+from collections import OrderedDict # keeps the in-memory entries in LRU order
+import Tracing # hit/miss counters for the metrics endpoint
+
+# Last-used times of this many entries are written to disk together.
+TouchFlushBatch = 64
+
+class PersistentLRUCache:
+    """A small LRU cache with per-entry TTL, mirrored to an SQLite file.
+
+    The most recently used entries live in memory, so lookups never touch the disk: a hit only
+    notes its last-used time, and those are written in batches (with the next write, once
+    TouchFlushBatch entries are pending, or at exit). Every write is also stored in SQLite and
+    the most recently used entries are loaded back at startup.
+    """
+
+    def __init__(self, path, max_entries=512, ttl=24 * 3600, table="cache", stale_ratio=0.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.table = table
+        # Expired entries stay available to get_stale() for this many times their own TTL, so a
+        # 10-minute entry is served stale for minutes, not for as long as a day-long one.
+        self.stale_ratio = stale_ratio
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "stale_hits": 0}
+        self._entries = OrderedDict()  # key -> (expires_at, value, stale_until)
+        self._touched = {}  # key -> last-used time not yet written
+        self._lock = threading.Lock()
+        self._db = None
+
+        try:
+            folder = os.path.dirname(path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value TEXT, expires_at REAL, last_used REAL, stale_until REAL)"
+            )
+            columns = [row[1] for row in self._db.execute(f"PRAGMA table_info({table})")]
+            if "stale_until" not in columns:
+                # Files from before per-entry stale windows: their entries are not served stale.
+                self._db.execute(f"ALTER TABLE {table} ADD COLUMN stale_until REAL")
+            self._db.commit()
+            self._load()
+        except sqlite3.Error as e:
+            # Without a database the cache still works, it just forgets on restart.
+            print(f"Cache disabled on disk ({path}): {e}")
+            self._db = None
+        atexit.register(self.flush)
+
+    def _load(self):
+        """Load the most recently used, still valid entries from disk."""
+        now = time.time()
+        self._db.execute(f"DELETE FROM {self.table} WHERE COALESCE(stale_until, expires_at) <= ?", (now,))
+        self._db.commit()
+        rows = self._db.execute(
+            f"SELECT key, value, expires_at, COALESCE(stale_until, expires_at) FROM {self.table} ORDER BY last_used DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        # Oldest first, so the most recently used entry ends up at the end of the LRU order.
+        for key, value, expires_at, stale_until in reversed(rows):
+            self._entries[key] = (expires_at, json.loads(value), stale_until)
+
+    def _execute(self, sql, params):
+        """Run a write statement on the backing store (with any pending last-used times), ignoring disk errors."""
+        if self._db is None:
+            return
+        try:
+            self._write_touched()
+            self._db.execute(sql, params)
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Cache write failed ({self.path}): {e}")
+
+    def _write_touched(self):
+        """Queue the pending last-used updates in the current transaction (caller holds the lock and commits)."""
+        if self._touched:
+            self._db.executemany(f"UPDATE {self.table} SET last_used = ? WHERE key = ?",
+                                 [(used, key) for key, used in self._touched.items()])
+            self._touched.clear()
+
+    def _flush_touched(self):
+        """Write the pending last-used times now (caller holds the lock)."""
+        if self._db is None or not self._touched:
+            return
+        try:
+            self._write_touched()
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Cache write failed ({self.path}): {e}")
+
+    def flush(self):
+        """Write pending last-used times to disk."""
+        with self._lock:
+            self._flush_touched()
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._count("misses")
+                return default
+
+            expires_at, value, stale_until = entry
+            if expires_at <= time.time():
+                # Expired entries count as a miss.
+                self._count("expired")
+                self._count("misses")
+                self._drop_if_past_stale(key, stale_until)
+                return default
+
+            self._touch(key)
+            self._count("hits")
+            return value
+
+    def get_stale(self, key, default=None):
+        """Return (value, is_fresh). Expired entries are still returned, as not fresh, for stale_ratio times their TTL.
+
+        This is for stale-while-revalidate: the caller can use an old value right away and refresh it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._count("misses")
+                return default, False
+
+            expires_at, value, stale_until = entry
+            now = time.time()
+            if expires_at > now:
+                self._touch(key)
+                self._count("hits")
+                return value, True
+
+            self._count("expired")
+            if self._drop_if_past_stale(key, stale_until):
+                self._count("misses")
+                return default, False
+
+            self._touch(key)
+            self._count("stale_hits")
+            return value, False
+
+    def _count(self, field):
+        """Bump one statistic here and in the shared metrics (caller holds the lock)."""
+        self.stats[field] += 1
+        Tracing.Count(f"cache_{self.table}_{field}")
+
+    def _touch(self, key):
+        """Mark key as most recently used (caller holds the lock); the disk copy is updated later."""
+        self._entries.move_to_end(key)
+        if self._db is not None:
+            self._touched[key] = time.time()
+            if len(self._touched) >= TouchFlushBatch:
+                self._flush_touched()
+
+    def _drop_if_past_stale(self, key, stale_until):
+        """Remove an expired entry once it is too old even to serve stale (caller holds the lock)."""
+        if stale_until > time.time():
+            return False
+        del self._entries[key]
+        self._execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        return True
+
+    def set(self, key, value, ttl=None):
+        """Store a JSON-serializable value under key for ttl seconds (default: the cache TTL)."""
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl
+        stale_until = expires_at + self.stale_ratio * ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value, stale_until)
+            self._entries.move_to_end(key)
+            self._execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, last_used, stale_until) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now, stale_until),
+            )
+
+            # Evict the least recently used entries once we are over the limit.
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._count("evictions")
+                self._execute(f"DELETE FROM {self.table} WHERE key = ?", (old_key,))
+
+    def delete(self, key):
+        """Remove key from the cache if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self):
+        """Remove every entry from memory and disk."""
+        with self._lock:
+            self._entries.clear()
+            self._execute(f"DELETE FROM {self.table}", ())
+
+    def contains(self, key):
+        """Whether key has a fresh value, without counting a lookup or marking it as used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.time()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        """Return hit/miss/eviction counters plus the current size and hit rate."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self._entries)
+        served = stats["hits"] + stats["stale_hits"]
+        lookups = served + stats["misses"]
+        stats["hit_rate"] = served / lookups if lookups else 0.0
+        return stats
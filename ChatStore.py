@@ -0,0 +1,179 @@
+import os # used for paths, fsync and file sizes
+import json # each turn is stored as one JSON line
+import time # timestamps for stored turns
+import atexit # flush pending turns when the program exits
+import threading # background write-behind flushing
+from collections import deque # ring buffer of recent turns
+from ContextBuilder import EstimateTokens # token count cached with each turn
+
+# Where the shared conversation log lives.
+ChatLogPath = os.path.join("Data", "ChatLog.jsonl")
+
+# Older logs that were rewritten in full on every turn, imported once.
+LegacyChatLogPaths = [os.path.join("Data", "ChatLog.json"), r"Data\ChatLog.json"]
+
+class ConversationStore:
+    """Append-only conversation log with an in-memory ring buffer of recent turns.
+
+    Appending a turn only touches memory; a background thread writes new lines to the
+    end of the JSONL file and fsyncs them, so a turn costs O(1) I/O however long the history is.
+    """
+
+    def __init__(self, path=ChatLogPath, recent_size=100, flush_interval=0.5, legacy_paths=None):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._recent = deque(maxlen=recent_size)
+        self._next_seq = 0  # sequence number of the next turn
+        self.generation = 0  # bumped by clear(), so cached views of the history know to reset
+        self._pending = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        if not os.path.exists(path):
+            self._import_legacy(LegacyChatLogPaths if legacy_paths is None else legacy_paths)
+        self._load_tail()
+
+        self._writer = threading.Thread(target=self._write_behind, name="ChatStoreWriter", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _import_legacy(self, legacy_paths):
+        """Copy the turns of an old ChatLog.json into the JSONL log (runs once, when no log exists yet)."""
+        for legacy in legacy_paths:
+            if not os.path.isfile(legacy):
+                continue
+            try:
+                with open(legacy, "r", encoding="utf-8") as f:
+                    old_messages = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Could not import {legacy}: {e}")
+                continue
+
+            # Write to a temporary file first so a crash never leaves a half-imported log.
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for message in old_messages:
+                    if isinstance(message, dict) and "role" in message and "content" in message:
+                        record = {"role": message["role"], "content": message["content"], "time": None}
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            return
+
+    def _load_tail(self, block_size=8192):
+        """Fill the ring buffer from the end of the log without reading the whole file."""
+        if not os.path.isfile(self.path):
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b""
+            # Read backwards until we have enough lines for the ring buffer.
+            while position > 0 and data.count(b"\n") <= self._recent.maxlen:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+
+        lines = data.split(b"\n")
+        if position > 0:
+            lines = lines[1:]  # the first line may be cut in the middle
+        lines = [line for line in lines if line.strip()]
+        for line in lines[-self._recent.maxlen:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # empty line or a line torn by a crash
+            self._remember(record["role"], record["content"])
+
+    def _write_behind(self):
+        """Background loop that flushes pending turns every flush_interval seconds."""
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _remember(self, role, content):
+        """Put a turn in the ring buffer with its sequence number and token count."""
+        self._recent.append({"role": role, "content": content, "seq": self._next_seq, "tokens": EstimateTokens(content)})
+        self._next_seq += 1
+
+    def append(self, role, content):
+        """Add one turn to the conversation."""
+        self._append_turns([(role, content)])
+
+    def append_exchange(self, user, assistant):
+        """Add a question and its answer as two adjacent turns.
+
+        Both are written under one lock, so concurrent conversations never interleave their turns.
+        """
+        self._append_turns([("user", user), ("assistant", assistant)])
+
+    def _append_turns(self, turns):
+        now = time.time()
+        lines = [json.dumps({"role": role, "content": content, "time": now}, ensure_ascii=False) + "\n" for role, content in turns]
+        with self._lock:
+            for role, content in turns:
+                self._remember(role, content)
+            self._pending.extend(lines)
+
+    def recent(self, count=None, details=False):
+        """Return the last count turns (all buffered turns if count is None) as role/content dicts.
+
+        With details=True each turn also carries its "seq" number and cached "tokens" count.
+        """
+        with self._lock:
+            turns = list(self._recent)
+        if count is not None:
+            turns = turns[-count:] if count > 0 else []
+        if details:
+            return [dict(turn) for turn in turns]
+        return [{"role": turn["role"], "content": turn["content"]} for turn in turns]
+
+    def flush(self):
+        """Write pending turns to the end of the log and fsync them."""
+        # The write lock keeps flushes in order; appends only wait for the list swap.
+        with self._write_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                lines, self._pending = self._pending, []
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                # Keep the turns so the next flush can try again.
+                with self._lock:
+                    self._pending = lines + self._pending
+                print(f"Could not write chat log {self.path}: {e}")
+
+    def clear(self):
+        """Forget the whole conversation, in memory and on disk."""
+        with self._write_lock, self._lock:
+            self._recent.clear()
+            self._pending = []
+            self.generation += 1
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def close(self):
+        """Stop the writer thread after a final flush."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+# The conversation log shared by the chatbot and the realtime search engine.
+ChatLog = ConversationStore()
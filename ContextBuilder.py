@@ -0,0 +1,131 @@
+import re # tokenizing snippets and prompts
+import threading # protects the statistics
+import numpy as np # vectorized BM25 scoring and duplicate detection
+
+# Maximum number of tokens of search results we put in front of the LLM.
+ContextTokenBudget = 1200
+
+# Two snippets sharing at least this fraction of their words count as near-duplicates.
+DuplicateThreshold = 0.8
+
+# BM25 parameters.
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+WordPattern = re.compile(r"[a-z0-9$%.,]+")
+
+StopWords = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "in", "on", "at", "to", "for", "and", "or",
+    "what", "who", "whom", "which", "when", "where", "why", "how", "do", "does", "did", "me", "tell", "about",
+    "i", "you", "it", "its", "this", "that", "with", "by", "from", "as", "can", "please", "search",
+}
+
+# Totals and the last build, for reporting how much prompt trimming saves.
+ContextStats = {"builds": 0, "tokens_before": 0, "tokens_after": 0, "duplicates_removed": 0, "last": None}
+_stats_lock = threading.Lock()
+
+def EstimateTokens(text):
+    """Rough token count for Llama-style tokenizers: about four characters per token."""
+    return max(1, (len(text) + 3) // 4) if text else 0
+
+def tokenize(text):
+    """Lowercase words with surrounding punctuation removed."""
+    return [word.strip(".,") for word in WordPattern.findall(text.lower()) if word.strip(".,")]
+
+def _term_matrix(token_lists):
+    """Return (term frequency matrix, vocabulary) for a list of token lists."""
+    vocabulary = {}
+    for tokens in token_lists:
+        for token in tokens:
+            vocabulary.setdefault(token, len(vocabulary))
+    matrix = np.zeros((len(token_lists), max(1, len(vocabulary))), dtype=np.float32)
+    for row, tokens in enumerate(token_lists):
+        for token in tokens:
+            matrix[row, vocabulary[token]] += 1
+    return matrix, vocabulary
+
+def RemoveNearDuplicates(matrix, threshold=DuplicateThreshold):
+    """Return the indexes of rows to keep, dropping any that overlap an earlier one by threshold or more."""
+    present = (matrix > 0).astype(np.float32)
+    sizes = present.sum(axis=1)
+    overlap = present @ present.T
+    union = sizes[:, None] + sizes[None, :] - overlap
+    similarity = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+
+    kept = []
+    for index in range(matrix.shape[0]):
+        if not kept or similarity[index, kept].max() < threshold:
+            kept.append(index)
+    return kept
+
+def BM25Scores(matrix, vocabulary, query_tokens):
+    """Score every row of the term frequency matrix against the query with BM25."""
+    columns = sorted({vocabulary[token] for token in query_tokens if token in vocabulary})
+    if not columns:
+        return np.zeros(matrix.shape[0], dtype=np.float32)
+
+    documents = matrix.shape[0]
+    lengths = matrix.sum(axis=1)
+    average_length = lengths.mean() or 1.0
+    frequencies = matrix[:, columns]
+    document_frequency = (frequencies > 0).sum(axis=0)
+    idf = np.log(1 + (documents - document_frequency + 0.5) / (document_frequency + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+    weights = frequencies * (BM25_K1 + 1) / (frequencies + norm[:, None])
+    return weights @ idf
+
+def BuildSearchContext(prompt, snippets, token_budget=None):
+    """Deduplicate and rank search snippets against the prompt, keeping the best ones that fit the budget.
+
+    Returns the snippets joined the same way GoogleSearch joins them.
+    """
+    budget = ContextTokenBudget if token_budget is None else token_budget
+    tokens_before = sum(EstimateTokens(snippet) for snippet in snippets)
+    if not snippets:
+        return ""
+
+    token_lists = [tokenize(snippet) for snippet in snippets]
+    matrix, vocabulary = _term_matrix(token_lists)
+
+    unique = RemoveNearDuplicates(matrix)
+    query_tokens = [token for token in tokenize(prompt) if token not in StopWords]
+    scores = BM25Scores(matrix[unique], vocabulary, query_tokens)
+
+    # Best score first; equal scores keep the search engine's order.
+    ranked = [unique[i] for i in sorted(range(len(unique)), key=lambda i: (-scores[i], i))]
+
+    chosen = []
+    used = 0
+    for index in ranked:
+        cost = EstimateTokens(snippets[index])
+        if used + cost > budget:
+            if not chosen and cost > budget:
+                # Never return nothing: cut the single best snippet down to the budget.
+                chosen.append(snippets[index][:budget * 4])
+                used = budget
+            continue
+        chosen.append(snippets[index])
+        used += cost
+
+    context = "\n\n".join(chosen)
+    tokens_after = EstimateTokens(context)
+    with _stats_lock:
+        ContextStats["builds"] += 1
+        ContextStats["tokens_before"] += tokens_before
+        ContextStats["tokens_after"] += tokens_after
+        ContextStats["duplicates_removed"] += len(snippets) - len(unique)
+        ContextStats["last"] = {
+            "snippets": len(snippets),
+            "unique": len(unique),
+            "kept": len(chosen),
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+        }
+    return context
+
+def GetContextStats():
+    """Return prompt token counts before and after trimming, totals and for the last build."""
+    with _stats_lock:
+        stats = dict(ContextStats)
+    stats["saved_ratio"] = 1 - stats["tokens_after"] / stats["tokens_before"] if stats["tokens_before"] else 0.0
+    return stats
@@ -0,0 +1,290 @@
+import re # fact patterns
+import time # extraction time
+import datetime # normalizing dates
+import threading # protects the statistics
+from collections import deque # recent LLM stage timings
+from dotenv import dotenv_values # on/off switch from the .env file
+from ContextBuilder import tokenize, StopWords # same word splitting as the ranking
+
+# On unless FastAnswers=off in .env.
+FastAnswersEnabled = dotenv_values(".env").get("FastAnswers", "on").lower() not in ("0", "off", "false", "no")
+
+# A fact is answered without the LLM when at least this many snippets agree and they carry this share of the vote.
+FastAnswerMinSources = 2
+FastAnswerConfidence = 0.7
+
+# Values closer than this count as the same answer (relative for amounts, points for percentages).
+MoneyTolerance = 0.1
+CountTolerance = 0.02
+PercentTolerance = 0.2
+
+# Later snippets in the ranking get less say: weight 1 / (1 + RankDecay * rank).
+RankDecay = 0.2
+
+# What kind of fact a question asks for; the matched words also mark the sentences that talk about it.
+FactQuestions = [
+    # "is it worth it" asks for an opinion, not an amount.
+    ("money", re.compile(r"\b(?:net ?worth|worth(?!\s+(?:it|buying|watching|the money)\b)|price|cost|revenue|market cap|valuation|salary|gdp|budget)\b", re.IGNORECASE)),
+    ("percent", re.compile(r"\b(?:percent(?:age)?|inflation|unemployment|interest rate|tax rate|growth rate|approval rating)\b|%", re.IGNORECASE)),
+    ("date", re.compile(r"\b(?:when (?:is|was|did|does|will)|what date|release date|born|founded|launched)\b", re.IGNORECASE)),
+    ("count", re.compile(r"\b(?:how many|population|number of)\b", re.IGNORECASE)),
+]
+
+# Words that mean the same as the question's in a snippet sentence.
+CueSynonyms = {
+    "worth": {"wealth", "fortune", "richest", "billionaire", "billionaires"},
+    "networth": {"worth", "wealth", "fortune", "richest", "billionaire", "billionaires"},
+    "born": {"birth"},
+    "population": {"people", "inhabitants", "residents"},
+}
+
+# A date question must name the event it asks about; these are the words a sentence can use for it.
+EventWords = [
+    {"die", "died", "dies", "death", "passed"},
+    {"born", "birth", "birthday"},
+    {"found", "founded", "founding", "established"},
+    {"release", "released", "releases"},
+    {"launch", "launched", "launches"},
+    {"marry", "married", "marriage"},
+    {"open", "opened", "opening"},
+    {"invent", "invented", "invention"},
+    {"retire", "retired", "retirement"},
+    {"start", "started", "starts", "begin", "began", "begins"},
+    {"end", "ended", "ends"},
+]
+EventCues = {word: words for words in EventWords for word in words}
+
+# Years, quarters and months in a question narrow it down ("net worth in 2012"): only sentences that name them can answer.
+Qualifier = re.compile(r"\b(?:1[89]\d\d|20\d\d|q[1-4])\b", re.IGNORECASE)
+
+# Words of the question itself, neither cues nor the subject.
+QuestionWords = {"when", "is", "was", "did", "does", "will", "what", "how", "many", "of", "number", "date", "have", "has"}
+
+Scales = {"thousand": 1e3, "k": 1e3, "million": 1e6, "mn": 1e6, "m": 1e6, "billion": 1e9, "bn": 1e9, "b": 1e9, "trillion": 1e12, "tn": 1e12, "t": 1e12}
+
+MoneyPatterns = [
+    re.compile(r"(?:US)?\$\s?(\d[\d,]*(?:\.\d+)?)\s*(trillion|billion|million|thousand|tn|bn|mn|[TBMK](?![A-Za-z]))?", re.IGNORECASE),
+    re.compile(r"\b(\d[\d,]*(?:\.\d+)?)\s*(trillion|billion|million)\s+(?:dollars|USD)\b", re.IGNORECASE),
+]
+PercentPattern = re.compile(r"\b(\d+(?:\.\d+)?)\s?(?:%|percent\b|per cent\b)", re.IGNORECASE)
+CountPattern = re.compile(r"\b(\d[\d,]*(?:\.\d+)?)(?:\s*(thousand|million|billion))?\b", re.IGNORECASE)
+
+MonthNames = {name: number for number, names in enumerate(
+    [("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"), ("may",), ("june", "jun"), ("july", "jul"),
+     ("august", "aug"), ("september", "sep", "sept"), ("october", "oct"), ("november", "nov"), ("december", "dec")], 1) for name in names}
+_month = "|".join(sorted(MonthNames, key=len, reverse=True))
+DatePatterns = [
+    (re.compile(rf"\b({_month})\.? (\d{{1,2}}),? (\d{{4}})\b", re.IGNORECASE), ("month", "day", "year")),
+    (re.compile(rf"\b(\d{{1,2}}) ({_month})\.?,? (\d{{4}})\b", re.IGNORECASE), ("day", "month", "year")),
+    (re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b"), ("year", "month", "day")),
+]
+
+# Search result pages put the page date in front of captions ("Mar 14, 2025 · ..."); it is not an answer.
+CaptionDatePrefix = re.compile(r"^(?:\w{3} \d{1,2}, \d{4}|\d+ (?:minutes?|hours?|days?) ago)\s*·\s*", re.MULTILINE)
+SentenceSplit = re.compile(r"(?<=[.!?])\s+|\n+")
+
+def _number(text):
+    return float(text.replace(",", ""))
+
+# The extractors return (start, end, value) for every value in a sentence, in order.
+
+def _money_values(sentence):
+    values = []
+    for pattern in MoneyPatterns:
+        for match in pattern.finditer(sentence):
+            scale = Scales.get((match.group(2) or "").lower(), 1.0)
+            values.append((match.start(), match.end(), _number(match.group(1)) * scale))
+    return sorted(values)
+
+def _percent_values(sentence):
+    return [(match.start(), match.end(), float(match.group(1))) for match in PercentPattern.finditer(sentence)]
+
+def _date_values(sentence):
+    values = []
+    for pattern, order in DatePatterns:
+        for match in pattern.finditer(sentence):
+            parts = dict(zip(order, match.groups()))
+            month = parts["month"]
+            month = MonthNames.get(month.lower()) if not month.isdigit() else int(month)
+            try:
+                values.append((match.start(), match.end(), datetime.date(int(parts["year"]), month, int(parts["day"]))))
+            except (TypeError, ValueError):
+                continue
+    return sorted(values)
+
+def _count_values(sentence, noun):
+    values = []
+    for match in CountPattern.finditer(sentence):
+        value = _number(match.group(1)) * Scales.get((match.group(2) or "").lower(), 1.0)
+        following = sentence[match.end():match.end() + 40].lower().split()[:3]
+        # Only numbers followed by what was asked about ("95 moons"), not years or page counts.
+        if noun and any(word.startswith(noun) for word in following):
+            values.append((match.start(), match.end(), value))
+    return values
+
+def FactType(prompt):
+    """Return (fact type, cue words) for questions about money, percentages, dates or counts, else (None, set()).
+
+    Date questions take their cues from the event they name ("die" -> died, death); one that names
+    no event ("when is the final") is not a fact lookup.
+    """
+    for fact_type, pattern in FactQuestions:
+        match = pattern.search(prompt)
+        if not match:
+            continue
+        if fact_type == "date":
+            cues = set().union(*(EventCues[word] for word in tokenize(prompt) if word in EventCues))
+            return (fact_type, cues) if cues else (None, set())
+        cues = set(tokenize(match.group(0)))
+        for word in list(cues):
+            cues |= CueSynonyms.get(word, set())
+        cues -= QuestionWords
+        return fact_type, cues
+    return None, set()
+
+def _closest_to_cue(values, sentence, cues):
+    """The value nearest to a cue word in the sentence ("born 1958 ... died 2009" -> 2009 for death)."""
+    spots = [(word.start(), word.end()) for word in re.finditer(r"\w+", sentence.lower()) if word.group(0) in cues]
+    if not spots:
+        return values[0][2]
+    return min(values, key=lambda value: min(max(start - value[1], value[0] - end, 0) for start, end in spots))[2]
+
+def _counted_noun(prompt):
+    """'how many moons does jupiter have' -> 'moon'; population questions count people."""
+    match = re.search(r"\bhow many (\w+)", prompt, re.IGNORECASE)
+    if match:
+        noun = match.group(1).lower()
+        return noun[:-1] if noun.endswith("s") and len(noun) > 3 else noun
+    return "people" if re.search(r"\bpopulation\b", prompt, re.IGNORECASE) else None
+
+def _same(fact_type, a, b):
+    if fact_type == "date":
+        return a == b
+    if fact_type == "percent":
+        return abs(a - b) <= PercentTolerance
+    tolerance = MoneyTolerance if fact_type == "money" else CountTolerance
+    return abs(a - b) <= tolerance * max(abs(a), abs(b))
+
+def _scaled(value):
+    for name, scale in (("trillion", 1e12), ("billion", 1e9), ("million", 1e6)):
+        if value >= scale:
+            return f"{value / scale:.1f}".rstrip("0").rstrip(".") + f" {name}"
+    return f"{value:,.0f}"
+
+def FormatFact(fact_type, value):
+    if fact_type == "money":
+        return f"${_scaled(value)}"
+    if fact_type == "percent":
+        return f"{value:g}%"
+    if fact_type == "date":
+        return f"{value.strftime('%B')} {value.day}, {value.year}"
+    return _scaled(value)
+
+AnswerTemplates = {
+    "money": "About {value}, according to {support} of {sources} search results.",
+    "percent": "About {value}, according to {support} of {sources} search results.",
+    "date": "{value}, according to {support} of {sources} search results.",
+    "count": "{value}, according to {support} of {sources} search results.",
+}
+
+def ExtractFacts(prompt, snippets):
+    """Vote on the typed fact the question asks for; returns (fact type, value, support, sources, confidence) or None.
+
+    Each snippet that mentions the subject gives at most one vote, for the value nearest the cue in a
+    sentence that mentions what was asked (values in other sentences count half, and never for dates).
+    Sentences must name every year or quarter the question names. Snippets are expected best first.
+    """
+    fact_type, cues = FactType(prompt)
+    if fact_type is None:
+        return None
+    noun = _counted_noun(prompt) if fact_type == "count" else None
+    qualifiers = {qualifier.lower() for qualifier in Qualifier.findall(prompt)}
+    # What the question is about ("elon", "musk"); snippets that never mention it do not vote.
+    subject = set(tokenize(prompt)) - StopWords - cues - QuestionWords - qualifiers - {noun, f"{noun}s"}
+
+    votes = []  # (value, weight)
+    for rank, snippet in enumerate(snippets):
+        if subject and not subject & set(tokenize(snippet)):
+            continue
+        best = None
+        for sentence in SentenceSplit.split(CaptionDatePrefix.sub("", snippet)):
+            if fact_type == "money":
+                values = _money_values(sentence)
+            elif fact_type == "percent":
+                values = _percent_values(sentence)
+            elif fact_type == "date":
+                values = _date_values(sentence)
+            else:
+                values = _count_values(sentence, noun)
+            if not values:
+                continue
+            words = set(tokenize(sentence))
+            if not qualifiers <= words:
+                continue
+            on_topic = not cues or bool(cues & words)
+            if not on_topic and fact_type == "date":
+                continue  # a birth date is not a death date
+            weight = (1.0 if on_topic else 0.5) / (1 + RankDecay * rank)
+            if best is None or weight > best[1]:
+                best = (_closest_to_cue(values, sentence, cues), weight)
+            if on_topic:
+                break
+        if best is not None:
+            votes.append(best)
+    if not votes:
+        return None
+
+    # Group agreeing values; each group is led by its best-weighted value.
+    groups = []  # [leading value, leading weight, total weight, support]
+    for value, weight in votes:
+        for group in groups:
+            if _same(fact_type, group[0], value):
+                group[2] += weight
+                group[3] += 1
+                if weight > group[1]:
+                    group[0], group[1] = value, weight
+                break
+        else:
+            groups.append([value, weight, weight, 1])
+    total = sum(group[2] for group in groups)
+    value, _, weight, support = max(groups, key=lambda group: group[2])
+    return fact_type, value, support, len(votes), weight / total
+
+# Totals for GetFastAnswerStats().
+FastAnswerStats = {"checked": 0, "answered": 0, "fell_through": 0, "extract_time": 0.0, "latency_saved": 0.0}
+_stats_lock = threading.Lock()
+_llm_stage_times = deque(maxlen=100)
+
+def RecordLLMStage(seconds):
+    """Remember how long an LLM answer took once the search context was ready (what a fast answer saves)."""
+    with _stats_lock:
+        _llm_stage_times.append(seconds)
+
+def FastAnswer(prompt, snippets):
+    """A templated answer when the ranked snippets agree on the fact the question asks for, else None."""
+    if not FastAnswersEnabled or not snippets:
+        return None
+    started = time.perf_counter()
+    facts = ExtractFacts(prompt, snippets)
+    answer = None
+    if facts is not None:
+        fact_type, value, support, sources, confidence = facts
+        if support >= FastAnswerMinSources and confidence >= FastAnswerConfidence:
+            answer = AnswerTemplates[fact_type].format(value=FormatFact(fact_type, value), support=support, sources=sources)
+    elapsed = time.perf_counter() - started
+    with _stats_lock:
+        FastAnswerStats["extract_time"] += elapsed
+        if facts is not None:
+            FastAnswerStats["checked"] += 1
+            FastAnswerStats["answered" if answer else "fell_through"] += 1
+        if answer and _llm_stage_times:
+            FastAnswerStats["latency_saved"] += max(0.0, sum(_llm_stage_times) / len(_llm_stage_times) - elapsed)
+    return answer
+
+def GetFastAnswerStats():
+    """Return how many fact questions were answered without the LLM and the estimated seconds saved."""
+    with _stats_lock:
+        stats = dict(FastAnswerStats)
+        stats["avg_llm_stage"] = sum(_llm_stage_times) / len(_llm_stage_times) if _llm_stage_times else 0.0
+    stats["answer_rate"] = stats["answered"] / stats["checked"] if stats["checked"] else 0.0
+    return stats
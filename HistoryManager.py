@@ -0,0 +1,110 @@
+import re # first-sentence extraction for the summary
+import threading # the window may be built from several threads
+from ChatStore import ChatLog # the shared conversation log
+from ContextBuilder import EstimateTokens # rough token counts
+
+# Tokens of conversation history each model gets (the rest of its context is left for
+# the system prompt, search results and the answer).
+ModelHistoryBudgets = {
+    "llama-3.1-8b-instant": 2000,
+    "llama-3.3-70b-versatile": 3000,
+    "groq/compound-mini": 2000,
+    "groq/compound": 2000,
+}
+DefaultHistoryBudget = 1500
+
+# Tokens the rolling summary of older turns may use.
+SummaryTokenBudget = 250
+
+# Words kept from each turn that is folded into the summary.
+SummaryWordsPerTurn = 25
+
+FirstSentence = re.compile(r"^(.+?[.!?])(?:\s|$)", re.DOTALL)
+
+def SummarizeTurn(turn):
+    """One summary line for a turn: the speaker and the first sentence, cut to SummaryWordsPerTurn words."""
+    text = " ".join(turn["content"].split())
+    match = FirstSentence.match(text)
+    words = (match.group(1) if match else text).split()
+    line = " ".join(words[:SummaryWordsPerTurn])
+    if len(words) > SummaryWordsPerTurn:
+        line += "..."
+    return f"{turn['role']}: {line}"
+
+class _Summary:
+    """The rolling summary kept for one history budget."""
+
+    def __init__(self):
+        self.upto = -1  # sequence number of the newest turn in the summary
+        self.lines = []  # (summary line, sequence number)
+        self.text = ""
+
+class HistoryManager:
+    """Builds the history part of a prompt from the most recent turns that fit a token budget.
+
+    Turns that no longer fit are folded into a rolling summary. The summary is cached and only
+    rebuilt when the window moves past more turns, not on every call. Callers with different
+    budgets (the chatbot and the realtime engine) each get their own summary, so alternating
+    between them does not rebuild it every time.
+    """
+
+    def __init__(self, store=ChatLog, summarizer=SummarizeTurn, summary_budget=SummaryTokenBudget):
+        self.store = store
+        self.summarizer = summarizer
+        self.summary_budget = summary_budget
+        self._lock = threading.Lock()
+        self._generation = store.generation
+        self._summaries = {}  # history budget -> _Summary
+
+    def _fold(self, summary, turns):
+        """Add evicted turns to a summary, dropping the oldest lines to stay within budget."""
+        for turn in turns:
+            summary.lines.append((self.summarizer(turn), turn["seq"]))
+        while summary.lines and EstimateTokens("\n".join(line for line, _ in summary.lines)) > self.summary_budget:
+            summary.lines.pop(0)
+        summary.text = "\n".join(line for line, _ in summary.lines)
+
+    def window(self, model=None, budget=None):
+        """Return the messages to send for model: a summary message (if any) and the recent turns that fit."""
+        if budget is None:
+            budget = ModelHistoryBudgets.get(model, DefaultHistoryBudget)
+        turns = self.store.recent(details=True)
+
+        with self._lock:
+            # The log was cleared, so the summaries no longer describe anything.
+            if self.store.generation != self._generation:
+                self._generation = self.store.generation
+                self._summaries.clear()
+            state = self._summaries.get(budget)
+            if state is None:
+                state = self._summaries[budget] = _Summary()
+
+            # Fill the budget from the newest turn backwards, leaving room for the summary.
+            available = budget - min(self.summary_budget, budget // 4)
+            start = len(turns)
+            used = 0
+            while start > 0 and used + turns[start - 1]["tokens"] <= available:
+                start -= 1
+                used += turns[start]["tokens"]
+
+            # Fold newly evicted turns into the summary (only happens when the window moved).
+            evicted = [turn for turn in turns[:start] if turn["seq"] > state.upto]
+            if evicted:
+                self._fold(state, evicted)
+                state.upto = evicted[-1]["seq"]
+
+            # The window can grow back (e.g. long turns were replaced by short ones); drop summary lines for turns shown in full.
+            if start < len(turns) and state.lines and state.lines[-1][1] >= turns[start]["seq"]:
+                state.lines = [(line, seq) for line, seq in state.lines if seq < turns[start]["seq"]]
+                state.text = "\n".join(line for line, _ in state.lines)
+                state.upto = turns[start]["seq"] - 1
+
+            summary = state.text
+
+        messages = [{"role": turn["role"], "content": turn["content"]} for turn in turns[start:]]
+        if summary:
+            messages.insert(0, {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        return messages
+
+# The history window shared by the chatbot and the realtime search engine.
+ChatHistory = HistoryManager()
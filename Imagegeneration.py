@@ -0,0 +1,197 @@
+import os # image folder
+import json # cache keys are built from the request as JSON
+import time # stub latency and timing
+import zlib # building PNG files for the stub backend
+import queue # image requests are handed to the service through a queue
+import struct # PNG chunk layout for the stub backend
+import hashlib # content-addressed file names
+import requests # Hugging Face inference API
+import threading # the service runs in the background
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed # parallel variant requests
+from dotenv import dotenv_values # API key and backend choice from the .env file
+
+env_vars = dotenv_values(".env")
+HuggingFaceAPIKey = env_vars.get("HuggingFaceAPIKey")
+ImageBackendName = env_vars.get("ImageBackend", "huggingface")
+
+# Generated images, named by the hash of the prompt and parameters.
+ImageFolder = os.path.join("Data", "Images")
+
+# Variants made per request and how many requests to the backend may run at once.
+DefaultVariants = 4
+ImageWorkers = 4
+
+class HuggingFaceBackend:
+    """Stable Diffusion through the Hugging Face inference API (JPEG output)."""
+    name = "huggingface"
+    extension = "jpg"
+
+    def __init__(self, model="stabilityai/stable-diffusion-xl-base-1.0", api_key=HuggingFaceAPIKey, timeout=60, attempts=3):
+        self.model = model
+        self.url = f"https://api-inference.huggingface.co/models/{model}"
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+        self.timeout = timeout
+        self.attempts = attempts
+        self.session = requests.Session()
+
+    def generate(self, prompt, seed, params):
+        payload = {"inputs": f"{prompt}, seed={seed}", "parameters": dict(params, seed=seed)}
+        for attempt in range(self.attempts):
+            response = self.session.post(self.url, headers=self.headers, json=payload, timeout=self.timeout)
+            # 503 means the model is still loading; the API says how long that takes.
+            if response.status_code == 503 and attempt + 1 < self.attempts:
+                try:
+                    wait_for = float(response.json().get("estimated_time", 5))
+                except ValueError:
+                    wait_for = 5
+                time.sleep(min(wait_for, 20))
+                continue
+            response.raise_for_status()
+            return response.content
+        raise RuntimeError(f"{self.model} is not available right now")
+
+def _png(width, height, color):
+    """A solid-color PNG file."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+    row = b"\x00" + bytes(color) * width
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(row * height)) + chunk(b"IEND", b""))
+
+class StubImageBackend:
+    """Offline stand-in: waits like the API would and returns a small PNG colored by prompt and seed."""
+    name = "stub"
+    extension = "png"
+
+    def __init__(self, latency=0.2):
+        self.model = "stub"
+        self.latency = latency
+        self.calls = 0
+
+    def generate(self, prompt, seed, params):
+        self.calls += 1
+        time.sleep(self.latency)
+        digest = hashlib.sha256(f"{prompt}\0{seed}".encode("utf-8")).digest()
+        return _png(64, 64, digest[:3])
+
+def ImageKey(backend, prompt, seed, params):
+    """Hash of everything that decides what the image looks like."""
+    request = {"backend": backend.name, "model": backend.model, "prompt": " ".join(prompt.split()), "seed": seed, "params": params}
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+class ImageRequest:
+    """One queued request; future resolves to the list of image paths in variant order."""
+
+    def __init__(self, prompt, variants, params, on_image):
+        self.prompt = prompt
+        self.variants = variants
+        self.params = params
+        self.on_image = on_image
+        self.future = Future()
+
+class ImageService:
+    """Takes image requests from a queue and generates their variants on a bounded worker pool.
+
+    Every variant has its own seed, and images are cached on disk by the hash of prompt, seed and
+    parameters, so a repeated prompt returns at once. Images are written, and on_image is called,
+    as each variant finishes rather than when the whole request is done.
+    """
+
+    def __init__(self, backend=None, folder=ImageFolder, workers=ImageWorkers):
+        self.backend = backend or (StubImageBackend() if ImageBackendName == "stub" else HuggingFaceBackend())
+        self.folder = folder
+        self.requests = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image")
+        self.stats = {"requests": 0, "images": 0, "cache_hits": 0, "failures": 0, "generation_time": 0.0}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._serve, name="ImageService", daemon=True)
+                self._thread.start()
+
+    def submit(self, prompt, variants=DefaultVariants, params=None, on_image=None):
+        """Queue a request and return a Future of its image paths."""
+        self._start()
+        request = ImageRequest(prompt, variants, params or {}, on_image)
+        self.requests.put(request)
+        return request.future
+
+    def _serve(self):
+        while True:
+            request = self.requests.get()
+            # Variants of the next request start as soon as workers free up, without waiting for this one.
+            threading.Thread(target=self._run, args=(request,), daemon=True).start()
+
+    def _variant(self, request, seed):
+        key = ImageKey(self.backend, request.prompt, seed, request.params)
+        path = os.path.join(self.folder, f"{key}.{self.backend.extension}")
+        if os.path.isfile(path):
+            with self._lock:
+                self.stats["cache_hits"] += 1
+            return path
+
+        started = time.perf_counter()
+        image = self.backend.generate(request.prompt, seed, request.params)
+        os.makedirs(self.folder, exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(image)
+        os.replace(temp_path, path)
+        with self._lock:
+            self.stats["images"] += 1
+            self.stats["generation_time"] += time.perf_counter() - started
+        return path
+
+    def _run(self, request):
+        with self._lock:
+            self.stats["requests"] += 1
+        futures = {self.executor.submit(self._variant, request, seed): seed for seed in range(request.variants)}
+        paths = [None] * request.variants
+        errors = []
+        for future in as_completed(futures):
+            seed = futures[future]
+            try:
+                paths[seed] = future.result()
+            except Exception as e:
+                with self._lock:
+                    self.stats["failures"] += 1
+                errors.append(e)
+                print(f"Image generation failed for variant {seed}: {e}")
+                continue
+            if request.on_image:
+                try:
+                    request.on_image(paths[seed])
+                except Exception as e:
+                    print(f"Could not show {paths[seed]}: {e}")
+
+        finished = [path for path in paths if path]
+        if finished or not errors:
+            request.future.set_result(finished)
+        else:
+            request.future.set_exception(errors[0])
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats)
+
+# The service used by GenerateImages().
+Images = ImageService()
+
+def GenerateImages(prompt, variants=DefaultVariants, params=None, on_image=None):
+    """Generate images for prompt and return their paths (blocks until every variant is done)."""
+    return Images.submit(prompt, variants, params, on_image).result()
+
+def GetImageStats():
+    """Return request, image, cache hit and failure counts."""
+    return Images.get_stats()
+
+# Main program entry point.
+if __name__ == "__main__":
+    while True:
+        prompt = input("Enter the image prompt: ")
+        started = time.perf_counter()
+        paths = GenerateImages(prompt, on_image=lambda path: print(f"Saved {path}"))
+        print(f"{len(paths)} images in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,149 @@
+import asyncio # run independent tasks concurrently
+import contextvars # carry the current trace span into worker threads
+import webbrowser # open search pages in the default browser
+import urllib.parse # quote search terms for URLs
+import pathlib # file URLs for generated images
+from concurrent.futures import ThreadPoolExecutor # worker threads for the blocking handlers
+from Modal import FirstLayerDMM # decision-making model that splits a query into tasks
+from Chatbot import Chatbot # answers 'general' tasks
+from RealtimeSearchEngine import RealtimeSearchEngine # answers 'realtime' tasks
+from Imagegeneration import GenerateImages # answers 'generate image' tasks
+from Automation import OpenApp, CloseApp # answers 'open' and 'close' tasks
+from Speculation import Speculate # opt-in search while the classifier waits on Cohere
+import Tracing # per-stage spans, counters and the /metrics endpoint
+
+# How many tasks of each category may run at the same time, across all commands.
+CategoryLimits = {
+    "llm": 2,          # Groq completions (general, realtime, content)
+    "automation": 4,   # opening apps, browser searches, media
+    "image": 1,        # image generation
+}
+
+# Seconds a whole compound command may take before unfinished tasks are given up on.
+DispatchTimeout = 60
+
+# One pool per category, sized to its limit, so the limits hold across commands (each command runs
+# in its own event loop). A thread cannot be stopped: a task that is given up on while its handler
+# runs keeps its worker until the handler returns, and later tasks of that category queue behind it.
+# Tasks given up on before they started never run.
+CategoryExecutors = {
+    category: ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f"task-{category}")
+    for category, limit in CategoryLimits.items()
+}
+
+def GoogleSearchTask(topic):
+    webbrowser.open(f"https://www.google.com/search?q={urllib.parse.quote(topic)}")
+    return f"Searching Google for {topic}."
+
+def YouTubeSearchTask(topic):
+    webbrowser.open(f"https://www.youtube.com/results?search_query={urllib.parse.quote(topic)}")
+    return f"Searching YouTube for {topic}."
+
+def PlayTask(song):
+    webbrowser.open(f"https://www.youtube.com/results?search_query={urllib.parse.quote(song)}")
+    return f"Playing {song}."
+
+def ContentTask(topic):
+    return Chatbot(f"Write {topic}")
+
+def GenerateImageTask(prompt):
+    # Each image is shown as soon as it is ready, not when the last variant finishes.
+    paths = GenerateImages(prompt, on_image=lambda path: webbrowser.open(pathlib.Path(path).resolve().as_uri()))
+    if not paths:
+        return f"Sorry, I couldn't generate images of {prompt}."
+    return f"Generated {len(paths)} images of {prompt}."
+
+# Task prefix -> (category, blocking handler that takes the rest of the task text).
+# Prefixes are matched longest first, so 'google search' wins over shorter keywords.
+TaskHandlers = {
+    "general": ("llm", Chatbot),
+    "realtime": ("llm", RealtimeSearchEngine),
+    "content": ("llm", ContentTask),
+    "google search": ("automation", GoogleSearchTask),
+    "youtube search": ("automation", YouTubeSearchTask),
+    "play": ("automation", PlayTask),
+    "open": ("automation", OpenApp),
+    "close": ("automation", CloseApp),
+    "generate image": ("image", GenerateImageTask),
+}
+
+def ResolveTask(task):
+    """Split a task like 'open chrome' into (prefix, argument, category, handler), or None if unknown."""
+    for prefix in sorted(TaskHandlers, key=len, reverse=True):
+        if task == prefix or task.startswith(prefix + " "):
+            category, handler = TaskHandlers[prefix]
+            return prefix, task[len(prefix):].strip(), category, handler
+    return None
+
+async def RunTask(task):
+    """Run one task in a worker thread of its category's pool."""
+    if task.startswith("error"):
+        return task  # classification errors are reported as they are
+
+    resolved = ResolveTask(task)
+    if resolved is None:
+        return f"Sorry, I can't handle '{task}' yet."
+
+    prefix, argument, category, handler = resolved
+    try:
+        # The handler runs in a copy of this task's context so its spans nest under the turn.
+        with Tracing.Span("task", prefix=prefix):
+            call = contextvars.copy_context().run
+            return await asyncio.get_running_loop().run_in_executor(CategoryExecutors[category], call, handler, argument)
+    except Exception as e:
+        Tracing.RecordError("task", e)
+        print(f"Task '{task}' failed: {e}")
+        return f"Sorry, '{prefix}' failed: {e}"
+
+async def ExecuteTasks(tasks, timeout=DispatchTimeout):
+    """Run the tasks from FirstLayerDMM concurrently and return (task, answer) pairs in the original order.
+
+    Independent tasks overlap, so a compound command takes about as long as its slowest task.
+    Tasks not finished after timeout seconds are reported as cancelled; one whose handler already
+    started finishes in the background (see CategoryExecutors).
+    """
+    running = [asyncio.create_task(RunTask(task)) for task in tasks]
+
+    done, pending = await asyncio.wait(running, timeout=timeout)
+    for future in pending:
+        future.cancel()
+    if pending:
+        Tracing.Count("task_timeouts", len(pending))
+
+    answers = []
+    for task, future in zip(tasks, running):
+        if future in done:
+            answers.append((task, future.result()))
+        else:
+            answers.append((task, f"Sorry, '{task}' took too long, so I stopped waiting for it."))
+    return answers
+
+def MainExecution(query):
+    """Classify a query and run its tasks. Returns False when the user asked to exit."""
+    with Tracing.Span("turn"):
+        # With SpeculativeSearch=on, a probable realtime search starts while FirstLayerDMM asks Cohere.
+        speculation = Speculate(query)
+        tasks = FirstLayerDMM(query)
+        if speculation is not None:
+            speculation.resolve(tasks)
+        if any(task == "exit" for task in tasks):
+            return False
+
+        answers = asyncio.run(ExecuteTasks(tasks))
+    for task, answer in answers:
+        print(answer)
+    return True
+
+# Main program entry point.
+if __name__ == "__main__":
+    # With NOVA_TRACE=1 and NOVA_METRICS_PORT set, counters and span timings are served at /metrics.
+    if Tracing.Enabled and Tracing.MetricsPort:
+        Tracing.StartMetricsServer()
+    while True:
+        try:
+            if not MainExecution(input(">>> ")):
+                print("Goodbye!")
+                break
+        except KeyboardInterrupt:
+            print("\nGoodbye!")
+            break
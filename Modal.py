@@ -1,6 +1,11 @@
-import cohere # import the Cohere library for ai services
+import os # import os to build the decision cache path
+import re # import regular expressions for the local intent matcher
+import time # import time for the retry time budget
 from rich import print # import the Rich library to enhance terminal output
 from dotenv import dotenv_values # import dotenv to load envirement varibles from a.env file.
+from Cache import PersistentLRUCache # import the shared LRU/TTL cache with SQLite backing
+import Tracing # import the span and counter helpers for per-stage metrics
+from Startup import LazyClient # import the background client warm-up
 
 # Load envirement variables from a .env file
 env_vars = dotenv_values(".env")
@@ -8,8 +13,12 @@ env_vars = dotenv_values(".env")
 # Retrieve API key.
 CohereAPIKey = env_vars.get("COHERE_API_KEY")
 
-# Create a cohere client using the provided API key.
-co = cohere.Client(CohereAPIKey)
+def _cohere_client():
+    import cohere # import the Cohere library here: loading it takes about half a second
+    return cohere.Client(CohereAPIKey)
+
+# Create a cohere client using the provided API key, on a background thread (the first remote classification waits for it).
+co = LazyClient("cohere", _cohere_client).start()
 
 # Define a list of recognized function keywords for task categorization.
 funcs = [
@@ -18,9 +27,6 @@ funcs = [
     "youtube search" , "reminder"
 ] 
 
-# Initialize an empty list to store user messages.
-messages = []
-
 # Define the preamble that guides the AI model on how to categorize queries.
 preamble = """You are a very accurate Decision-Making Model, which decides what kind of a query is given to you.
 You will decide whether a query is a 'general' query, a 'realtime' query, or is asking to perform any task or automation like 'open facebook, instagram', 'can you write a application and open it in notepad'
@@ -55,68 +61,225 @@ ChatHistory = [
     {"role": "chatbot", "message": "general chat with me"}
 ]
 
+# Minimum confidence the local classifier needs before we skip the Cohere call.
+LocalConfidenceThreshold = 0.8
+
+# Counters so we can see how many remote classifications the local stage saves.
+ClassifierStats = {"local_hits": 0, "remote_calls": 0}
+
+def _normalize(text):
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return " ".join(text.lower().split()).strip(" ?!.")
+
+# Few-shot examples from the chat history, keyed by the normalized user message.
+FewShotDecisions = {
+    _normalize(user["message"]): [t.strip() for t in bot["message"].split(",")]
+    for user, bot in zip(ChatHistory[0::2], ChatHistory[1::2])
+}
+
+# Phrases that mean the same thing as one of the function keywords, with how sure a match makes us.
+IntentAliases = [
+    (r"search (?:on )?google (?:for )?", "google search", 0.9),
+    (r"google ", "google search", 0.9),
+    (r"search (?:on )?youtube (?:for )?", "youtube search", 0.9),
+    (r"youtube ", "youtube search", 0.9),
+    (r"remind me (?:to |that |about )?", "reminder", 0.9),
+    (r"(?:launch|start up) ", "open", 0.9),
+    # "kill bill movie review" is not a command, so these verbs are only a hint and Cohere decides.
+    (r"(?:shut down|quit|kill) ", "close", 0.6),
+    (r"(?:create|draw|make) (?:an? )?(?:image|picture|photo) (?:of )?", "generate image", 0.9),
+    (r"write (?:me )?", "content", 0.9),
+    # A lookahead, so the command itself ("mute", "volume up") stays the argument and needs nothing after it.
+    (r"(?=(?:mute|unmute|volume up|volume down|shutdown|restart|lock)\b)", "system", 0.9),
+]
+
+# Keywords that are labels rather than something a user says, so they are never matched literally.
+LabelOnlyFuncs = ("general", "realtime", "content", "system")
+
+# Build one compiled prefix matcher from the function keywords (longest first) and the aliases.
+_literal_funcs = sorted((func for func in funcs if func not in LabelOnlyFuncs), key=len, reverse=True)
+_keyword_pattern = "|".join(f"(?P<f{i}>{re.escape(func)}\\b\\s*)" for i, func in enumerate(_literal_funcs))
+_alias_pattern = "|".join(f"(?P<a{i}>{pattern})" for i, (pattern, _, _) in enumerate(IntentAliases))
+IntentMatcher = re.compile(f"^(?:please |can you |could you )?(?:{_keyword_pattern}|{_alias_pattern})", re.IGNORECASE)
+_group_intents = {f"f{i}": func for i, func in enumerate(_literal_funcs)}
+_group_intents.update({f"a{i}": intent for i, (_, intent, _) in enumerate(IntentAliases)})
+_alias_confidence = {f"a{i}": confidence for i, (_, _, confidence) in enumerate(IntentAliases)}
+
+# Separators that may join several intents in one query ("open chrome and firefox").
+IntentSplitter = re.compile(r"\s*(,|\band\b|\bthen\b|\balso\b)\s*", re.IGNORECASE)
+
+# Short conversational phrases that are always 'general'.
+SmallTalk = re.compile(r"^(?:hi|hello|hey|thanks|thank you|good (?:morning|night|evening)|how are you|who are you|chat with me)\b", re.IGNORECASE)
+
+# Words that strongly suggest the query needs up-to-date information.
+RealtimeHints = re.compile(r"\b(?:news|headlines|weather|net ?worth|stock|share price|price of|score|latest|current|live|trending|election)\b", re.IGNORECASE)
+
+# Questions that ask for an explanation rather than fresh facts.
+ExplainStarters = re.compile(r"^(?:tell me (?:about|a joke)|explain|define|describe|what does .+ mean|how to|how do i)\b", re.IGNORECASE)
+
+def _classify_segment(segment):
+    """Classify one piece of a query. Returns (intent, argument, confidence) or None if no verb was found."""
+    match = IntentMatcher.match(segment)
+    if match:
+        intent = _group_intents[match.lastgroup]
+        argument = segment[match.end():].strip()
+        if intent == "exit" or argument:
+            # Literal keywords are more reliable than aliases.
+            return intent, argument, _alias_confidence.get(match.lastgroup, 0.95)
+    return None
+
+@Tracing.Traced("classify.local")
+def LocalClassify(prompt):
+    """Classify a query without a network call. Returns (tasks, confidence)."""
+    normalized = _normalize(prompt)
+
+    # Exact few-shot examples are answered with the recorded decision.
+    if normalized in FewShotDecisions:
+        return list(FewShotDecisions[normalized]), 1.0
+
+    if not normalized:
+        return [f"general {prompt}"], 0.0
+
+    # Split on separators, keeping them so non-intent pieces can be glued back on.
+    pieces = IntentSplitter.split(normalized)
+    tasks = []  # [intent, argument, confidence]
+    for index in range(0, len(pieces), 2):
+        piece = pieces[index]
+        separator = pieces[index - 1] if index else ""
+        if not piece:
+            continue  # back-to-back separators such as ", then"
+        result = _classify_segment(piece)
+        if result:
+            tasks.append(list(result))
+        elif tasks and tasks[-1][0] in ("open", "close") and len(piece.split()) <= 3:
+            # "open chrome and firefox" -> the verb carries over to the next app.
+            tasks.append([tasks[-1][0], piece, tasks[-1][2]])
+        elif tasks and (not tasks[-1][0] or len(piece.split()) <= 3):
+            # Not a new intent, so it belongs to the previous task's argument ("play rock and roll").
+            glue = ", " if separator == "," else f" {separator} "
+            tasks[-1][1] = f"{tasks[-1][1]}{glue}{piece}".strip()
+        else:
+            tasks.append(["", piece, 0.0])
+
+    # Pieces without an explicit verb are general or realtime questions.
+    decided = []
+    for intent, argument, confidence in tasks:
+        if not intent:
+            if SmallTalk.match(argument):
+                intent, confidence = "general", 0.9
+            elif RealtimeHints.search(argument):
+                intent, confidence = "realtime", 0.85
+            elif ExplainStarters.match(argument):
+                intent, confidence = "general", 0.8
+            else:
+                intent, confidence = "general", 0.5
+        decided.append((f"{intent} {argument}".strip(), confidence))
+
+    return [task for task, _ in decided], min(confidence for _, confidence in decided)
+
+# Cache of Cohere decisions keyed by the normalized prompt, kept on disk across restarts.
+DecisionCache = PersistentLRUCache(os.path.join("Data", "DecisionCache.db"), max_entries=1024, ttl=7 * 24 * 3600, table="decisions")
+
+# Limits for re-asking Cohere when it answers with the '(query)' placeholder.
+MaxClassifyAttempts = 3
+RetryTimeBudget = 8.0  # seconds
+
+def GetDecisionCacheStats():
+    """Return hit/miss/eviction statistics for the decision cache."""
+    return DecisionCache.get_stats()
+
+def GetClassifierStats():
+    """Return the local/remote classification counters and the local hit rate."""
+    total = ClassifierStats["local_hits"] + ClassifierStats["remote_calls"]
+    stats = dict(ClassifierStats)
+    stats["hit_rate"] = ClassifierStats["local_hits"] / total if total else 0.0
+    return stats
+
 # Define the main function for decision-making on queries.
+@Tracing.Traced("classify")
 def FirstLayerDMM(prompt: str = "test"):
     try:
+        # Try the local classifier first; only low-confidence queries go to Cohere.
+        local_tasks, confidence = LocalClassify(prompt)
+        if confidence >= LocalConfidenceThreshold:
+            ClassifierStats["local_hits"] += 1
+            Tracing.Count("classify_local_hits")
+            return local_tasks
+
+        # Repeated commands are answered from the decision cache without calling Cohere.
+        cache_key = _normalize(prompt)
+        cached = DecisionCache.get(cache_key)
+        if cached:
+            return list(cached)  # a copy, so callers that edit their tasks leave the cached decision alone
+
         # Check if API key is available
         if not CohereAPIKey:
             return ["error: Cohere API key not found. Please check your .env file."]
 
-        # Add the user's query to the messages list.
-        messages.append({"role": "user", "content": f"{prompt}"})
-
-        # Create a chat session with Cohere model.
-        chat_response = co.chat(
-            message=prompt,  # pass the user's query.
-            model='c4ai-aya-expanse-8b',  # use the Aya Expanse model
-            temperature=0.7,  # set the creativity level of the model.
-            chat_history=[{"role": m["role"], "message": m["message"]} for m in ChatHistory],  # format chat history properly
-            preamble=preamble,  # pass the detailed instructions preamble.
-            prompt_truncation='AUTO'  # Let Cohere handle truncation automatically
-        )
-        
-        if not chat_response or not hasattr(chat_response, 'text'):
-            return ["error: Invalid response from Cohere API"]
-
-        # Get the response text
-        response = chat_response.text
-
-        # Remove newline characters and split response into individual tasks.
-        response = response.replace("\n", "")
-        response = response.split(",")
-
-        # Strip leading and trailing whitespace from each task.
-        response = [i.strip() for i in response]
-
-        # Initialize an empty list to filter valid tasks.
-        temp = []
-
-        # Filter the tasks based on recognized function keywords.
-        for task in response:
-            for func in funcs:
-                if task.startswith(func):
-                    temp.append(task)  # add valid task to the filtered list.
-
-        # Update the response with the filtered list of tasks.
-        response = temp
-
-        # If empty response, treat as general query
-        if not response:
-            return [f"general {prompt}"]
-
-        # If '(query)' in the response, recursively call the function for further clarification.
-        if "(query)" in str(response):
-            newresponse = FirstLayerDMM(prompt=prompt)
-            return newresponse  # Return the clarified response.
-        else:
-            return response  # Return the filtered response.
+        # Ask Cohere, retrying a bounded number of times while the reply still contains '(query)'.
+        deadline = time.monotonic() + RetryTimeBudget
+        for attempt in range(MaxClassifyAttempts):
+            # Create a chat session with Cohere model.
+            ClassifierStats["remote_calls"] += 1
+            Tracing.Count("classify_remote_calls")
+            if attempt:
+                Tracing.Count("classify_retries")
+            with Tracing.Span("classify.cohere", attempt=attempt):
+                chat_response = co.chat(
+                    message=prompt,  # pass the user's query.
+                    model='c4ai-aya-expanse-8b',  # use the Aya Expanse model
+                    temperature=0.7,  # set the creativity level of the model.
+                    chat_history=[{"role": m["role"], "message": m["message"]} for m in ChatHistory],  # format chat history properly
+                    preamble=preamble,  # pass the detailed instructions preamble.
+                    prompt_truncation='AUTO'  # Let Cohere handle truncation automatically
+                )
+
+            if not chat_response or not hasattr(chat_response, 'text'):
+                return ["error: Invalid response from Cohere API"]
+
+            # Get the response text
+            response = chat_response.text
+
+            # Remove newline characters and split response into individual tasks.
+            response = response.replace("\n", "")
+            response = response.split(",")
+
+            # Strip leading and trailing whitespace from each task.
+            response = [i.strip() for i in response]
+
+            # Initialize an empty list to filter valid tasks.
+            temp = []
+
+            # Filter the tasks based on recognized function keywords.
+            for task in response:
+                for func in funcs:
+                    if task.startswith(func):
+                        temp.append(task)  # add valid task to the filtered list.
+
+            # Update the response with the filtered list of tasks.
+            response = temp
+
+            # If empty response, treat as general query
+            if not response:
+                return [f"general {prompt}"]
+
+            # A clean answer is cached and returned.
+            if "(query)" not in str(response):
+                DecisionCache.set(cache_key, list(response))
+                return response
+
+            # If '(query)' is still in the response, try again while there is time left.
+            if time.monotonic() >= deadline:
+                break
+
+        # Out of attempts: the local classifier's best guess is better than a placeholder.
+        return local_tasks
 
     except Exception as e:
         error_msg = str(e)
+        Tracing.RecordError("classify", e)
         print(f"Error: {error_msg}")
         return ["error: " + error_msg]  # Return error message in the expected format
-        
-    return response  # Return the filtered response
 
 # Entry point for the script.
 if __name__ == "__main__":
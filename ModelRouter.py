@@ -0,0 +1,323 @@
+import time # catalog age, breaker timeouts
+import threading # the router is shared by the chatbot and the realtime engine
+from dotenv import dotenv_values # the Groq API key lives in .env
+import Tracing # breaker and fallback counters
+from Startup import LazyClient, StartWarmUp # the client and the model list load in the background
+from Streaming import StreamEvents, GroqDeltas # streamed completions
+
+GroqAPIKey = dotenv_values(".env").get("GroqAPIKey")
+
+def _groq_client():
+    from groq import Groq # imported here: loading the SDK takes a few hundred milliseconds
+    return Groq(api_key=GroqAPIKey)
+
+# One Groq client for the whole assistant (None when no key is configured), built on a background thread.
+Client = LazyClient("groq", _groq_client).start() if GroqAPIKey else None
+
+# How long the model list is trusted before it is fetched again.
+CatalogTTL = 3600
+
+# Model ids containing these words cannot answer chat completions.
+NonChatModelWords = ("whisper", "tts", "embed", "guard", "playai", "orpheus", "prompt-guard")
+
+# Request class -> tiers of models. The fastest healthy model of the first tier that has one wins;
+# later tiers are fallbacks. Models that are not in the catalog are skipped.
+RequestClasses = {
+    "chat": [["llama-3.1-8b-instant", "groq/compound-mini"], ["groq/compound"]],
+    "realtime": [["llama-3.3-70b-versatile", "groq/compound"], ["llama-3.1-8b-instant"]],
+}
+
+# Expected time to first token (seconds) before a model has been measured.
+ExpectedLatency = {
+    "llama-3.1-8b-instant": 0.2,
+    "llama-3.3-70b-versatile": 0.4,
+    "groq/compound-mini": 0.6,
+    "groq/compound": 0.9,
+}
+DefaultExpectedLatency = 1.0
+
+# Smoothing of the moving averages; higher follows recent requests more closely.
+LatencyAlpha = 0.3
+ErrorAlpha = 0.2
+
+# A model's score is its latency multiplied by (1 + ErrorPenalty * error rate).
+ErrorPenalty = 4.0
+
+def IsChatModel(model_id):
+    """True for models that can answer chat completions."""
+    lowered = model_id.lower()
+    return not any(word in lowered for word in NonChatModelWords)
+
+class CircuitBreaker:
+    """Stops calls to a failing dependency for a while, then lets a single trial call through.
+
+    closed: calls pass; failure_threshold consecutive failures open the breaker.
+    open: calls are refused until reset_timeout seconds have passed.
+    half_open: one trial call passes; success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go ahead now."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self._trial_running = False
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def release(self):
+        """Give back a half-open trial that was claimed but not used."""
+        with self._lock:
+            self._trial_running = False
+
+    def would_allow(self):
+        """Like allow() but without claiming the half-open trial (for ranking candidates)."""
+        with self._lock:
+            if self.state == "open":
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return not (self.state == "half_open" and self._trial_running)
+
+    def success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    Tracing.Count("breaker_opened")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+class ModelCatalog:
+    """The provider's model list, fetched at most once per ttl and filtered to chat models."""
+
+    def __init__(self, client, ttl=CatalogTTL):
+        self.client = client
+        self.ttl = ttl
+        self.fetched_at = None
+        self._models = []
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.RLock()  # one fetch at a time; others wait for its result
+
+    def refresh(self):
+        """Fetch the model list now; raises when the provider cannot be reached."""
+        with self._refresh_lock:
+            models = self.client.models.list()
+            chat_models = [model.id for model in models.data if IsChatModel(model.id)]
+            with self._lock:
+                self._models = chat_models
+                self.fetched_at = time.monotonic()
+        Tracing.Count("catalog_refreshes")
+        return chat_models
+
+    def _cached(self):
+        with self._lock:
+            return self.fetched_at is not None and time.monotonic() - self.fetched_at < self.ttl, list(self._models)
+
+    def models(self):
+        """Chat-capable model ids; an old list is kept when a refresh fails."""
+        fresh, models = self._cached()
+        if fresh or self.client is None:
+            return models
+        with self._refresh_lock:
+            # Another thread (usually the startup warm-up) may have fetched the list while we waited.
+            fresh, models = self._cached()
+            if fresh:
+                return models
+            try:
+                return self.refresh()
+            except Exception as e:
+                Tracing.RecordError("catalog", e)
+                print(f"Could not refresh the model list, using the previous one: {e}")
+                with self._lock:
+                    # Try again after a minute rather than on every request.
+                    self.fetched_at = time.monotonic() - self.ttl + 60
+                return models
+
+    def discard(self, model_id):
+        """Forget a model the provider says no longer exists."""
+        with self._lock:
+            if model_id in self._models:
+                self._models.remove(model_id)
+
+class ModelHealth:
+    """Moving averages of one model's time to first token and error rate, plus its breaker."""
+
+    def __init__(self, model_id):
+        self.latency = ExpectedLatency.get(model_id, DefaultExpectedLatency)
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.breaker = CircuitBreaker()
+
+    def score(self):
+        return self.latency * (1 + ErrorPenalty * self.error_rate)
+
+class ModelRouter:
+    """Picks a model per request from a cached catalog, by measured speed and health.
+
+    The provider itself also has a breaker: when every call fails (no network, bad key) requests
+    are refused straight away for a while instead of each one waiting for a timeout.
+    """
+
+    def __init__(self, client, request_classes=RequestClasses, catalog_ttl=CatalogTTL):
+        self.client = client
+        self.request_classes = request_classes
+        self.catalog = ModelCatalog(client, ttl=catalog_ttl)
+        self.provider_breaker = CircuitBreaker(failure_threshold=3, reset_timeout=15.0)
+        self.health = {}
+        self._lock = threading.Lock()
+
+    def _health(self, model_id):
+        with self._lock:
+            health = self.health.get(model_id)
+            if health is None:
+                health = self.health[model_id] = ModelHealth(model_id)
+            return health
+
+    def available(self):
+        """False while the provider breaker is open."""
+        return self.provider_breaker.would_allow()
+
+    def candidates(self, request_class="chat"):
+        """Models to try for a request, best first: healthy models of each tier by score, then other chat models."""
+        catalog = self.catalog.models()
+        known = set(catalog)
+        ordered = []
+        for tier in self.request_classes.get(request_class, []) + [catalog]:
+            tier_models = [model for model in tier if (not known or model in known) and model not in ordered]
+            healthy = [model for model in tier_models if self._health(model).breaker.would_allow()]
+            ordered.extend(sorted(healthy, key=lambda model: self._health(model).score()))
+        return ordered
+
+    def choose(self, request_class="chat"):
+        """The model a request of this class should use now."""
+        models = self.candidates(request_class)
+        return models[0] if models else self.request_classes.get(request_class, [["groq/compound"]])[0][0]
+
+    def begin(self, model_id):
+        """Ask both breakers whether a call to model_id may start now."""
+        breaker = self._health(model_id).breaker
+        if not breaker.allow():
+            return False
+        if not self.provider_breaker.allow():
+            breaker.release()
+            return False
+        return True
+
+    def record_success(self, model_id, ttft):
+        """Report a completed call and its time to first token (seconds)."""
+        health = self._health(model_id)
+        with self._lock:
+            health.requests += 1
+            health.latency += LatencyAlpha * (ttft - health.latency)
+            health.error_rate *= 1 - ErrorAlpha
+        health.breaker.success()
+        self.provider_breaker.success()
+
+    def record_failure(self, model_id, error):
+        """Report a failed call; models the provider does not know are dropped from the catalog."""
+        health = self._health(model_id)
+        with self._lock:
+            health.requests += 1
+            health.failures += 1
+            health.error_rate += ErrorAlpha * (1 - health.error_rate)
+        health.breaker.failure()
+        self.provider_breaker.failure()
+        if getattr(error, "status_code", None) == 404:
+            self.catalog.discard(model_id)
+
+    def get_stats(self):
+        """Per-model latency, error rate and breaker state."""
+        with self._lock:
+            return {
+                model_id: {
+                    "latency": health.latency,
+                    "error_rate": health.error_rate,
+                    "requests": health.requests,
+                    "failures": health.failures,
+                    "breaker": health.breaker.state,
+                }
+                for model_id, health in self.health.items()
+            }
+
+# The router shared by the chatbot and the realtime search engine.
+Router = ModelRouter(Client)
+
+# Fetch the model list in the background; this also opens the connection the first completion reuses.
+if Client is not None:
+    StartWarmUp("model catalog", Router.catalog.models)
+
+def GetRouterStats():
+    """Return the shared router's per-model statistics."""
+    stats = Router.get_stats()
+    stats["provider"] = {"breaker": Router.provider_breaker.state}
+    return stats
+
+class NoModelAvailable(Exception):
+    """Raised when every candidate model is failing or refused by its breaker."""
+
+def StreamCompletion(request_class, messages, started_at, name, router=None, **params):
+    """Stream a chat completion from the best model for request_class, falling back before the first token.
+
+    Yields the events of Streaming.StreamEvents; the "done" event also names the model that answered.
+    Once text has reached the caller, switching models would repeat it: a failure then ends the stream
+    with a done event holding the partial text and "error" (and counts against the model).
+    """
+    router = router or Router
+    last_error = None
+    attempts = 0
+    for model_id in router.candidates(request_class):
+        if not router.begin(model_id):
+            continue
+        if attempts:
+            Tracing.Count("model_fallbacks")
+        attempts += 1
+        requested_at = time.perf_counter()
+        streamed_any = False
+
+        def broke_off(error, model_id=model_id):
+            router.record_failure(model_id, error)
+            Tracing.RecordError("model", error)
+            print(f"\nModel {model_id} stopped mid-answer: {error}")
+
+        try:
+            completion = router.client.chat.completions.create(model=model_id, messages=messages, stream=True, **params)
+            # Clean up any unwanted tokens as the deltas arrive.
+            deltas = (delta.replace("</s>", "") for delta in GroqDeltas(completion))
+            for event in StreamEvents(deltas, started_at, name, on_error=broke_off):
+                if not streamed_any:
+                    streamed_any = True
+                    router.record_success(model_id, time.perf_counter() - requested_at)
+                if event["type"] == "done":
+                    event["model"] = model_id
+                yield event
+            return
+        except Exception as e:
+            router.record_failure(model_id, e)
+            Tracing.RecordError("model", e)
+            print(f"\nError encountered with model {model_id}: {e}")
+            if streamed_any:
+                raise
+            last_error = e
+    raise NoModelAvailable(f"No {request_class} model is available right now.") from last_error
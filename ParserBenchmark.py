@@ -0,0 +1,62 @@
+import os # find the fixture pages
+import sys # exit code for the CI check
+import time # timing
+from SnippetExtractor import ExtractBingSnippets # single-pass extractor
+from RealtimeSearchEngine import parse_bing_html_bs4 # BeautifulSoup extractor
+
+# Saved Bing result pages used as parser fixtures.
+FixtureFolder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Fixtures")
+
+Backends = {
+    "bs4": parse_bing_html_bs4,
+    "fast": ExtractBingSnippets,
+}
+
+def LoadFixtures():
+    """Return {file name: html} for every saved Bing page."""
+    pages = {}
+    for name in sorted(os.listdir(FixtureFolder)):
+        if name.startswith("bing_") and name.endswith(".html"):
+            with open(os.path.join(FixtureFolder, name), "r", encoding="utf-8") as f:
+                pages[name] = f.read()
+    return pages
+
+def CheckIdentical(pages):
+    """Return the fixtures on which the backends disagree (empty when all outputs match)."""
+    mismatches = []
+    for name, html in pages.items():
+        outputs = {backend: parse(html) for backend, parse in Backends.items()}
+        reference = outputs["bs4"]
+        if not reference:
+            mismatches.append((name, "bs4 found no snippets"))
+        for backend, output in outputs.items():
+            if output != reference:
+                mismatches.append((name, f"{backend} returned {len(output)} pairs, bs4 returned {len(reference)}"))
+    return mismatches
+
+def Benchmark(pages, rounds=20):
+    """Return {backend: (pages per second, MB per second)} over all fixtures."""
+    total_bytes = sum(len(html.encode("utf-8")) for html in pages.values())
+    results = {}
+    for backend, parse in Backends.items():
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for html in pages.values():
+                parse(html)
+        elapsed = time.perf_counter() - started
+        results[backend] = (rounds * len(pages) / elapsed, rounds * total_bytes / elapsed / 1e6)
+    return results
+
+if __name__ == "__main__":
+    pages = LoadFixtures()
+    mismatches = CheckIdentical(pages)
+    for name, problem in mismatches:
+        print(f"MISMATCH {name}: {problem}")
+
+    print(f"{len(pages)} fixture pages")
+    results = Benchmark(pages)
+    for backend, (pages_per_second, megabytes_per_second) in results.items():
+        print(f"{backend:>5}: {pages_per_second:8.1f} pages/s  {megabytes_per_second:6.2f} MB/s")
+    print(f"speedup: {results['fast'][0] / results['bs4'][0]:.1f}x")
+
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,191 @@
+import os # temporary working folder and fixture paths
+import sys # exit code when a stage regresses
+import json # baseline file
+import time # timing
+import asyncio # the dispatcher in Main is asyncio-based
+import argparse # command-line options
+import tempfile # isolated Data folder for caches and logs
+import statistics # medians
+from concurrent.futures import ThreadPoolExecutor # concurrent sessions for the throughput run
+import BenchmarkFakes # recorded Cohere/Groq stand-ins and the local Bing server
+
+# Per-stage medians (milliseconds) from a reference run; a stage fails when it is slower than this by more than the tolerance.
+BaselinePath = os.path.join(BenchmarkFakes.FixtureFolder, "pipeline_baseline.json")
+
+# A realistic mix of queries with how often each one occurs.
+QueryMix = [
+    ("what is networth of elon musk", 4),
+    ("what is python", 3),
+    ("open chrome and firefox", 3),
+    ("what is the latest technology news", 2),
+    ("how are you?", 2),
+    ("what's the capital of france", 2),
+    ("can you explain recursion", 1),
+    ("write a poem about the sea", 1),
+    ("what is python used for and open chrome", 1),
+]
+
+Stages = ["classify", "search", "parse", "prompt", "llm", "total"]
+
+def Timed(function, stage, timings):
+    """Wrap function so every call adds its duration to timings[stage]."""
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings[stage].append(time.perf_counter() - started)
+    wrapper.__wrapped__ = function
+    return wrapper
+
+def SetUp(options, timings):
+    """Import the assistant against the fakes and wrap every stage with a timer. Returns the modules we need."""
+    import dotenv, groq, cohere
+
+    fake_cohere = BenchmarkFakes.FakeCohere(latency=options.cohere_latency)
+    fake_groq = BenchmarkFakes.FakeGroq(ttft=options.groq_ttft, tokens_per_second=options.token_rate)
+
+    # The modules read keys and build clients at import time, so the fakes go in first.
+    dotenv.dotenv_values = lambda path=None: {"GroqAPIKey": "offline", "COHERE_API_KEY": "offline", "SearchPreconnect": "off"}
+    groq.Groq = lambda *args, **kwargs: fake_groq
+    cohere.Client = lambda *args, **kwargs: fake_cohere
+
+    import Main
+    import Modal
+    import RealtimeSearchEngine
+    import AnswerCache
+    import Automation
+    import FastAnswer
+
+    # No browsers or applications are opened during a benchmark; app names are still resolved.
+    Main.webbrowser.open = lambda url, *args, **kwargs: True
+    for action in ("open", "close"):
+        Main.TaskHandlers[action] = ("automation", lambda app: f"Resolved {(Automation.ResolveApp(app) or {'name': app})['name']}.")
+
+    Main.FirstLayerDMM = Timed(Main.FirstLayerDMM, "classify", timings)
+    RealtimeSearchEngine.FetchSearchSnippets = Timed(RealtimeSearchEngine.FetchSearchSnippets, "search", timings)
+    for backend, parse in list(RealtimeSearchEngine.ExtractorBackends.items()):
+        RealtimeSearchEngine.ExtractorBackends[backend] = Timed(parse, "parse", timings)
+    RealtimeSearchEngine.BuildSearchContext = Timed(RealtimeSearchEngine.BuildSearchContext, "prompt", timings)
+    RealtimeSearchEngine.ChatHistory.window = Timed(RealtimeSearchEngine.ChatHistory.window, "prompt", timings)
+
+    return Main, Modal, RealtimeSearchEngine, AnswerCache, FastAnswer, fake_groq
+
+def RunQuery(Main, query):
+    """Classify a query and run its tasks, like Main.MainExecution without printing."""
+    tasks = Main.FirstLayerDMM(query)
+    return asyncio.run(Main.ExecuteTasks(tasks))
+
+def Percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def Run(options):
+    timings = {stage: [] for stage in Stages}
+    Main, Modal, RealtimeSearchEngine, AnswerCache, FastAnswer, fake_groq = SetUp(options, timings)
+    queries = [query for query, weight in QueryMix for _ in range(weight)]
+
+    with BenchmarkFakes.BingStubServer(latency=options.search_latency) as stub:
+        RealtimeSearchEngine.SearchProviders[:] = [
+            RealtimeSearchEngine.SearchProvider("bing_stub", stub.url + "/search?q={query}&count=20", RealtimeSearchEngine.parse_bing_html)
+        ]
+
+        # Sequential run, one query at a time; caches are cleared so every query does the full work.
+        started = time.perf_counter()
+        for _ in range(options.rounds):
+            for query in queries:
+                if not options.warm:
+                    Modal.DecisionCache.clear()
+                    RealtimeSearchEngine.SearchCache.clear()
+                    AnswerCache.AnswerCache.clear()
+                query_started = time.perf_counter()
+                RunQuery(Main, query)
+                timings["total"].append(time.perf_counter() - query_started)
+        sequential_seconds = time.perf_counter() - started
+        timings["llm"] = [seconds for _, seconds in fake_groq.llm_timings]
+        # Stage figures come from the sequential run only.
+        stage_timings = {stage: list(values) for stage, values in timings.items()}
+
+        # Throughput with several sessions at once (caches kept, like a real mix).
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options.concurrency) as pool:
+            list(pool.map(lambda query: RunQuery(Main, query), queries * options.rounds))
+        concurrent_seconds = time.perf_counter() - started
+
+    report = {
+        "stages": {
+            stage: {
+                "calls": len(values),
+                "p50_ms": statistics.median(values) * 1000 if values else 0.0,
+                "p95_ms": Percentile(values, 0.95) * 1000,
+            }
+            for stage, values in stage_timings.items()
+        },
+        "throughput_qps": len(queries) * options.rounds / sequential_seconds,
+        "concurrent_throughput_qps": len(queries) * options.rounds / concurrent_seconds,
+        "concurrency": options.concurrency,
+        "fast_answers": FastAnswer.GetFastAnswerStats(),
+    }
+    return report
+
+def CompareWithBaseline(report, baseline, tolerance, slack_ms):
+    """Return the stages whose median got slower than the baseline allows."""
+    regressions = []
+    for stage, reference in baseline.items():
+        current = report["stages"].get(stage, {}).get("p50_ms")
+        if current is None:
+            continue
+        allowed = reference * (1 + tolerance) + slack_ms
+        if current > allowed:
+            regressions.append((stage, current, reference, allowed))
+    return regressions
+
+def ParseArguments(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the assistant pipeline.")
+    parser.add_argument("--rounds", type=int, default=3, help="passes over the query mix")
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions in the throughput run")
+    parser.add_argument("--warm", action="store_true", help="keep caches between queries in the sequential run")
+    parser.add_argument("--cohere-latency", type=float, default=0.05, help="seconds per fake Cohere call")
+    parser.add_argument("--groq-ttft", type=float, default=0.05, help="fake Groq time to first token")
+    parser.add_argument("--token-rate", type=float, default=400.0, help="fake Groq tokens per second")
+    parser.add_argument("--search-latency", type=float, default=0.02, help="seconds the stub search server waits")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown per stage (0.5 = 50%%)")
+    parser.add_argument("--slack-ms", type=float, default=2.0, help="allowed absolute slowdown per stage")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run's medians as the baseline")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    options = ParseArguments()
+
+    # Caches, logs and the spelling index are created under Data/ in a throwaway folder.
+    os.chdir(tempfile.mkdtemp(prefix="nova-benchmark-"))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    report = Run(options)
+    print(f"{'stage':>9} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for stage in Stages:
+        numbers = report["stages"][stage]
+        print(f"{stage:>9} {numbers['calls']:>6} {numbers['p50_ms']:>9.2f} {numbers['p95_ms']:>9.2f}")
+    print(f"throughput: {report['throughput_qps']:.1f} queries/s sequential, "
+          f"{report['concurrent_throughput_qps']:.1f} queries/s with {report['concurrency']} sessions")
+    fast = report["fast_answers"]
+    print(f"fast answers: {fast['answered']} of {fast['checked']} fact questions ({fast['answer_rate']:.0%}), "
+          f"about {fast['latency_saved'] * 1000:.0f} ms of LLM time saved")
+
+    medians = {stage: round(numbers["p50_ms"], 3) for stage, numbers in report["stages"].items()}
+    if options.update_baseline:
+        with open(BaselinePath, "w", encoding="utf-8") as f:
+            json.dump(medians, f, indent=4)
+        print(f"Baseline written to {BaselinePath}")
+        sys.exit(0)
+
+    if not os.path.isfile(BaselinePath):
+        print("No baseline yet; run with --update-baseline to create one.")
+        sys.exit(0)
+
+    with open(BaselinePath, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = CompareWithBaseline(report, baseline, options.tolerance, options.slack_ms)
+    for stage, current, reference, allowed in regressions:
+        print(f"REGRESSION {stage}: p50 {current:.2f} ms > allowed {allowed:.2f} ms (baseline {reference:.2f} ms)")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,105 @@
+import time # token refill and waiting
+import threading # limiters are shared by worker threads
+import Tracing # throttling counters
+
+class AdaptiveRateLimiter:
+    """Token bucket whose rate adapts to the provider (additive increase, multiplicative decrease).
+
+    acquire() waits for a token. A 429 from the provider halves the rate and pauses every caller
+    for the Retry-After time; each success raises the rate a little again, up to max_rate.
+    """
+
+    def __init__(self, name, rate, burst=None, min_rate=0.05, max_rate=None, increase=None):
+        self.name = name
+        self.rate = float(rate)
+        self.max_rate = float(max_rate or rate)
+        self.min_rate = min_rate
+        self.increase = increase if increase is not None else self.max_rate * 0.05
+        self.capacity = float(burst or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.stats = {"acquired": 0, "waited": 0.0, "throttled": 0}
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a request may be sent; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    self.stats["acquired"] += 1
+                    self.stats["waited"] += waited
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttled(self, retry_after=None):
+        """The provider answered 429: slow down and pause until it allows requests again."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            pause = retry_after if retry_after else 1.0 / self.rate
+            self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+            self.stats["throttled"] += 1
+        Tracing.Count(f"rate_limited_{self.name}")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["rate"] = self.rate
+        return stats
+
+def _status_code(result):
+    """HTTP status of an SDK error, a requests response or a requests HTTPError, if any."""
+    status = getattr(result, "status_code", None)
+    if status is None and getattr(result, "response", None) is not None:
+        status = getattr(result.response, "status_code", None)
+    return status
+
+def RetryAfter(result):
+    """Seconds from a Retry-After header on an error or response, or None."""
+    response = result if hasattr(result, "headers") else getattr(result, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def IsRateLimited(result):
+    return _status_code(result) == 429
+
+def RateLimited(limiter, function, max_retries=6):
+    """Wrap function so every call takes a token from limiter and 429 answers are retried after backing off."""
+    def wrapper(*args, **kwargs):
+        for attempt in range(max_retries + 1):
+            limiter.acquire()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                if IsRateLimited(e) and attempt < max_retries:
+                    limiter.on_throttled(RetryAfter(e))
+                    continue
+                raise
+            # requests returns 429 responses instead of raising.
+            if IsRateLimited(result) and attempt < max_retries:
+                limiter.on_throttled(RetryAfter(result))
+                continue
+            limiter.on_success()
+            return result
+    wrapper.__wrapped__ = function
+    return wrapper
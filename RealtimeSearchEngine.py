@@ -1,10 +1,25 @@
 import requests
-from bs4 import BeautifulSoup
+import requests.adapters
 import urllib.parse
 import re
 import datetime
-import difflib
-from json import dump
+import time
+import os
+import threading
+import contextvars
+from dotenv import dotenv_values
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from xml.etree import ElementTree
+from Cache import PersistentLRUCache
+from SnippetExtractor import ExtractBingSnippets
+from ContextBuilder import BuildSearchContext, EstimateTokens
+from HistoryManager import ChatHistory
+from SpellCorrector import Corrector
+from Streaming import TextEvents, InterruptedEvent, AsyncStream
+from ModelRouter import Client, Router, StreamCompletion
+import Tracing
+from Startup import StartWarmUp
+from FastAnswer import FastAnswer, RecordLLMStage
 
 # Defensive defaults for globals that may be set elsewhere in the project
 try:
@@ -12,11 +27,6 @@ try:
 except NameError:
     System = "You are a helpful assistant."
 
-try:
-    messages
-except NameError:
-    messages = []
-
 def clean_text(text):
     """Remove extra whitespace and normalize text"""
     return ' '.join(text.split())
@@ -41,19 +51,18 @@ def correct_query(query):
     for pat, repl in explicit.items():
         corrected = re.sub(pat, repl, corrected, flags=re.IGNORECASE)
 
-    # Small token-level fuzzy fixes for likely single-word typos (keeps things conservative)
-    vocab = ['net', 'worth', 'networth', 'net worth', 'wealth', 'elon', 'musk']
+    # Token-level fixes for likely typos from the symmetric-delete index (near-constant time per word)
     tokens = corrected.split()
     new_tokens = []
     for t in tokens:
-        # If token looks like a word (letters/digits) try a close match
-        match = difflib.get_close_matches(t.lower(), vocab, n=1, cutoff=0.85)
-        if match and match[0].lower() != t.lower():
-            # preserve original casing where possible
-            replacement = match[0]
-            new_tokens.append(replacement)
-        else:
-            new_tokens.append(t)
+        # Only the letters are corrected; surrounding punctuation such as '?' is kept
+        match = re.fullmatch(r'([^A-Za-z]*)([A-Za-z]+)([^A-Za-z]*)', t)
+        if match:
+            replacement = Corrector.correct_word(match.group(2).lower())
+            if replacement != match.group(2).lower():
+                new_tokens.append(match.group(1) + replacement + match.group(3))
+                continue
+        new_tokens.append(t)
 
     corrected = ' '.join(new_tokens)
 
@@ -64,80 +73,344 @@ def correct_query(query):
 
     return corrected, did_change, suggestion_text
 
+# Headers sent with every search request
+SearchHeaders = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Cache-Control': 'no-cache'  # freshness is handled by our own search cache
+}
+
+# One shared keep-alive session, so searches reuse TCP+TLS connections instead of a new handshake each time
+SearchSession = requests.Session()
+SearchSession.headers.update(SearchHeaders)
+_search_adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+SearchSession.mount("https://", _search_adapter)
+SearchSession.mount("http://", _search_adapter)
+
+# Seconds to wait on a provider before also asking the next one (hedged request)
+HedgeDelay = 1.5
+
+# Seconds a whole search may take across all providers
+SearchTimeout = 8
+
+# Worker threads for provider requests, so a hedged request can run next to a slow one
+SearchExecutor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="search")
+
+def parse_bing_html_bs4(html):
+    """Extract (title, caption) pairs from a Bing results page with a full BeautifulSoup tree"""
+    from bs4 import BeautifulSoup  # imported on first use; the default parser does not need it
+    soup = BeautifulSoup(html, 'html.parser')
+    pairs = []
+
+    # Find results using multiple selectors
+    selectors = [
+        ('li', 'b_algo'),
+        ('div', 'b_ans'),
+        ('div', 'b_special'),
+        ('div', 'news-card')
+    ]
+
+    for tag, class_name in selectors:
+        elements = soup.find_all(tag, class_=class_name)
+        for element in elements:
+            try:
+                # Look for title in different elements
+                title_elem = element.find(['h2', 'h3', 'h4']) or element.find(class_=['title', 'headline'])
+                caption_elem = element.find(['div', 'p'], class_=['b_caption', 'b_snippet', 'description']) or \
+                             element.find('div', class_='b_caption')
+
+                if title_elem and caption_elem:
+                    pairs.append((title_elem.get_text().strip(), caption_elem.get_text().strip()))
+            except Exception:
+                # Ignore parsing issues for individual elements
+                continue
+
+    return pairs
+
+# Bing HTML extractor backends: "fast" is a single streaming pass, "bs4" builds a full tree.
+# Both return identical results (see ParserBenchmark.py).
+ExtractorBackends = {
+    "fast": ExtractBingSnippets,
+    "bs4": parse_bing_html_bs4,
+}
+SnippetExtractorBackend = "fast"
+
+@Tracing.Traced("search.parse")
+def parse_bing_html(html):
+    """Extract (title, caption) pairs from a Bing results page with the selected backend"""
+    return ExtractorBackends[SnippetExtractorBackend](html)
+
+def parse_bing_rss(xml_text):
+    """Extract (title, caption) pairs from Bing's RSS output"""
+    pairs = []
+    try:
+        root = ElementTree.fromstring(xml_text)
+    except ElementTree.ParseError:
+        return pairs
+    for item in root.iter('item'):
+        title = (item.findtext('title') or '').strip()
+        caption = (item.findtext('description') or '').strip()
+        if title and caption:
+            pairs.append((title, caption))
+    return pairs
+
+def parse_duckduckgo_html(html):
+    """Extract (title, caption) pairs from DuckDuckGo's HTML-only results page"""
+    from bs4 import BeautifulSoup  # imported on first use; DuckDuckGo is only a hedge
+    soup = BeautifulSoup(html, 'html.parser')
+    pairs = []
+    for element in soup.find_all('div', class_='result'):
+        title_elem = element.find('a', class_='result__a')
+        caption_elem = element.find(class_='result__snippet')
+        if title_elem and caption_elem:
+            pairs.append((title_elem.get_text().strip(), caption_elem.get_text().strip()))
+    return pairs
+
+class SearchProvider:
+    """One search backend: a URL template ('{query}' is replaced) and a parser for its response"""
+
+    def __init__(self, name, url_template, parser):
+        self.name = name
+        self.url_template = url_template
+        self.parser = parser
+
+    def fetch(self, specific_query, timeout):
+        """Download and parse the results for specific_query; returns (pairs, bytes_fetched)"""
+        url = self.url_template.format(query=urllib.parse.quote(specific_query))
+        response = SearchSession.get(url, timeout=timeout)
+        response.raise_for_status()
+        return self.parser(response.text), len(response.content)
+
+# Providers in order of preference; the later ones are used as hedges
+SearchProviders = [
+    SearchProvider("bing_html", "https://www.bing.com/search?q={query}&count=20", parse_bing_html),
+    SearchProvider("bing_rss", "https://www.bing.com/search?q={query}&format=rss&count=20", parse_bing_rss),
+    SearchProvider("duckduckgo_html", "https://html.duckduckgo.com/html/?q={query}", parse_duckduckgo_html),
+]
+
+def _preconnect():
+    """Open a keep-alive connection to the first provider, so the first search skips the TCP and TLS handshake"""
+    url = urllib.parse.urlsplit(SearchProviders[0].url_template)
+    SearchSession.head(f"{url.scheme}://{url.netloc}/", timeout=SearchTimeout)
+
+# Connect in the background at startup; if it fails, the first search simply connects itself.
+# SearchPreconnect=off in .env turns this off (offline harnesses, where no real provider is used).
+SearchPreconnect = dotenv_values(".env").get("SearchPreconnect", "on").lower() not in ("0", "off", "false", "no")
+if SearchPreconnect:
+    StartWarmUp("search connection", _preconnect)
+
+# Per-provider latency and failure statistics
+ProviderStats = {}
+_provider_stats_lock = threading.Lock()
+
+def _record_provider(name, **counts):
+    with _provider_stats_lock:
+        stats = ProviderStats.setdefault(name, {"requests": 0, "failures": 0, "empty": 0, "wins": 0, "bytes": 0, "total_latency": 0.0})
+        for field, amount in counts.items():
+            stats[field] += amount
+
+def GetSearchProviderStats():
+    """Return request, failure, win and average latency figures per search provider"""
+    with _provider_stats_lock:
+        report = {name: dict(stats) for name, stats in ProviderStats.items()}
+    for stats in report.values():
+        stats["avg_latency"] = stats["total_latency"] / stats["requests"] if stats["requests"] else 0.0
+    return report
+
+def snippets_from_pairs(pairs, worth_only):
+    """Format (title, caption) pairs as snippets, keeping only money figures for net worth queries"""
+    content = []
+    for title, caption in pairs:
+        # Special handling for net worth queries
+        if worth_only:
+            worth_pattern = r'\$?\s*[\d,.]+\s*(?:billion|million|trillion|\$)'
+            if re.search(worth_pattern, caption, re.IGNORECASE):
+                content.append(f"{title}\n{caption}")
+        else:
+            content.append(f"{title}\n{caption}")
+    return content
+
+def _fetch_from(provider, specific_query, worth_only):
+    """Ask one provider; never raises, returns [] when the provider fails or has nothing usable"""
+    started = time.perf_counter()
+    try:
+        with Tracing.Span("search.provider", provider=provider.name):
+            pairs, size = provider.fetch(specific_query, SearchTimeout)
+    except Exception as e:
+        _record_provider(provider.name, requests=1, failures=1, total_latency=time.perf_counter() - started)
+        Tracing.RecordError("search_provider", e)
+        print(f"Search provider {provider.name} failed: {e}")
+        return []
+
+    content = snippets_from_pairs(pairs, worth_only)
+    Tracing.Count("search_bytes_fetched", size)
+    _record_provider(provider.name, requests=1, empty=0 if content else 1, bytes=size, total_latency=time.perf_counter() - started)
+    return content
+
+@Tracing.Traced("search")
+def FetchSearchSnippets(specific_query, worth_only, providers=None):
+    """Search with hedging and return the extracted 'title\ncaption' snippets
+
+    The first provider is asked straight away. If it has not answered after HedgeDelay seconds,
+    or it answered without usable snippets, the next provider is asked as well, and the first
+    usable answer wins.
+    """
+    providers = list(SearchProviders if providers is None else providers)
+    deadline = time.monotonic() + SearchTimeout
+    running = {}
+    next_provider = 0
+
+    while running or next_provider < len(providers):
+        # Start the next provider (the first one, or a hedge for the ones still running)
+        if next_provider < len(providers):
+            provider = providers[next_provider]
+            next_provider += 1
+            # The worker runs in a copy of our context so its span is a child of this search
+            running[SearchExecutor.submit(contextvars.copy_context().run, _fetch_from, provider, specific_query, worth_only)] = provider
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        wait_for = min(HedgeDelay, remaining) if next_provider < len(providers) else remaining
+        done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            provider = running.pop(future)
+            content = future.result()
+            if content:
+                _record_provider(provider.name, wins=1)
+                Tracing.Count(f"search_wins_{provider.name}")
+                return content
+
+    return []
+
+# Search results cache: extracted snippets keyed by the normalized search query.
+# Expired entries are still served, for twice their own TTL, while a background refresh runs.
+SearchCache = PersistentLRUCache(os.path.join("Data", "SearchCache.db"), max_entries=500, ttl=6 * 3600, table="search", stale_ratio=2)
+
+# Time-to-live per query class: fast-changing topics first, then evergreen ones.
+SearchCacheTTLs = [
+    (re.compile(r"\b(news|today|latest|live|score|weather|stock|price|net worth|election|trending)\b", re.IGNORECASE), 10 * 60),
+    (re.compile(r"\b(history|define|definition|meaning|who was|born|capital of|invented|biography)\b", re.IGNORECASE), 7 * 24 * 3600),
+]
+
+# Queries that are being refreshed in the background right now
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+# Searches being fetched right now by cache key; a second caller (e.g. a speculative search) shares the request
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def SearchCacheTTL(search_terms):
+    """Pick how long search results for these terms stay fresh"""
+    for pattern, ttl in SearchCacheTTLs:
+        if pattern.search(search_terms):
+            return ttl
+    return SearchCache.ttl
+
+def _refresh_search(key, specific_query, search_terms, worth_only):
+    """Re-fetch a stale cache entry in the background"""
+    try:
+        content = FetchSearchSnippets(specific_query, worth_only)
+        if content:
+            SearchCache.set(key, content, ttl=SearchCacheTTL(search_terms))
+    except Exception as e:
+        Tracing.RecordError("search_refresh", e)
+        print(f"Background search refresh failed: {e}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+
+def CachedSearchSnippets(specific_query, search_terms, worth_only):
+    """Return search snippets from the cache, fetching on a miss and refreshing stale entries in the background"""
+    key = clean_text(specific_query).lower()
+    content, fresh = SearchCache.get_stale(key)
+
+    if content is not None:
+        if not fresh:
+            # Serve the stale result now and refresh it once in the background
+            with _refreshing_lock:
+                start_refresh = key not in _refreshing
+                _refreshing.add(key)
+            if start_refresh:
+                threading.Thread(target=_refresh_search, args=(key, specific_query, search_terms, worth_only), daemon=True).start()
+        return content
+
+    with _inflight_lock:
+        pending = _inflight.get(key)
+        if pending is None:
+            pending = _inflight[key] = Future()
+            owner = True
+        else:
+            owner = False
+    if not owner:
+        Tracing.Count("search_shared_fetches")
+        return pending.result()
+
+    try:
+        content = FetchSearchSnippets(specific_query, worth_only)
+        # Empty results are usually a blocked or broken page, so they are not cached
+        if content:
+            SearchCache.set(key, content, ttl=SearchCacheTTL(search_terms))
+            # New snippets also teach the spelling corrector new words
+            Corrector.learn("\n".join(content))
+        pending.set_result(content)
+        return content
+    except Exception as e:
+        pending.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
 def GoogleSearch(query):
     """Perform a web search and format the results"""
+    snippets, message = GoogleSearchSnippets(query)
+    return "\n\n".join(snippets) if snippets else message
+
+def SearchQuery(query):
+    """Turn a user query into (specific_query, search_terms, worth_only, did_change, suggestion)"""
+    # Clean and prepare the search query (trailing punctuation would only split the cache)
+    query = clean_text(query).strip(" ?!.")
+    corrected_query, did_change, suggestion = correct_query(query)
+
+    search_terms = corrected_query.replace("what is", "").replace("tell me about", "").replace("search for", "").strip()
+
+    # Add specific terms for net worth searches
+    if 'net worth' in search_terms.lower():
+        specific_query = f"{search_terms} forbes bloomberg 2025 current billionaire richest"
+    else:
+        specific_query = f"{search_terms} 2025 current"
+
+    worth_only = 'net worth' in search_terms.lower() or 'net worth' in corrected_query.lower()
+    return specific_query, search_terms, worth_only, did_change, suggestion
+
+def SearchKey(query):
+    """The search cache key a user query maps to"""
+    return clean_text(SearchQuery(query)[0]).lower()
+
+def GoogleSearchSnippets(query):
+    """Perform a web search and return (snippets, message); message explains an empty result"""
     try:
-        # Clean and prepare the search query
-        query = clean_text(query)
-        corrected_query, did_change, suggestion = correct_query(query)
-
-        search_terms = corrected_query.replace("what is", "").replace("tell me about", "").replace("search for", "").strip()
-        # Keep the original user query for messaging
-        original_query = query
-        content = []
-        
-        # Add specific terms for net worth searches
-        if 'net worth' in search_terms.lower():
-            specific_query = f"{search_terms} forbes bloomberg 2025 current billionaire richest"
-        else:
-            specific_query = f"{search_terms} 2025 current"
-            
-        search_url = f"https://www.bing.com/search?q={urllib.parse.quote(specific_query)}&format=rss&count=20"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Cache-Control': 'no-cache'
-        }
-        
-        response = requests.get(search_url, headers=headers, timeout=15)
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Find results using multiple selectors
-        results = []
-        selectors = [
-            ('li', 'b_algo'),
-            ('div', 'b_ans'),
-            ('div', 'b_special'),
-            ('div', 'news-card')
-        ]
-
-        for tag, class_name in selectors:
-            elements = soup.find_all(tag, class_=class_name)
-            for element in elements:
-                try:
-                    # Look for title in different elements
-                    title_elem = element.find(['h2', 'h3', 'h4']) or element.find(class_=['title', 'headline'])
-                    caption_elem = element.find(['div', 'p'], class_=['b_caption', 'b_snippet', 'description']) or \
-                                 element.find('div', class_='b_caption')
-
-                    if title_elem and caption_elem:
-                        title = title_elem.get_text().strip()
-                        caption = caption_elem.get_text().strip()
-
-                        # Special handling for net worth queries
-                        if 'net worth' in search_terms.lower() or 'net worth' in corrected_query.lower():
-                            worth_pattern = r'\$?\s*[\d,.]+\s*(?:billion|million|trillion|\$)'
-                            if re.search(worth_pattern, caption, re.IGNORECASE):
-                                content.append(f"{title}\n{caption}")
-                        else:
-                            content.append(f"{title}\n{caption}")
-                except Exception:
-                    # Ignore parsing issues for individual elements
-                    continue
+        specific_query, search_terms, worth_only, did_change, suggestion = SearchQuery(query)
+
+        # Extracted snippets come from the cache when we searched this recently
+        content = CachedSearchSnippets(specific_query, search_terms, worth_only)
 
         if content:
-            return "\n\n".join(content)
+            return content, ""
 
         # If we made a conservative correction to the query, suggest it to the user
         if did_change:
-            return (f"I found some results for '{search_terms}', but they don't contain specific information. "
-                    f"{suggestion} Could you try rephrasing your question or be more specific?")
+            return [], (f"I found some results for '{search_terms}', but they don't contain specific information. "
+                        f"{suggestion} Could you try rephrasing your question or be more specific?")
 
-        return f"I found some results, but they don't seem to contain specific information about {search_terms}. Could you try rephrasing your question?"
+        return [], f"I found some results, but they don't seem to contain specific information about {search_terms}. Could you try rephrasing your question?"
 
     except Exception as e:
-        return f"I apologize, but I couldn't retrieve the information. Please try asking in a different way."
+        Tracing.RecordError("search", e)
+        return [], f"I apologize, but I couldn't retrieve the information. Please try asking in a different way."
 
 def main():
     while True:
@@ -172,16 +445,37 @@ SystemChatBot = [
     {"role": "system", "content": System}
 ]
 
-def RealtimeSearchEngine(prompt):
-    """Handle real-time search and response generation"""
-    global SystemChatBot, messages
+# How much history the model answering from search results gets next to them
+RealtimeHistoryBudget = 600
 
-    try:
-        # Add the user's query to messages
-        messages.append({"role": "user", "content": prompt})
+def RealtimeSearchEngineStream(prompt, history=None):
+    """Handle real-time search and yield the response as stream events (see Streaming.StreamEvents)
+
+    history is the HistoryManager of the conversation (a server session's own); by default the shared ChatHistory.
+    """
+    started_at = time.perf_counter()
+    history = history or ChatHistory
+    log = history.store
+    sent = []  # text already streamed to the caller
 
-        # Get search results
-        search_results = GoogleSearch(prompt)
+    try:
+        # Recent turns that fit the history budget (older ones summarized) plus the user's query
+        messages = history.window(budget=RealtimeHistoryBudget) + [{"role": "user", "content": prompt}]
+
+        # Get search results, keeping only the most relevant snippets that fit the token budget
+        snippets, message = GoogleSearchSnippets(prompt)
+        with Tracing.Span("realtime.context", snippets=len(snippets)):
+            search_results = BuildSearchContext(prompt, snippets) if snippets else message
+
+        # Plain fact lookups the ranked snippets agree on are answered without the LLM
+        if snippets:
+            with Tracing.Span("realtime.fast_answer"):
+                answer = FastAnswer(prompt, search_results.split("\n\n"))
+            if answer:
+                Tracing.Count("realtime_fast_answers")
+                log.append_exchange(prompt, answer)
+                yield from TextEvents(answer, started_at, "FastAnswer")
+                return
         
         # Add specific instruction for this query
         query_instruction = {
@@ -198,58 +492,63 @@ def RealtimeSearchEngine(prompt):
             [query_instruction] +
             [{"role": "system", "content": search_results}] +
             [{"role": "system", "content": GetRealTimeInfo()}] +
-            messages[-3:]  # Keep only last 3 messages for focused context
+            messages  # Short, token-budgeted history for focused context
         )
 
+        prompt_tokens = sum(EstimateTokens(item["content"]) for item in conversation)
+
         # If an LLM client is available, use it to refine the answer. Otherwise return search results.
-        Answer = None
-        if 'Client' in globals() and hasattr(Client, 'chat'):
+        if Client is not None and Router.available():
+            Tracing.Count("realtime_prompt_tokens", prompt_tokens)
+            llm_started = time.perf_counter()
             try:
-                completion = Client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=conversation,
-                    temperature=0.3,  # Lower temperature for more focused responses
-                    max_tokens=512,   # Shorter responses
-                    top_p=0.8,       # More focused token selection
-                    stream=True
-                )
-
-                # Collect response chunks
-                Answer = ""
-                for chunk in completion:
-                    if hasattr(chunk.choices[0].delta, 'content'):
-                        if chunk.choices[0].delta.content:
-                            Answer += chunk.choices[0].delta.content
-
-                # Clean up response
-                Answer = Answer.strip().replace("</s>", "")
-
-                # Add response to messages
-                messages.append({"role": "assistant", "content": Answer})
-
-                # Save chat log
-                with open(r"Data/ChatLog.json", "w") as f:
-                    dump(messages[-50:], f, indent=4)  # Keep last 50 messages max
-
-                return AnswerModifier(Answer=Answer)
+                # The router picks the fastest healthy model for grounded answers
+                for event in StreamCompletion("realtime", conversation, started_at, "RealtimeSearchEngine",
+                                              temperature=0.3,  # Lower temperature for more focused responses
+                                              max_tokens=512,   # Shorter responses
+                                              top_p=0.8):       # More focused token selection
+                    if event["type"] == "delta":
+                        sent.append(event["text"])
+                    elif event["type"] == "done":
+                        Tracing.RecordSpan("realtime.turn", event["latency"], model=event["model"], ttft=event["ttft"], prompt_tokens=prompt_tokens)
+                        if "error" not in event:
+                            RecordLLMStage(time.perf_counter() - llm_started)
+                        # Save the turn to the chat log
+                        log.append_exchange(prompt, event["text"].strip())
+                    yield event
+                return
             except Exception as e:
-                # If the client fails, fall back to returning search results
+                # Text already sent cannot be taken back, so only fall back before the first token
+                if sent:
+                    raise
+                # If no model can answer, fall back to returning search results
+                Tracing.RecordError("realtime_llm", e)
                 print(f"LLM client error, falling back to raw search: {e}")
 
         # No LLM available: return the raw search results
         # Save chat log with the search_results as assistant content
-        messages.append({"role": "assistant", "content": search_results})
-        try:
-            with open(r"Data/ChatLog.json", "w") as f:
-                dump(messages[-50:], f, indent=4)
-        except Exception:
-            pass
+        log.append_exchange(prompt, search_results)
 
-        return AnswerModifier(Answer=search_results)
+        yield from TextEvents(search_results, started_at, "RealtimeSearchEngine")
         
     except Exception as e:
+        Tracing.RecordError("realtime", e)
         print(f"Error: {str(e)}")
-        return f"I apologize, but I encountered an error: {str(e)}"
+        # After partial output, end that answer with its one done event instead of adding a second answer
+        if sent:
+            yield InterruptedEvent("".join(sent), started_at, e)
+            return
+        yield from TextEvents(f"I apologize, but I encountered an error: {str(e)}", started_at, "RealtimeSearchEngine", error=str(e))
+
+def RealtimeSearchEngineStreamAsync(prompt, history=None):
+    """Async-iterator variant of RealtimeSearchEngineStream"""
+    return AsyncStream(RealtimeSearchEngineStream(prompt, history))
+
+def RealtimeSearchEngine(prompt, history=None):
+    """Handle real-time search and response generation"""
+    for event in RealtimeSearchEngineStream(prompt, history):
+        if event["type"] == "done":
+            return AnswerModifier(Answer=event["text"].strip())
 
 # Main entry point of the program for interactive querying.
 if __name__ == "__main__":
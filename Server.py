@@ -0,0 +1,524 @@
+import os # session log folder
+import re # session id check
+import json # request and response bodies
+import time # idle sessions and request timing
+import uuid # new session ids
+import atexit # closed sessions are taken off the exit hooks
+import base64 # WebSocket handshake
+import struct # WebSocket frame lengths
+import asyncio # one event loop serves every connection
+import hashlib # WebSocket handshake
+import argparse # command-line options
+import threading # stream hand-off between worker threads and the loop
+import contextvars # carry the request span into worker threads
+import urllib.parse # query strings
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout # worker threads for the blocking pipeline
+from ChatStore import ConversationStore # each session has its own conversation log
+from HistoryManager import HistoryManager # and its own token-budgeted history window
+from Modal import FirstLayerDMM # classification (stateless)
+from Chatbot import ChatbotStream, AnswerModifier # chat answers, streamed
+from RealtimeSearchEngine import RealtimeSearchEngineStream # search-grounded answers, streamed
+import Tracing # per-request spans and counters
+from Startup import GetStartupStats # warm-up timings for /stats
+from FastAnswer import GetFastAnswerStats # questions answered without the LLM, for /stats
+
+# Conversation logs of server sessions, one JSONL file per session id.
+SessionFolder = os.path.join("Data", "Sessions")
+
+# Sessions kept open at once, and how long an unused one stays open (its log stays on disk).
+MaxSessions = 256
+SessionIdleTimeout = 30 * 60
+
+# Worker threads for the blocking pipeline; the Groq, Cohere and search clients they use are shared.
+ServerWorkers = 16
+
+# Requests admitted at once (running or waiting for a worker); more are refused with 503.
+MaxQueuedRequests = 64
+
+# Requests one session may have admitted at once; its turns run one after another, more are refused with 429.
+SessionQueueLimit = 4
+
+# Stream events buffered between a worker and a slow client before the worker waits.
+StreamBuffer = 8
+
+# Largest request body accepted.
+MaxBodyBytes = 64 * 1024
+
+SessionIdPattern = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+WebSocketGUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+StatusTexts = {200: "OK", 101: "Switching Protocols", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+class HTTPError(Exception):
+    """An error answered with the given status; retry_after is sent as the Retry-After header."""
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class Session:
+    """One user's conversation: its own log under Data/Sessions and its own history window."""
+
+    def __init__(self, session_id, folder=SessionFolder):
+        self.id = session_id
+        self.store = ConversationStore(path=os.path.join(folder, f"{session_id}.jsonl"), legacy_paths=[])
+        self.history = HistoryManager(store=self.store)
+        self.turn_lock = asyncio.Lock()  # turns of one session run in order
+        self.pending = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        self.store.close()
+        atexit.unregister(self.store.close)
+
+class SessionManager:
+    """Open sessions by id; idle ones are closed and reopened from their log when they come back."""
+
+    def __init__(self, folder=SessionFolder, max_sessions=MaxSessions, idle_timeout=SessionIdleTimeout):
+        self.folder = folder
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+
+    def get(self, session_id=None):
+        """Return the session with this id, opening it (or a new one when session_id is None)."""
+        if session_id is None:
+            session_id = uuid.uuid4().hex
+        elif not isinstance(session_id, str) or not SessionIdPattern.match(session_id):
+            raise HTTPError(400, "session must be 1-64 letters, digits, '-' or '_'")
+
+        session = self.sessions.get(session_id)
+        if session is None:
+            if len(self.sessions) >= self.max_sessions:
+                self.expire(0)
+            if len(self.sessions) >= self.max_sessions:
+                raise HTTPError(503, "too many open sessions", retry_after=5)
+            session = self.sessions[session_id] = Session(session_id, self.folder)
+        session.last_used = time.monotonic()
+        return session
+
+    def find(self, session_id):
+        """Return an existing session (reopening it from its log if it was closed); unknown ids are a 404."""
+        if not isinstance(session_id, str) or not SessionIdPattern.match(session_id):
+            raise HTTPError(400, "session must be 1-64 letters, digits, '-' or '_'")
+        if session_id not in self.sessions and not os.path.isfile(os.path.join(self.folder, f"{session_id}.jsonl")):
+            raise HTTPError(404, f"no session '{session_id}'")
+        return self.get(session_id)
+
+    def delete(self, session_id):
+        """Close a session and delete its log."""
+        session = self.find(session_id)
+        if session.pending:
+            raise HTTPError(429, "session is busy", retry_after=1)
+        del self.sessions[session_id]
+        session.close()
+        try:
+            os.remove(session.store.path)
+        except OSError:
+            pass
+
+    def expire(self, idle_timeout=None):
+        """Close sessions unused for idle_timeout seconds; returns how many were closed."""
+        idle_timeout = self.idle_timeout if idle_timeout is None else idle_timeout
+        now = time.monotonic()
+        idle = [session for session in self.sessions.values() if not session.pending and now - session.last_used >= idle_timeout]
+        for session in idle:
+            del self.sessions[session.id]
+            session.close()
+        return len(idle)
+
+    def close(self):
+        for session in self.sessions.values():
+            session.close()
+        self.sessions.clear()
+
+class AssistantServer:
+    """HTTP and WebSocket front end for classification, chat and realtime search.
+
+    Requests run the normal blocking pipeline on a bounded pool of worker threads. Admission is
+    bounded too: past max_queued requests the server answers 503, and past session_queue requests
+    for one session it answers 429, both with Retry-After, instead of letting work pile up.
+    Streamed answers go through a small buffer, so a slow client holds up its own worker only.
+    """
+
+    def __init__(self, sessions=None, workers=ServerWorkers, max_queued=MaxQueuedRequests, session_queue=SessionQueueLimit):
+        self.sessions = sessions or SessionManager()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="server")
+        self.max_queued = max_queued
+        self.session_queue = session_queue
+        self.admitted = 0
+        self.stats = {"requests": 0, "rejected_busy": 0, "rejected_session": 0, "errors": 0, "peak_admitted": 0,
+                      "connections": 0, "websockets": 0}
+        self.kind_stats = {kind: {"requests": 0, "seconds": 0.0} for kind in ("classify", "chat", "realtime")}
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self.server = await asyncio.start_server(self._connection, host, port, limit=MaxBodyBytes)
+        asyncio.get_running_loop().create_task(self._expire_sessions())
+        return self.server
+
+    async def _expire_sessions(self):
+        while True:
+            await asyncio.sleep(60)
+            self.sessions.expire()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.sessions.close()
+        self.executor.shutdown(wait=False)
+
+    # Running requests
+
+    def _admit(self, session):
+        if self.admitted >= self.max_queued:
+            self.stats["rejected_busy"] += 1
+            Tracing.Count("server_rejected_busy")
+            raise HTTPError(503, "server is busy", retry_after=1)
+        if session is not None and session.pending >= self.session_queue:
+            self.stats["rejected_session"] += 1
+            Tracing.Count("server_rejected_session")
+            raise HTTPError(429, "too many requests for this session", retry_after=1)
+        self.admitted += 1
+        self.stats["peak_admitted"] = max(self.stats["peak_admitted"], self.admitted)
+        if session is not None:
+            session.pending += 1
+
+    def _release(self, session):
+        self.admitted -= 1
+        if session is not None:
+            session.pending -= 1
+            session.last_used = time.monotonic()
+
+    async def _stream(self, factory, send):
+        """Run a blocking event stream in a worker thread and pass each event to send; returns the done event.
+
+        The worker waits while StreamBuffer events are unsent and stops if the client goes away.
+        """
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue(maxsize=StreamBuffer)
+        finished = object()
+        stop = threading.Event()
+
+        def put(item):
+            future = asyncio.run_coroutine_threadsafe(events.put(item), loop)
+            while not stop.is_set():
+                try:
+                    return future.result(timeout=0.25)
+                except FutureTimeout:
+                    continue
+            future.cancel()
+
+        def produce():
+            try:
+                for event in factory():
+                    if stop.is_set():
+                        break
+                    put(event)
+            finally:
+                put(finished)
+
+        worker = loop.run_in_executor(self.executor, contextvars.copy_context().run, produce)
+        done = None
+        try:
+            while True:
+                event = await events.get()
+                if event is finished:
+                    break
+                if event["type"] == "done":
+                    done = event
+                if send is not None:
+                    await send(event)
+        finally:
+            stop.set()
+        await worker
+        return done
+
+    async def run(self, kind, query, session_id=None, send=None):
+        """Answer one request; send (an async callable) gets stream events as they arrive. Returns the JSON result."""
+        if kind not in self.kind_stats:
+            raise HTTPError(404, f"unknown request kind '{kind}'")
+        if not isinstance(query, str) or not query.strip():
+            raise HTTPError(400, "query must be a non-empty string")
+
+        # Classification keeps no conversation, so it needs no session.
+        session = self.sessions.get(session_id) if kind != "classify" else None
+        self._admit(session)
+        self.stats["requests"] += 1
+        started = time.perf_counter()
+        try:
+            with Tracing.Span("server.request", kind=kind):
+                if kind == "classify":
+                    call = contextvars.copy_context().run
+                    tasks = await asyncio.get_running_loop().run_in_executor(self.executor, call, FirstLayerDMM, query)
+                    return {"tasks": tasks}
+
+                stream = ChatbotStream if kind == "chat" else RealtimeSearchEngineStream
+                async with session.turn_lock:
+                    done = await self._stream(lambda: stream(query, session.history), send)
+                if done is None:
+                    raise RuntimeError(f"{kind} stream ended without an answer")
+                return {"session": session.id, "answer": AnswerModifier(done["text"].strip()),
+                        "model": done.get("model"), "ttft": done.get("ttft"), "latency": done.get("latency")}
+        except HTTPError:
+            raise
+        except Exception as e:
+            self.stats["errors"] += 1
+            Tracing.RecordError("server", e)
+            print(f"Server request failed: {e}")
+            # The details stay in the log and the traces; clients only learn that it failed.
+            raise HTTPError(500, "internal error")
+        finally:
+            self._release(session)
+            self.kind_stats[kind]["requests"] += 1
+            self.kind_stats[kind]["seconds"] += time.perf_counter() - started
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["admitted"] = self.admitted
+        stats["sessions"] = len(self.sessions.sessions)
+        stats["startup"] = GetStartupStats()
+        stats["fast_answers"] = GetFastAnswerStats()
+        stats["kinds"] = {kind: dict(values, avg_seconds=values["seconds"] / values["requests"] if values["requests"] else 0.0)
+                          for kind, values in self.kind_stats.items()}
+        return stats
+
+    # HTTP
+
+    async def _connection(self, reader, writer):
+        self.stats["connections"] += 1
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+                if headers.get("upgrade", "").lower() == "websocket" and path == "/ws":
+                    await self._websocket(reader, writer, headers, query)
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, method, path, body, keep_alive)
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            await _send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, method, path, body, keep_alive):
+        streaming = False
+        try:
+            payload = _parse_json(body) if method == "POST" else {}
+            if path == "/sessions" and method == "POST":
+                result = {"session": self.sessions.get(payload.get("session")).id}
+            elif path.startswith("/sessions/") and method in ("GET", "DELETE"):
+                session_id = path[len("/sessions/"):]
+                if method == "DELETE":
+                    self.sessions.delete(session_id)
+                    result = {"deleted": session_id}
+                else:
+                    result = {"session": session_id, "history": self.sessions.find(session_id).store.recent()}
+            elif path == "/stats" and method == "GET":
+                result = self.get_stats()
+            elif path in ("/classify", "/chat", "/realtime"):
+                if method != "POST":
+                    raise HTTPError(405, "use POST")
+                # Streamed answers are sent as newline-delimited JSON events in HTTP chunks.
+                async def send_chunk(event):
+                    nonlocal streaming
+                    if not streaming:
+                        streaming = True
+                        writer.write(_head(200, "application/x-ndjson", keep_alive, chunked=True))
+                    await _write_chunk(writer, json.dumps(event, ensure_ascii=False) + "\n")
+                send = send_chunk if payload.get("stream") and path != "/classify" else None
+                result = await self.run(path[1:], payload.get("query"), payload.get("session"), send)
+                if streaming:
+                    await _write_chunk(writer, json.dumps(dict(result, type="result"), ensure_ascii=False) + "\n")
+                    await _write_chunk(writer, "")
+                    return
+            else:
+                raise HTTPError(404, f"no route for {method} {path}")
+        except HTTPError as e:
+            if streaming:
+                # The status line is already sent; the error goes in the stream instead.
+                await _write_chunk(writer, json.dumps({"type": "error", "error": str(e)}) + "\n")
+                await _write_chunk(writer, "")
+                return
+            await _send_json(writer, e.status, {"error": str(e)}, keep_alive, e.retry_after)
+            return
+        await _send_json(writer, 200, result, keep_alive)
+
+    # WebSocket
+
+    async def _websocket(self, reader, writer, headers, query):
+        """One session per socket; each message {"id", "kind", "query"} is answered with its stream events."""
+        key = headers.get("sec-websocket-key")
+        if not key:
+            raise HTTPError(400, "missing Sec-WebSocket-Key")
+        session = self.sessions.get(query.get("session"))
+        accept = base64.b64encode(hashlib.sha1((key + WebSocketGUID).encode("ascii")).digest()).decode("ascii")
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode("ascii"))
+        self.stats["websockets"] += 1
+
+        async def send(message):
+            writer.write(_frame(json.dumps(message, ensure_ascii=False).encode("utf-8")))
+            await writer.drain()
+
+        async def answer(message):
+            request_id = message.get("id") if isinstance(message, dict) else None
+            try:
+                if not isinstance(message, dict):
+                    raise HTTPError(400, "messages must be JSON objects")
+                send_event = lambda event: send(dict(event, id=request_id))
+                result = await self.run(message.get("kind", "chat"), message.get("query"), session.id, send_event)
+                await send(dict(result, type="result", id=request_id))
+            except HTTPError as e:
+                await send({"type": "error", "id": request_id, "status": e.status, "error": str(e), "retry_after": e.retry_after})
+            except ConnectionError:
+                pass
+
+        await send({"type": "session", "session": session.id})
+        running = set()
+        try:
+            while True:
+                opcode, payload = await _read_frame(reader)
+                if opcode == 0x8:  # close
+                    writer.write(_frame(payload[:2], opcode=0x8))
+                    break
+                if opcode == 0x9:  # ping
+                    writer.write(_frame(payload, opcode=0xA))
+                    continue
+                if opcode != 0x1:
+                    continue
+                try:
+                    message = json.loads(payload.decode("utf-8"))
+                except ValueError:
+                    message = None
+                # Messages are answered concurrently; the session's turn lock keeps its turns in order.
+                task = asyncio.create_task(answer(message))
+                running.add(task)
+                task.add_done_callback(running.discard)
+        finally:
+            for task in running:
+                task.cancel()
+
+async def _read_request(reader):
+    """Read one HTTP request; returns (method, path, query, headers, body) or None when the client closed."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0) or 0)
+    if length > MaxBodyBytes:
+        raise HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    url = urllib.parse.urlsplit(target)
+    query = {name: values[-1] for name, values in urllib.parse.parse_qs(url.query).items()}
+    return method.upper(), url.path.rstrip("/") or "/", query, headers, body
+
+def _parse_json(body):
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(400, "body must be JSON")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "body must be a JSON object")
+    return payload
+
+def _head(status, content_type, keep_alive, length=None, chunked=False, retry_after=None):
+    lines = [f"HTTP/1.1 {status} {StatusTexts.get(status, '')}", f"Content-Type: {content_type}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines.append("Transfer-Encoding: chunked" if chunked else f"Content-Length: {length}")
+    if retry_after:
+        lines.append(f"Retry-After: {retry_after}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+async def _send_json(writer, status, result, keep_alive, retry_after=None):
+    data = json.dumps(result, ensure_ascii=False).encode("utf-8")
+    writer.write(_head(status, "application/json", keep_alive, length=len(data), retry_after=retry_after) + data)
+    await writer.drain()
+
+async def _write_chunk(writer, text):
+    data = text.encode("utf-8")
+    writer.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+    await writer.drain()
+
+def _frame(payload, opcode=0x1):
+    """A single unmasked server-to-client WebSocket frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack(">BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack(">BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+async def _read_frame(reader):
+    """Read one client message (joining fragments); returns (opcode, payload)."""
+    opcode = None
+    payload = b""
+    while True:
+        first, second = await reader.readexactly(2)
+        if opcode is None or first & 0x0F:
+            opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", await reader.readexactly(8))[0]
+        if len(payload) + length > MaxBodyBytes:
+            raise ConnectionError("WebSocket message too large")
+        mask = await reader.readexactly(4) if second & 0x80 else b""
+        data = await reader.readexactly(length)
+        if mask and length:
+            key = (mask * (length // 4 + 1))[:length]
+            data = (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+        payload += data
+        if first & 0x80:
+            return opcode, payload
+
+async def Serve(host="127.0.0.1", port=8765, **options):
+    """Run the server until cancelled."""
+    server = AssistantServer(**options)
+    await server.start(host, port)
+    print(f"Listening on http://{host}:{port} (WebSocket at /ws)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.close()
+
+def ParseArguments(argv=None):
+    parser = argparse.ArgumentParser(description="Serve classification, chat and realtime search to many sessions.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=ServerWorkers, help="worker threads for the pipeline")
+    parser.add_argument("--max-queued", type=int, default=MaxQueuedRequests, help="requests admitted at once before 503")
+    parser.add_argument("--session-queue", type=int, default=SessionQueueLimit, help="requests per session before 429")
+    return parser.parse_args(argv)
+
+# Main program entry point.
+if __name__ == "__main__":
+    options = ParseArguments()
+    # With NOVA_TRACE=1 and NOVA_METRICS_PORT set, counters and span timings are served at /metrics.
+    if Tracing.Enabled and Tracing.MetricsPort:
+        Tracing.StartMetricsServer()
+    try:
+        asyncio.run(Serve(options.host, options.port, workers=options.workers,
+                          max_queued=options.max_queued, session_queue=options.session_queue))
+    except KeyboardInterrupt:
+        print("\nStopped.")
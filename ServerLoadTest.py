@@ -0,0 +1,159 @@
+import os # temporary working folder
+import sys # exit code when sessions leak into each other
+import json # request and response bodies
+import time # timing
+import asyncio # the server runs on its own event loop
+import argparse # command-line options
+import tempfile # isolated Data folder for session logs and caches
+import threading # the server runs in the background
+import statistics # medians
+import http.client # keep-alive clients, one per session
+from concurrent.futures import ThreadPoolExecutor # concurrent client sessions
+import BenchmarkFakes # recorded Cohere/Groq stand-ins and the local Bing server
+
+# Queries each simulated user sends, in order.
+SessionQueries = [
+    "what is python",
+    "what is networth of elon musk",
+    "how are you?",
+    "what is the latest technology news",
+    "can you explain recursion",
+    "what's the capital of france",
+]
+
+def SetUp(options):
+    """Import the server against the fakes; returns the Server, Modal, RealtimeSearchEngine and AnswerCache modules."""
+    import dotenv, groq, cohere
+
+    fake_cohere = BenchmarkFakes.FakeCohere(latency=options.cohere_latency)
+    fake_groq = BenchmarkFakes.FakeGroq(ttft=options.groq_ttft, tokens_per_second=options.token_rate)
+
+    # The modules read keys and build clients at import time, so the fakes go in first.
+    dotenv.dotenv_values = lambda path=None: {"GroqAPIKey": "offline", "COHERE_API_KEY": "offline", "SearchPreconnect": "off"}
+    groq.Groq = lambda *args, **kwargs: fake_groq
+    cohere.Client = lambda *args, **kwargs: fake_cohere
+
+    import Server
+    import Modal
+    import RealtimeSearchEngine
+    import AnswerCache
+
+    # Every turn is answered by the pipeline, not by an earlier session's cached answer.
+    AnswerCache.AnswerCache.threshold = float("inf")
+    return Server, Modal, RealtimeSearchEngine
+
+def StartServer(Server, options):
+    """Run an AssistantServer on a free port in a background thread; returns (server, port)."""
+    started = threading.Event()
+    holder = {}
+
+    async def serve():
+        server = Server.AssistantServer(workers=options.workers, max_queued=options.max_queued)
+        listener = await server.start("127.0.0.1", 0)
+        holder["server"], holder["port"] = server, listener.sockets[0].getsockname()[1]
+        started.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=asyncio.run, args=(serve(),), daemon=True).start()
+    started.wait()
+    return holder["server"], holder["port"]
+
+def Request(connection, method, path, payload=None):
+    body = json.dumps(payload) if payload is not None else None
+    connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read() or b"{}")
+
+def RunSession(port, number, turns):
+    """One simulated user: classify each query, then ask /chat or /realtime in the session.
+
+    Returns (session id, latencies of answered turns, the queries sent in the session, rejected requests).
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    status, created = Request(connection, "POST", "/sessions", {})
+    session = created["session"]
+    latencies, sent, rejected = [], [], 0
+    for turn in range(turns):
+        query = SessionQueries[(number + turn) % len(SessionQueries)]
+        started = time.perf_counter()
+        status, classified = Request(connection, "POST", "/classify", {"query": query})
+        if status != 200:
+            rejected += 1
+            continue
+        first_task = classified["tasks"][0] if classified["tasks"] else "general"
+        kind = "realtime" if first_task.startswith("realtime") else "chat"
+        # The marker lets the isolation check tell each session's turns apart.
+        tagged = f"{query} (user {number})"
+        status, answer = Request(connection, "POST", f"/{kind}", {"session": session, "query": tagged})
+        if status != 200:
+            rejected += 1
+            continue
+        sent.append(tagged)
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+    return session, latencies, sent, rejected
+
+def CheckIsolation(port, results):
+    """Return the sessions whose history holds a turn another session sent, or misses one of their own."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    leaks = []
+    for session, _, sent, _ in results:
+        _, view = Request(connection, "GET", f"/sessions/{session}")
+        asked = [turn["content"] for turn in view["history"] if turn["role"] == "user"]
+        if asked != sent:
+            leaks.append(session)
+    connection.close()
+    return leaks
+
+def Run(options):
+    Server, Modal, RealtimeSearchEngine = SetUp(options)
+    report = []
+    with BenchmarkFakes.BingStubServer(latency=options.search_latency) as stub:
+        RealtimeSearchEngine.SearchProviders[:] = [
+            RealtimeSearchEngine.SearchProvider("bing_stub", stub.url + "/search?q={query}&count=20", RealtimeSearchEngine.parse_bing_html)
+        ]
+        server, port = StartServer(Server, options)
+        for sessions in options.sessions:
+            Modal.DecisionCache.clear()
+            RealtimeSearchEngine.SearchCache.clear()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=sessions) as pool:
+                results = list(pool.map(lambda number: RunSession(port, number, options.turns), range(sessions)))
+            seconds = time.perf_counter() - started
+            latencies = [latency for _, session_latencies, _, _ in results for latency in session_latencies]
+            report.append({
+                "sessions": sessions,
+                "turns": len(latencies),
+                "turns_per_second": len(latencies) / seconds,
+                "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+                "rejected": sum(rejected for _, _, _, rejected in results),
+                "leaks": CheckIsolation(port, results),
+            })
+    return report, server.get_stats()
+
+def ParseArguments(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test of the multi-session server.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="concurrent sessions per run")
+    parser.add_argument("--turns", type=int, default=6, help="turns each session sends")
+    parser.add_argument("--workers", type=int, default=16, help="server worker threads")
+    parser.add_argument("--max-queued", type=int, default=64, help="requests the server admits at once")
+    parser.add_argument("--cohere-latency", type=float, default=0.05, help="seconds per fake Cohere call")
+    parser.add_argument("--groq-ttft", type=float, default=0.05, help="fake Groq time to first token")
+    parser.add_argument("--token-rate", type=float, default=400.0, help="fake Groq tokens per second")
+    parser.add_argument("--search-latency", type=float, default=0.02, help="seconds the stub search server waits")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    options = ParseArguments()
+
+    # Session logs and caches are created under Data/ in a throwaway folder.
+    os.chdir(tempfile.mkdtemp(prefix="nova-loadtest-"))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    report, stats = Run(options)
+    print(f"{'sessions':>8} {'turns':>6} {'turns/s':>8} {'p50 ms':>8} {'rejected':>8} {'leaks':>6}")
+    for row in report:
+        print(f"{row['sessions']:>8} {row['turns']:>6} {row['turns_per_second']:>8.1f} {row['p50_ms']:>8.1f} "
+              f"{row['rejected']:>8} {len(row['leaks']):>6}")
+    print(f"peak admitted requests: {stats['peak_admitted']}, connections: {stats['connections']}")
+    sys.exit(1 if any(row["leaks"] for row in report) else 0)
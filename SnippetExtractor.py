@@ -0,0 +1,141 @@
+from html.parser import HTMLParser # streaming, event-based HTML parser from the standard library
+
+# Result containers we collect, in the order the BeautifulSoup path searches for them.
+ResultSelectors = [
+    ('li', 'b_algo'),
+    ('div', 'b_ans'),
+    ('div', 'b_special'),
+    ('div', 'news-card')
+]
+
+HeadingTags = ('h2', 'h3', 'h4')
+TitleClasses = {'title', 'headline'}
+CaptionTags = ('div', 'p')
+CaptionClasses = {'b_caption', 'b_snippet', 'description'}
+
+# Elements that never have an end tag, so they are never pushed on the stack.
+VoidTags = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
+# Elements whose text is not part of get_text().
+SkippedTextTags = {'script', 'style', 'template'}
+
+class _Capture:
+    """Collects the text of one element and its descendants."""
+    __slots__ = ('parts',)
+
+    def __init__(self):
+        self.parts = []
+
+    def text(self):
+        return ''.join(self.parts).strip()
+
+class _Result:
+    """One result container and the first heading, title-class element and caption inside it."""
+    __slots__ = ('rank', 'order', 'heading', 'title', 'caption')
+
+    def __init__(self, rank, order):
+        self.rank = rank
+        self.order = order
+        self.heading = None
+        self.title = None
+        self.caption = None
+
+class BingSnippetParser(HTMLParser):
+    """Single-pass extractor for Bing result pages.
+
+    Produces the same (title, caption) pairs as the BeautifulSoup path in RealtimeSearchEngine,
+    but without building a tree: result containers are tracked on a tag stack while the page
+    streams through, and text is appended to every capture that is currently open.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._stack = []  # [tag, captures opened here, results opened here]
+        self._open_results = []
+        self._open_captures = []
+        self._results = []
+        self._skip_text = 0
+
+    def handle_starttag(self, tag, attrs):
+        classes = set()
+        for name, value in attrs:
+            if name == 'class' and value:
+                classes.update(value.split())
+
+        opened_captures = []
+        # A new element can be the heading, title or caption of every result it is nested in.
+        for result in self._open_results:
+            if result.heading is None and tag in HeadingTags:
+                result.heading = _Capture()
+                opened_captures.append(result.heading)
+            if result.title is None and classes & TitleClasses:
+                result.title = _Capture()
+                opened_captures.append(result.title)
+            if result.caption is None and tag in CaptionTags and classes & CaptionClasses:
+                result.caption = _Capture()
+                opened_captures.append(result.caption)
+
+        # The element itself may be a result container.
+        opened_results = []
+        for rank, (selector_tag, selector_class) in enumerate(ResultSelectors):
+            if tag == selector_tag and selector_class in classes:
+                opened_results.append(_Result(rank, len(self._results)))
+                self._results.append(opened_results[-1])
+                break
+
+        if tag in VoidTags:
+            return
+
+        self._stack.append((tag, opened_captures, opened_results))
+        self._open_captures.extend(opened_captures)
+        self._open_results.extend(opened_results)
+        if tag in SkippedTextTags:
+            self._skip_text += 1
+
+    def handle_startendtag(self, tag, attrs):
+        # <div class="b_caption"/> still counts as an (empty) element.
+        self.handle_starttag(tag, attrs)
+        if tag not in VoidTags:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        # Like BeautifulSoup, an end tag closes the most recent matching element and is ignored otherwise.
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                break
+        else:
+            return
+
+        while len(self._stack) > index:
+            self._close(self._stack.pop())
+
+    def _close(self, frame):
+        tag, captures, results = frame
+        for capture in captures:
+            self._open_captures.remove(capture)
+        for result in results:
+            self._open_results.remove(result)
+        if tag in SkippedTextTags:
+            self._skip_text -= 1
+
+    def handle_data(self, data):
+        if self._skip_text:
+            return
+        for capture in self._open_captures:
+            capture.parts.append(data)
+
+    def pairs(self):
+        """Return the (title, caption) pairs in selector order, then document order."""
+        pairs = []
+        for result in sorted(self._results, key=lambda r: (r.rank, r.order)):
+            title = result.heading or result.title
+            if title and result.caption:
+                pairs.append((title.text(), result.caption.text()))
+        return pairs
+
+def ExtractBingSnippets(html):
+    """Extract (title, caption) pairs from a Bing results page in one streaming pass"""
+    parser = BingSnippetParser()
+    parser.feed(html)
+    parser.close()
+    return parser.pairs()
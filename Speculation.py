@@ -0,0 +1,113 @@
+import re # cheap realtime heuristic
+import time # overlap between classification and speculative work
+import threading # stats are shared between turns
+import contextvars # speculative work runs under the turn's span
+from concurrent.futures import ThreadPoolExecutor # speculative searches run beside the classifier
+from dotenv import dotenv_values # opt-in settings from the .env file
+from Modal import LocalClassify, LocalConfidenceThreshold, DecisionCache, _normalize # what the classifier will do without asking Cohere
+import RealtimeSearchEngine # searches share in-flight requests and the search cache
+from ModelRouter import Router, Client # the Groq connection to warm
+import Tracing # speculation counters
+
+env_vars = dotenv_values(".env")
+
+# Off unless SpeculativeSearch=on in .env; SpeculativeWarmGroq=on also refreshes the Groq connection.
+SpeculativeSearch = env_vars.get("SpeculativeSearch", "off").lower() in ("1", "on", "true", "yes")
+SpeculativeWarmGroq = env_vars.get("SpeculativeWarmGroq", "off").lower() in ("1", "on", "true", "yes")
+
+# Words that make a question the local classifier is unsure about probably need fresh results.
+LikelyRealtime = re.compile(r"\b(?:today|tonight|yesterday|tomorrow|this (?:week|month|year)|right now|recent(?:ly)?|"
+                            r"who (?:won|is winning|leads)|when (?:is|does|will)|release date|released|ceo of|president of|"
+                            r"prime minister|rank(?:ing)?|forecast|exchange rate|20\d\d)\b", re.IGNORECASE)
+
+# Speculative work gets its own small pool, so it never takes workers from real tasks.
+SpeculationExecutor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speculate")
+
+SpeculationStats = {"turns": 0, "speculated": 0, "hits": 0, "cancelled": 0, "wasted_requests": 0, "missed": 0,
+                    "groq_warmups": 0, "overlap": 0.0}
+_stats_lock = threading.Lock()
+
+def _count(**amounts):
+    with _stats_lock:
+        for field, amount in amounts.items():
+            SpeculationStats[field] += amount
+    for field, amount in amounts.items():
+        if field != "overlap" and amount:
+            Tracing.Count(f"speculation_{field}", amount)
+
+def _submit(function, *args):
+    return SpeculationExecutor.submit(contextvars.copy_context().run, function, *args)
+
+def _search(query):
+    with Tracing.Span("speculate.search"):
+        return RealtimeSearchEngine.GoogleSearchSnippets(query)
+
+class Speculation:
+    """Work started for one query before its classification arrives; resolve() keeps or drops it."""
+
+    def __init__(self, searches, warm_up):
+        self.started = time.perf_counter()
+        self.searches = searches  # search cache key -> Future
+        self.warm_up = warm_up
+
+    def resolve(self, tasks):
+        """Compare with the classified tasks: matching searches are left to finish, the rest are cancelled."""
+        overlap = time.perf_counter() - self.started
+        wanted = {RealtimeSearchEngine.SearchKey(task[len("realtime"):]) for task in tasks if task.startswith("realtime ")}
+        hits = cancelled = wasted = 0
+        for key, future in self.searches.items():
+            if key in wanted:
+                # The real search joins this request, or reads its result from the search cache.
+                hits += 1
+            elif future.cancel():
+                cancelled += 1
+            else:
+                wasted += 1
+        if self.warm_up is not None and not any(task.startswith(("general ", "realtime ", "content ")) for task in tasks):
+            if self.warm_up.cancel():
+                cancelled += 1
+            else:
+                wasted += 1
+        _count(turns=1, hits=hits, cancelled=cancelled, wasted_requests=wasted,
+               missed=len(wanted - set(self.searches)), overlap=overlap if hits else 0.0)
+
+def Speculate(query):
+    """Start the searches a query probably needs while FirstLayerDMM is still classifying it.
+
+    Returns a Speculation to resolve() with the tasks, or None when speculation is off or the
+    classifier will answer without calling Cohere (then there is nothing to overlap).
+    """
+    if not SpeculativeSearch:
+        return None
+    tasks, confidence = LocalClassify(query)
+    if confidence >= LocalConfidenceThreshold or DecisionCache.contains(_normalize(query)):
+        return None
+
+    searches = {}
+    for task in tasks:
+        intent, _, argument = task.partition(" ")
+        if intent not in ("general", "realtime") or not argument:
+            continue
+        if intent == "general" and not LikelyRealtime.search(argument):
+            continue
+        key = RealtimeSearchEngine.SearchKey(argument)
+        if key in searches or RealtimeSearchEngine.SearchCache.contains(key):
+            continue  # a fresh cached result needs no request
+        searches[key] = _submit(_search, argument)
+
+    warm_up = None
+    if SpeculativeWarmGroq and Client is not None:
+        # Fetching the model list reopens the pooled connection the completion will use.
+        warm_up = _submit(Router.catalog.refresh)
+        _count(groq_warmups=1)
+    _count(speculated=len(searches))
+    return Speculation(searches, warm_up)
+
+def GetSpeculationStats():
+    """Return speculation counts with the hit rate (hits per speculative search) and recall (realtime tasks caught)."""
+    with _stats_lock:
+        stats = dict(SpeculationStats)
+    stats["hit_rate"] = stats["hits"] / stats["speculated"] if stats["speculated"] else 0.0
+    caught = stats["hits"] + stats["missed"]
+    stats["recall"] = stats["hits"] / caught if caught else 0.0
+    return stats
@@ -0,0 +1,80 @@
+import sys # command-line vocabulary sizes
+import time # timing
+import random # synthetic vocabulary and typos
+import difflib # the old approach, for comparison
+from SpellCorrector import SymSpellIndex # the symmetric-delete index
+
+# Vocabulary sizes to benchmark (override on the command line: python SpellBenchmark.py 10000 50000).
+VocabularySizes = [10_000, 50_000, 100_000, 500_000]
+
+# Misspelled queries per vocabulary size.
+QueryCount = 2000
+
+Letters = "etaoinshrdlcumwfgypbvkjxqz"
+LetterWeights = [12.7, 9.1, 8.2, 7.5, 7.0, 6.7, 6.3, 6.1, 6.0, 4.3, 4.0, 2.8, 2.8, 2.4, 2.4, 2.2, 2.0, 2.0, 1.9, 1.5, 1.0, 0.8, 0.2, 0.2, 0.1, 0.1]
+
+def SyntheticVocabulary(size, rng):
+    """size distinct pseudo-words (4 to 12 letters) with Zipf-like counts."""
+    words = set()
+    while len(words) < size:
+        length = rng.randint(4, 12)
+        words.add("".join(rng.choices(Letters, LetterWeights, k=length)))
+    return {word: max(1, int(100_000 / rank)) for rank, word in enumerate(sorted(words), start=1)}
+
+def Misspell(word, rng):
+    """Apply one or two random edits (delete, insert, replace or transpose)."""
+    for _ in range(rng.choice((1, 1, 2))):
+        position = rng.randrange(len(word))
+        edit = rng.choice(("delete", "insert", "replace", "transpose"))
+        if edit == "delete" and len(word) > 3:
+            word = word[:position] + word[position + 1:]
+        elif edit == "insert":
+            word = word[:position] + rng.choice(Letters) + word[position:]
+        elif edit == "transpose" and position < len(word) - 1:
+            word = word[:position] + word[position + 1] + word[position] + word[position + 2:]
+        else:
+            word = word[:position] + rng.choice(Letters) + word[position + 1:]
+    return word
+
+def BenchmarkSize(size, rng):
+    counts = SyntheticVocabulary(size, rng)
+    index = SymSpellIndex()
+    started = time.perf_counter()
+    index.add_counts(counts)
+    build_seconds = time.perf_counter() - started
+
+    targets = rng.sample(list(counts), QueryCount)
+    queries = [Misspell(word, rng) for word in targets]
+
+    started = time.perf_counter()
+    results = [index.lookup(query) for query in queries]
+    lookup_seconds = time.perf_counter() - started
+
+    recovered = sum(1 for target, result in zip(targets, results) if result and result[0] == target)
+    return {
+        "size": size,
+        "build_s": build_seconds,
+        "delete_keys": len(index.deletes),
+        "us_per_query": lookup_seconds / QueryCount * 1e6,
+        "recovered": recovered / QueryCount,
+        "queries": queries[:50],
+        "vocabulary": list(counts),
+    }
+
+def DifflibMicroseconds(vocabulary, queries):
+    """Per-query latency of difflib.get_close_matches over the same vocabulary."""
+    started = time.perf_counter()
+    for query in queries:
+        difflib.get_close_matches(query, vocabulary, n=1, cutoff=0.8)
+    return (time.perf_counter() - started) / len(queries) * 1e6
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or VocabularySizes
+    rng = random.Random(42)
+    print(f"{'words':>8} {'build s':>8} {'delete keys':>12} {'us/query':>9} {'recovered':>9} {'difflib us/query':>17}")
+    for size in sizes:
+        result = BenchmarkSize(size, rng)
+        # difflib is only sampled on a few queries; it is linear in the vocabulary size.
+        difflib_us = DifflibMicroseconds(result["vocabulary"], result["queries"][:5 if size > 50_000 else 20])
+        print(f"{size:>8} {result['build_s']:>8.1f} {result['delete_keys']:>12} {result['us_per_query']:>9.1f} "
+              f"{result['recovered']:>9.1%} {difflib_us:>17.0f}")
@@ -0,0 +1,292 @@
+import os # paths of the corpus sources and the saved index
+import re # word extraction
+import json # reading the chat log and cached snippets
+import atexit # save new words when the program exits
+import pickle # fast load of the saved index
+import sqlite3 # reading cached search snippets
+import time # how often the chat log is checked for new turns
+import threading # the index is updated from search threads
+from collections import Counter # word frequencies
+
+# Where the index is saved between runs.
+SpellIndexPath = os.path.join("Data", "SpellIndex.pickle")
+
+# Sources for the word-frequency corpus.
+ChatLogCorpusPath = os.path.join("Data", "ChatLog.jsonl")
+SearchCacheCorpusPath = os.path.join("Data", "SearchCache.db")
+
+# Words the corrector should always know, with a high count so they win ties.
+SeedWords = {"net": 50, "worth": 50, "networth": 5, "wealth": 20, "elon": 20, "musk": 20, "billionaire": 10, "richest": 10}
+
+# Common words that must never be "corrected"; a count of 1 keeps them from being suggested themselves.
+CommonWords = (
+    "what when where which while with would could should about after again also been before being "
+    "does doing from have here into just like many more most much only other over same some such "
+    "tell than that their them then there these they this those through very were will your today "
+    "latest news open close play search find show give make take know want need please thanks"
+).split()
+
+WordPattern = re.compile(r"[a-z]+")
+
+# How many times a word must have been seen before an unknown word is replaced by it, by edit distance.
+MinCorrectionCount = {1: 3, 2: 10}
+
+# Seconds between checks of the chat log for turns written since the index last read it.
+ChatLogCheckInterval = 10.0
+
+def _delete_levels(word, max_distance):
+    """Strings made by deleting characters from word, grouped by how many were deleted (level 0 is word)."""
+    levels = [{word}]
+    seen = {word}
+    for _ in range(max_distance):
+        next_level = set()
+        for item in levels[-1]:
+            if len(item) <= 1:
+                continue
+            for i in range(len(item)):
+                next_level.add(item[:i] + item[i + 1:])
+        next_level -= seen
+        seen |= next_level
+        levels.append(next_level)
+    return levels
+
+def _deletes(word, max_distance):
+    """Every string made by deleting up to max_distance characters from word (word itself included)."""
+    return set().union(*_delete_levels(word, max_distance))
+
+def EditDistance(a, b, limit):
+    """Damerau-Levenshtein (optimal string alignment) distance, or limit + 1 once it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+class SymSpellIndex:
+    """Symmetric-delete spelling index (the SymSpell approach).
+
+    Each dictionary word is stored under every string made by deleting up to max_distance
+    characters from its first prefix_length characters. A lookup generates the same deletes
+    for the misspelled word, so candidates come from a few dict lookups instead of comparing
+    against the whole vocabulary.
+    """
+
+    def __init__(self, max_distance=2, prefix_length=7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.counts = {}
+        self.deletes = {}
+
+    def add_word(self, word, count=1):
+        """Add count occurrences of word, indexing it if it is new."""
+        if word in self.counts:
+            self.counts[word] += count
+            return
+        self.counts[word] = count
+        for key in _deletes(word[:self.prefix_length], self.max_distance):
+            bucket = self.deletes.get(key)
+            if bucket is None:
+                self.deletes[key] = [word]
+            else:
+                bucket.append(word)
+
+    def add_counts(self, counts):
+        for word, count in counts.items():
+            self.add_word(word, count)
+
+    def lookup(self, word, max_distance=None):
+        """Return (best word, distance, count) for word, or None if nothing is close enough.
+
+        The closest word wins; among equally close words the most frequent one wins.
+        """
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if word in self.counts:
+            return word, 0, self.counts[word]
+
+        best = None
+        best_distance = limit + 1
+        best_count = 0
+        seen = set()
+        prefix_length = self.prefix_length
+        # Keys with fewer deletes first: a key with d deletes can only lead to words at distance >= d,
+        # so once a close match is found the deeper (and much larger) buckets are skipped.
+        for deleted, keys in enumerate(_delete_levels(word[:prefix_length], limit)):
+            if deleted > best_distance:
+                break
+            for key in keys:
+                for candidate in self.deletes.get(key, ()):
+                    # Characters deleted on the candidate's side are a lower bound on the distance too.
+                    if min(len(candidate), prefix_length) - len(key) > best_distance or candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    if abs(len(candidate) - len(word)) > best_distance:
+                        continue
+                    distance = EditDistance(word, candidate, min(limit, best_distance))
+                    count = self.counts[candidate]
+                    if distance < best_distance or (distance == best_distance and count > best_count):
+                        best, best_distance, best_count = candidate, distance, count
+        if best is None or best_distance > limit:
+            return None
+        return best, best_distance, best_count
+
+    def __len__(self):
+        return len(self.counts)
+
+def ChatLogWords(lines):
+    """Word counts of the assistant turns among JSONL chat log lines.
+
+    User turns are left out: they are where the typos come from, and a typo in the index
+    counts as a known word and would never be corrected again.
+    """
+    counts = Counter()
+    for line in lines:
+        try:
+            record = json.loads(line)
+            if record["role"] == "assistant":
+                counts.update(WordPattern.findall(record["content"].lower()))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            continue
+    return counts
+
+def CorpusCounts(chat_log_path=ChatLogCorpusPath, search_cache_path=SearchCacheCorpusPath):
+    """Word frequencies from the chat history and previously cached search snippets."""
+    counts = Counter(SeedWords)
+    counts.update(CommonWords)
+
+    if os.path.isfile(chat_log_path):
+        with open(chat_log_path, "r", encoding="utf-8") as f:
+            counts.update(ChatLogWords(f))
+
+    if os.path.isfile(search_cache_path):
+        try:
+            db = sqlite3.connect(search_cache_path)
+            for (value,) in db.execute("SELECT value FROM search"):
+                for snippet in json.loads(value):
+                    counts.update(WordPattern.findall(snippet.lower()))
+            db.close()
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Could not read search cache for the spelling corpus: {e}")
+
+    return counts
+
+class SpellCorrector:
+    """A SymSpell index that is saved to disk and learns words from new search results and chat turns.
+
+    The index is only read and changed under the lock, since search threads add snippets while
+    other threads correct queries.
+    """
+
+    def __init__(self, path=SpellIndexPath, chat_log_path=ChatLogCorpusPath):
+        self.path = path
+        self.chat_log_path = chat_log_path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._checked_at = 0.0
+        self.index = self._load()
+        atexit.register(self.save)
+
+    def _load(self):
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, "rb") as f:
+                    index = pickle.load(f)
+                # Indexes saved before the chat log was followed already hold the log as it was then.
+                if not hasattr(index, "chat_log_offset"):
+                    index.chat_log_offset = self._chat_log_size()
+                return index
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+                print(f"Rebuilding spelling index ({e})")
+
+        # First run (or a broken file): build the index from the corpus and save it.
+        index = SymSpellIndex()
+        index.chat_log_offset = self._chat_log_size()
+        index.add_counts(CorpusCounts(chat_log_path=self.chat_log_path))
+        self._dirty = True
+        return index
+
+    def _chat_log_size(self):
+        try:
+            return os.path.getsize(self.chat_log_path)
+        except OSError:
+            return 0
+
+    def save(self):
+        """Write the index to disk if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "wb") as f:
+                pickle.dump(self.index, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.path)
+            self._dirty = False
+
+    def learn(self, text):
+        """Add the words of text (e.g. new search snippets) to the corpus."""
+        words = Counter(WordPattern.findall(text.lower()))
+        with self._lock:
+            self.index.add_counts(words)
+            self._dirty = True
+
+    def learn_chat_log(self):
+        """Add the words of chat turns written to the log since the index last read it."""
+        with self._lock:
+            start = offset = self.index.chat_log_offset
+        size = self._chat_log_size()
+        if size < offset:
+            offset = 0  # the log was cleared; what it held before stays learned
+        if size == offset:
+            return
+        try:
+            with open(self.chat_log_path, "rb") as f:
+                f.seek(offset)
+                data = f.read(size - offset)
+        except OSError as e:
+            print(f"Could not read {self.chat_log_path} for the spelling corpus: {e}")
+            return
+        # Stop at the last complete line; the writer may be in the middle of the next one.
+        end = data.rfind(b"\n") + 1
+        words = ChatLogWords(data[:end].decode("utf-8", errors="replace").splitlines())
+        with self._lock:
+            if self.index.chat_log_offset != start:
+                return  # another thread read these turns already
+            self.index.add_counts(words)
+            self.index.chat_log_offset = offset + end
+            self._dirty = True
+
+    def correct_word(self, word):
+        """Return the correction for one lowercase word, or the word itself if it looks fine."""
+        if len(word) < 4 or not word.isalpha():
+            return word
+        now = time.monotonic()
+        if now - self._checked_at >= ChatLogCheckInterval:
+            self._checked_at = now
+            self.learn_chat_log()
+        with self._lock:
+            if word in self.index.counts:
+                return word
+            # Short words only get single-edit corrections; there are too many near neighbours.
+            result = self.index.lookup(word, max_distance=1 if len(word) < 6 else 2)
+        # A rare word is as likely to be a neighbour of the typo by chance as the word that was meant.
+        if result and result[2] >= MinCorrectionCount[result[1]]:
+            return result[0]
+        return word
+
+# The corrector used by the realtime search engine.
+Corrector = SpellCorrector()
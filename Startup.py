@@ -0,0 +1,113 @@
+import os # the eager-startup switch
+import time # warm-up durations
+import threading # warm-ups run in the background
+import Tracing # warm-up failures are recorded like any other error
+
+# With NOVA_EAGER_STARTUP=1 every warm-up runs in the importing thread, the way startup worked before
+# warm-ups existed. StartupProfile.py uses it to measure that baseline.
+EagerStartup = os.environ.get("NOVA_EAGER_STARTUP", "").lower() in ("1", "true", "yes")
+
+class WarmUp:
+    """Startup work that runs once on a background thread; result() waits only if it has not finished yet.
+
+    If nothing started it, the first result() call runs it in the calling thread.
+    """
+
+    def __init__(self, name, function):
+        self.name = name
+        self.function = function
+        self.seconds = None
+        self.waited = 0.0  # how long callers were held up by it
+        self._result = None
+        self._error = None
+        self._started = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the work on a daemon thread (does nothing if it has already started)."""
+        if not self._claim():
+            return self
+        if EagerStartup:
+            self._run()
+        else:
+            threading.Thread(target=self._run, name=f"WarmUp-{self.name}", daemon=True).start()
+        return self
+
+    def _claim(self):
+        with self._lock:
+            if self._started:
+                return False
+            self._started = True
+            return True
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            self._result = self.function()
+        except Exception as e:
+            self._error = e
+            Tracing.RecordError(f"warmup_{self.name}", e)
+        finally:
+            self.seconds = time.perf_counter() - started
+            self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """The work's return value, waiting for it if needed; its exception is raised again here."""
+        if self._claim():
+            self._run()
+        elif not self._done.is_set():
+            started = time.perf_counter()
+            self._done.wait(timeout)
+            # Only requests count as held up, not other warm-ups that need this one.
+            if not threading.current_thread().name.startswith("WarmUp-"):
+                self.waited += time.perf_counter() - started
+                Tracing.Count("warmup_waits")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+class LazyClient:
+    """Stands in for an SDK client that is built by a background warm-up.
+
+    Attribute access waits for the warm-up, so callers use it like the client itself. Attributes set on
+    the stand-in stay on it (e.g. a wrapped method), which lets tests and the batch runner patch it.
+    """
+
+    def __init__(self, name, factory):
+        self._warm_up = WarmUps[name] = WarmUp(name, factory)
+
+    def start(self):
+        self._warm_up.start()
+        return self
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self._warm_up.result(), name)
+
+# Every warm-up by name, for GetStartupStats() and WaitForWarmUp().
+WarmUps = {}
+
+def StartWarmUp(name, function):
+    """Register function as a warm-up and start it in the background; returns the WarmUp."""
+    warm_up = WarmUps[name] = WarmUp(name, function)
+    return warm_up.start()
+
+def WaitForWarmUp(timeout=None):
+    """Wait until every started warm-up has finished (errors are left to the callers that need the result)."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for warm_up in list(WarmUps.values()):
+        if warm_up._started:
+            warm_up._done.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+def GetStartupStats():
+    """Seconds each warm-up took, whether it failed, and how long requests waited for it."""
+    return {
+        name: {"seconds": warm_up.seconds, "done": warm_up.done, "failed": warm_up._error is not None, "waited": warm_up.waited}
+        for name, warm_up in WarmUps.items()
+    }
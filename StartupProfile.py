@@ -0,0 +1,125 @@
+import os # temporary working folder and the child's environment
+import sys # the Python that runs the child
+import json # model list served by the stub
+import time # stub latency
+import argparse # command-line options
+import tempfile # isolated folder with a .env file
+import statistics # medians over runs
+import subprocess # every run imports the assistant in a fresh interpreter
+import threading # the stub server runs in the background
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler # local stand-in for the Groq API
+
+# Run in a fresh interpreter: time the import of Main, then the wait until the warm-up is done.
+ProfiledCode = """
+import time
+started = time.perf_counter()
+import Main
+imported = time.perf_counter()
+import Startup
+Startup.WaitForWarmUp()
+ready = time.perf_counter()
+print("NOVA_STARTUP", imported - started, ready - started)
+"""
+
+StubModels = ["llama-3.1-8b-instant", "llama-3.3-70b-versatile", "groq/compound", "groq/compound-mini", "whisper-large-v3"]
+
+class _ProviderStubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        # Each request costs what a round trip to the real API would.
+        time.sleep(self.latency)
+        if not self.path.rstrip("/").endswith("/models"):
+            self.send_error(404)
+            return
+        models = [{"id": model, "object": "model", "created": 0, "owned_by": "stub"} for model in StubModels]
+        data = json.dumps({"object": "list", "data": models}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def ParseImportTimes(stderr):
+    """Return {module: (self_us, cumulative_us, depth)} from the output of python -X importtime."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return times
+
+def ProfileOnce(folder, stub_url, eager=False):
+    """Import the assistant in a fresh interpreter; returns (import seconds, ready seconds, import times).
+
+    With eager=True the warm-ups run in the importing thread (NOVA_EAGER_STARTUP), as before they existed.
+    """
+    environment = dict(os.environ, GROQ_BASE_URL=stub_url, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)),
+                       NOVA_EAGER_STARTUP="1" if eager else "0")
+    child = subprocess.run([sys.executable, "-X", "importtime", "-c", ProfiledCode], cwd=folder, env=environment,
+                           capture_output=True, text=True, timeout=120)
+    for line in child.stdout.splitlines():
+        if line.startswith("NOVA_STARTUP"):
+            _, imported, ready = line.split()
+            return float(imported), float(ready), ParseImportTimes(child.stderr)
+    raise RuntimeError(f"The profiled import failed:\n{child.stderr[-2000:]}")
+
+def Run(options):
+    """Profile the eager baseline and the background startup; returns {"eager": runs, "background": runs}."""
+    handler = type("ProviderStubHandler", (_ProviderStubHandler,), {"latency": options.latency})
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    # The assistant reads its keys from .env in the working folder; the stub accepts any key.
+    folder = tempfile.mkdtemp(prefix="nova-startup-")
+    with open(os.path.join(folder, ".env"), "w", encoding="utf-8") as f:
+        # No search preconnect: it would reach the real provider, and the eager baseline never had one.
+        f.write("GroqAPIKey=stub\nCOHERE_API_KEY=stub\nSearchPreconnect=off\n")
+
+    stub_url = f"http://127.0.0.1:{stub.server_port}"
+    modes = {"eager": True, "background": False} if options.mode == "both" else {options.mode: options.mode == "eager"}
+    # One uncounted run fills Data/ first, so neither mode pays for building the indexes.
+    ProfileOnce(folder, stub_url)
+    runs = {mode: [ProfileOnce(folder, stub_url, eager) for _ in range(options.runs)] for mode, eager in modes.items()}
+    stub.shutdown()
+    return runs
+
+def ParseArguments(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how long the assistant takes to import and to become ready.")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to start per mode")
+    parser.add_argument("--mode", choices=["both", "eager", "background"], default="both",
+                        help="eager: warm-ups run during the import (the baseline); background: as the assistant starts")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds the stub Groq API takes per request")
+    parser.add_argument("--top", type=int, default=12, help="slowest imports to list")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    options = ParseArguments()
+    results = Run(options)
+
+    medians = {}
+    for mode, runs in results.items():
+        imported, ready = medians[mode] = statistics.median(run[0] for run in runs), statistics.median(run[1] for run in runs)
+        print(f"{mode:>10}: import Main {imported * 1000:.0f} ms, ready for the first request {ready * 1000:.0f} ms "
+              f"(median of {len(runs)} runs, {options.latency * 1000:.0f} ms per API round trip)")
+    if len(medians) == 2:
+        (eager_import, eager_ready), (import_, ready) = medians["eager"], medians["background"]
+        print(f"background warm-ups: import {(eager_import - import_) * 1000:.0f} ms sooner, "
+              f"ready {(eager_ready - ready) * 1000:.0f} ms sooner")
+
+    # Slowest imports of the last run, by cumulative time, leaving out modules already counted in a parent.
+    times = results[list(results)[-1]][-1][2]
+    print(f"{'module':<40} {'cumulative ms':>14} {'self ms':>9}")
+    shown = []
+    for name, (self_us, cumulative_us, depth) in sorted(times.items(), key=lambda item: -item[1][1]):
+        if any(name.startswith(parent + ".") for parent in shown) or name in ("Main", "encodings", "site"):
+            continue
+        shown.append(name)
+        print(f"{name:<40} {cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}")
+        if len(shown) >= options.top:
+            break
@@ -0,0 +1,121 @@
+import re # used to find sentence boundaries in streamed text
+import time # used for time-to-first-token and total latency
+import asyncio # used for the async-iterator wrapper
+import threading # protects the latency records
+from collections import deque # keeps the most recent latency records
+
+# A sentence ends at . ! or ? followed by whitespace, or at a line break.
+SentenceBoundary = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Recent latency records per entry point (e.g. "Chatbot", "RealtimeSearchEngine").
+LatencyRecords = {}
+_records_lock = threading.Lock()
+
+def GroqDeltas(completion):
+    """Yield the text deltas of a streamed Groq chat completion."""
+    for chunk in completion:
+        if not chunk.choices:
+            continue
+        content = getattr(chunk.choices[0].delta, "content", None)
+        if content:
+            yield content
+
+def StreamEvents(deltas, started_at, name, on_error=None):
+    """Turn text deltas into stream events and record the call's latency.
+
+    Yields {"type": "delta", "text": ...} for every delta, {"type": "sentence", "text": ...}
+    whenever a sentence is complete, and finally {"type": "done", "text": full_text,
+    "ttft": seconds, "latency": seconds}. started_at is a time.perf_counter() value taken
+    before the request was sent.
+
+    If deltas fail before the first one, the error is raised (the caller can still retry). After
+    that the text already sent cannot be taken back, so the stream ends with its one done event,
+    holding the partial text and "error"; on_error, if given, gets the exception.
+    """
+    first_token_at = None
+    parts = []
+    pending = ""
+    error = None
+
+    try:
+        for delta in deltas:
+            if not delta:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            parts.append(delta)
+            yield {"type": "delta", "text": delta}
+
+            # Emit every complete sentence in the buffered text.
+            pending += delta
+            while True:
+                boundary = SentenceBoundary.search(pending)
+                if not boundary:
+                    break
+                sentence = pending[:boundary.start()].strip()
+                pending = pending[boundary.end():]
+                if sentence:
+                    yield {"type": "sentence", "text": sentence}
+    except Exception as e:
+        if first_token_at is None:
+            raise
+        error = e
+        if on_error is not None:
+            on_error(e)
+
+    if pending.strip():
+        yield {"type": "sentence", "text": pending.strip()}
+
+    finished_at = time.perf_counter()
+    ttft = (first_token_at or finished_at) - started_at
+    latency = finished_at - started_at
+    RecordLatency(name, ttft, latency)
+    done = {"type": "done", "text": "".join(parts), "ttft": ttft, "latency": latency}
+    if error is not None:
+        done["error"] = str(error)
+    yield done
+
+def InterruptedEvent(text, started_at, error):
+    """The done event for a stream that broke after text was sent; the partial text is all there is."""
+    latency = time.perf_counter() - started_at
+    return {"type": "done", "text": text, "ttft": None, "latency": latency, "error": str(error)}
+
+def TextEvents(text, started_at, name, error=None):
+    """Stream events for an answer that is already complete (errors, cached or raw results).
+
+    With error set, text is a message about a failure and the done event carries {"error": error},
+    so callers that keep results (e.g. BatchRunner) can tell it from an answer.
+    """
+    for event in StreamEvents([text] if text else [], started_at, name):
+        if error is not None and event["type"] == "done":
+            event["error"] = error
+        yield event
+
+def RecordLatency(name, ttft, latency, keep=200):
+    """Store one time-to-first-token / total latency measurement."""
+    with _records_lock:
+        LatencyRecords.setdefault(name, deque(maxlen=keep)).append((ttft, latency))
+
+def GetLatencyStats(name):
+    """Return count, average and last time-to-first-token and latency for an entry point."""
+    with _records_lock:
+        records = list(LatencyRecords.get(name, ()))
+    if not records:
+        return {"count": 0}
+    return {
+        "count": len(records),
+        "avg_ttft": sum(r[0] for r in records) / len(records),
+        "avg_latency": sum(r[1] for r in records) / len(records),
+        "last_ttft": records[-1][0],
+        "last_latency": records[-1][1],
+    }
+
+async def AsyncStream(events):
+    """Iterate a blocking event generator from asyncio code without blocking the event loop."""
+    iterator = iter(events)
+    done = object()
+    while True:
+        event = await asyncio.to_thread(next, iterator, done)
+        if event is done:
+            break
+        yield event
@@ -0,0 +1,274 @@
+import io # play audio straight from memory
+import os # cache folder and file sizes
+import time # time-to-first-audio
+import queue # hand-off between the synthesis and playback threads
+import asyncio # edge-tts is an asyncio library
+import hashlib # content-addressed cache keys
+import threading # synthesis and playback run side by side
+from dotenv import dotenv_values # voice and backend settings from the .env file
+from Streaming import SentenceBoundary # same sentence splitting as the LLM streams
+
+env_vars = dotenv_values(".env")
+
+# Voice for edge-tts and which backend to use ("edge" or "fake").
+AssistantVoice = env_vars.get("AssistantVoice", "en-CA-LiamNeural")
+TTSBackendName = env_vars.get("TTSBackend", "edge")
+
+# Content-addressed audio cache for short, frequent phrases ("Opening chrome.", greetings).
+TTSCacheFolder = os.path.join("Data", "TTSCache")
+PhraseCacheMaxChars = 120
+TTSCacheMaxBytes = 50 * 1024 * 1024
+
+# How many synthesized chunks may wait for the player; 1 means chunk N+1 is made while chunk N plays.
+PrefetchChunks = 1
+
+class EdgeTTSBackend:
+    """Microsoft Edge online voices through the edge-tts package (MP3 output)."""
+    name = "edge"
+    extension = "mp3"
+
+    def __init__(self, voice=AssistantVoice, rate="+13%"):
+        self.voice = voice
+        self.rate = rate
+
+    def synthesize(self, text):
+        import edge_tts # imported here so the fake backend works without the package
+
+        async def collect():
+            audio = bytearray()
+            async for chunk in edge_tts.Communicate(text, self.voice, rate=self.rate).stream():
+                if chunk["type"] == "audio":
+                    audio.extend(chunk["data"])
+            return bytes(audio)
+
+        return asyncio.run(collect())
+
+class FakeTTSBackend:
+    """Offline stand-in: waits like a network voice would and returns placeholder audio."""
+    name = "fake"
+    extension = "raw"
+
+    def __init__(self, latency=0.15, seconds_per_char=0.002):
+        self.voice = "fake"
+        self.latency = latency
+        self.seconds_per_char = seconds_per_char
+        self.calls = 0
+
+    def synthesize(self, text):
+        self.calls += 1
+        time.sleep(self.latency + self.seconds_per_char * len(text))
+        return text.encode("utf-8")
+
+class PygamePlayer:
+    """Plays audio through pygame's mixer and returns when playback has finished."""
+
+    def __init__(self):
+        import pygame # imported here so tests can use FakePlayer without it
+        self.pygame = pygame
+        pygame.mixer.init()
+
+    def play(self, audio, extension):
+        music = self.pygame.mixer.music
+        music.load(io.BytesIO(audio), extension)
+        music.play()
+        while music.get_busy():
+            self.pygame.time.Clock().tick(20)
+
+class FakePlayer:
+    """Offline stand-in that 'plays' for about as long as speaking the text would take."""
+
+    def __init__(self, seconds_per_byte=0.004):
+        self.seconds_per_byte = seconds_per_byte
+        self.played = []
+
+    def play(self, audio, extension):
+        self.played.append(audio)
+        time.sleep(self.seconds_per_byte * len(audio))
+
+class PhraseCache:
+    """Audio files named by the hash of backend, voice and text, pruned least recently used first."""
+
+    def __init__(self, folder=TTSCacheFolder, max_bytes=TTSCacheMaxBytes, max_chars=PhraseCacheMaxChars):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+
+    def _path(self, backend, text):
+        key = hashlib.sha256(f"{backend.name}\0{backend.voice}\0{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.folder, f"{key}.{backend.extension}")
+
+    def get(self, backend, text):
+        if len(text) > self.max_chars:
+            return None
+        path = self._path(backend, text)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+        except OSError:
+            return None
+        os.utime(path)  # recently used files are pruned last
+        return audio
+
+    def set(self, backend, text, audio):
+        if len(text) > self.max_chars or not audio:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        path = self._path(backend, text)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(audio)
+        os.replace(temp_path, path)
+        self._prune()
+
+    def _prune(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.folder):
+                path = os.path.join(self.folder, name)
+                try:
+                    entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+                except OSError:
+                    continue
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+def SplitSentences(chunks):
+    """Turn streamed text (plain strings or Streaming events) into whole sentences."""
+    pending = ""
+    for chunk in chunks:
+        if isinstance(chunk, dict):
+            # Stream events already carry whole sentences.
+            if chunk.get("type") == "sentence" and chunk["text"].strip():
+                yield chunk["text"].strip()
+            continue
+        pending += chunk
+        while True:
+            boundary = SentenceBoundary.search(pending)
+            if not boundary:
+                break
+            sentence = pending[:boundary.start()].strip()
+            pending = pending[boundary.end():]
+            if sentence:
+                yield sentence
+    if pending.strip():
+        yield pending.strip()
+
+# Totals over every spoken answer.
+TTSStats = {"answers": 0, "chunks": 0, "cache_hits": 0, "synthesis_time": 0.0, "total_ttfa": 0.0, "last_ttfa": None}
+_stats_lock = threading.Lock()
+
+class SpeechPipeline:
+    """Speaks streamed text sentence by sentence: the next sentence is synthesized while the current one plays."""
+
+    def __init__(self, backend=None, player=None, cache=None, prefetch=PrefetchChunks):
+        self.backend = backend or (FakeTTSBackend() if TTSBackendName == "fake" else EdgeTTSBackend())
+        self._player = player
+        self.cache = cache or PhraseCache()
+        self.prefetch = prefetch
+        self._speaking = threading.Lock()
+
+    @property
+    def player(self):
+        # Created on first use so importing this module never opens the audio device.
+        if self._player is None:
+            self._player = FakePlayer() if self.backend.name == "fake" else PygamePlayer()
+        return self._player
+
+    def _audio_for(self, sentence, report):
+        audio = self.cache.get(self.backend, sentence)
+        if audio is not None:
+            report["cache_hits"] += 1
+            return audio
+        started = time.perf_counter()
+        audio = self.backend.synthesize(sentence)
+        report["synthesis_time"] += time.perf_counter() - started
+        self.cache.set(self.backend, sentence, audio)
+        return audio
+
+    def speak(self, chunks, started_at=None):
+        """Speak streamed text and return a report with time-to-first-audio (seconds from started_at).
+
+        chunks may be plain text pieces or the events of ChatbotStream / RealtimeSearchEngineStream.
+        started_at is a time.perf_counter() value; by default the moment speak() was called.
+        """
+        started_at = time.perf_counter() if started_at is None else started_at
+        report = {"chunks": 0, "cache_hits": 0, "synthesis_time": 0.0, "ttfa": None, "total": None, "error": None}
+        ready = queue.Queue(maxsize=self.prefetch)
+        finished = object()
+        stop = threading.Event()
+
+        def synthesize_all():
+            try:
+                for sentence in SplitSentences(chunks):
+                    if stop.is_set():
+                        break
+                    ready.put(self._audio_for(sentence, report))
+            except Exception as e:
+                report["error"] = f"{type(e).__name__}: {e}"
+                print(f"Text to speech failed: {e}")
+            finally:
+                ready.put(finished)
+
+        with self._speaking:  # one answer at a time on the speakers
+            producer = threading.Thread(target=synthesize_all, name="TTSSynthesis", daemon=True)
+            producer.start()
+            try:
+                while True:
+                    audio = ready.get()
+                    if audio is finished:
+                        break
+                    if report["ttfa"] is None:
+                        report["ttfa"] = time.perf_counter() - started_at
+                    report["chunks"] += 1
+                    self.player.play(audio, self.backend.extension)
+            except Exception as e:
+                report["error"] = f"{type(e).__name__}: {e}"
+                print(f"Audio playback failed: {e}")
+                # Let the synthesis thread finish its current sentence and stop.
+                stop.set()
+                while ready.get() is not finished:
+                    pass
+            producer.join()
+
+        report["total"] = time.perf_counter() - started_at
+        with _stats_lock:
+            TTSStats["answers"] += 1
+            TTSStats["chunks"] += report["chunks"]
+            TTSStats["cache_hits"] += report["cache_hits"]
+            TTSStats["synthesis_time"] += report["synthesis_time"]
+            if report["ttfa"] is not None:
+                TTSStats["total_ttfa"] += report["ttfa"]
+                TTSStats["last_ttfa"] = report["ttfa"]
+        return report
+
+# The pipeline used by TextToSpeech() and SpeakStream().
+Speech = SpeechPipeline()
+
+def SpeakStream(chunks, started_at=None):
+    """Speak text as it streams in (see SpeechPipeline.speak); returns the report."""
+    return Speech.speak(chunks, started_at)
+
+def TextToSpeech(Text):
+    """Speak a complete text; returns the report."""
+    return Speech.speak([Text])
+
+def GetTTSStats():
+    """Return totals and the average time-to-first-audio over spoken answers."""
+    with _stats_lock:
+        stats = dict(TTSStats)
+    stats["avg_ttfa"] = stats["total_ttfa"] / stats["answers"] if stats["answers"] else 0.0
+    return stats
+
+# Main program entry point.
+if __name__ == "__main__":
+    while True:
+        report = TextToSpeech(input("Enter the text: "))
+        print(f"First audio after {report['ttfa'] or 0:.2f}s, {report['chunks']} chunks, {report['cache_hits']} from cache")
@@ -0,0 +1,197 @@
+import os # settings from the environment and the trace folder
+import re # metric name cleanup
+import json # one JSON object per trace line
+import time # span timing
+import logging # rotating trace file
+import itertools # span ids
+import threading # counters are shared between threads
+import contextvars # the current span, per thread and per asyncio task
+import functools # decorator metadata
+from logging.handlers import RotatingFileHandler # size-based rotation of the trace file
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler # Prometheus text endpoint
+
+# Tracing is off unless NOVA_TRACE=1; when off, spans and counters cost one attribute check.
+Enabled = os.environ.get("NOVA_TRACE", "").lower() in ("1", "true", "yes")
+
+# Trace file settings.
+TracePath = os.path.join("Data", "Trace.jsonl")
+TraceMaxBytes = 5 * 1024 * 1024
+TraceBackups = 3
+
+# Port for the Prometheus endpoint (0 = not started by Main).
+MetricsPort = int(os.environ.get("NOVA_METRICS_PORT", "0") or 0)
+
+Counters = {}
+SpanTotals = {}  # span name -> [count, total seconds, errors]
+_lock = threading.Lock()
+_current = contextvars.ContextVar("nova_span", default=None)
+_ids = itertools.count(1)
+_trace_logger = None
+
+def _logger():
+    """The trace file logger, created on first use so nothing is written while tracing is off."""
+    global _trace_logger
+    if _trace_logger is None:
+        folder = os.path.dirname(TracePath)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        logger = logging.getLogger("nova.trace")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = RotatingFileHandler(TracePath, maxBytes=TraceMaxBytes, backupCount=TraceBackups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        _trace_logger = logger
+    return _trace_logger
+
+def Enable(enabled=True):
+    """Turn tracing on or off at runtime."""
+    global Enabled
+    Enabled = enabled
+
+class _Span:
+    """A timed section of work; spans opened inside it become its children."""
+    __slots__ = ("name", "attrs", "span_id", "parent_id", "trace_id", "started", "wall", "_token")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        parent = _current.get()
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self._token = _current.set(self)
+        self.wall = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def set(self, **attrs):
+        """Attach attributes (model, provider, sizes...) to the span."""
+        self.attrs.update(attrs)
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self.started
+        _current.reset(self._token)
+        if exc is not None:
+            self.attrs["error"] = repr(exc)
+        _finish(self.name, self.trace_id, self.span_id, self.parent_id, self.wall, duration, self.attrs)
+        return False
+
+class _NoSpan:
+    """Returned by Span() while tracing is off."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def set(self, **attrs):
+        pass
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+NoSpan = _NoSpan()
+
+def Span(name, **attrs):
+    """Context manager timing one stage: `with Span("search", provider="bing"):`."""
+    if not Enabled:
+        return NoSpan
+    return _Span(name, attrs)
+
+def Traced(name):
+    """Decorator that runs the whole function inside a span."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not Enabled:
+                return function(*args, **kwargs)
+            with _Span(name, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def RecordSpan(name, duration, **attrs):
+    """Record a span that was timed elsewhere (e.g. a streamed LLM answer), as a child of the current span."""
+    if not Enabled:
+        return
+    parent = _current.get()
+    span_id = next(_ids)
+    _finish(name, parent.trace_id if parent else span_id, span_id, parent.span_id if parent else None,
+            time.time() - duration, duration, attrs)
+
+def _finish(name, trace_id, span_id, parent_id, wall, duration, attrs):
+    with _lock:
+        totals = SpanTotals.setdefault(name, [0, 0.0, 0])
+        totals[0] += 1
+        totals[1] += duration
+        if "error" in attrs:
+            totals[2] += 1
+    record = {"span": name, "trace": trace_id, "id": span_id, "parent": parent_id,
+              "start": round(wall, 6), "ms": round(duration * 1000, 3)}
+    if attrs:
+        record["attrs"] = attrs
+    try:
+        _logger().info(json.dumps(record, default=str))
+    except OSError:
+        pass
+
+def Count(name, amount=1):
+    """Add amount to a counter (cache hits, retries, model fallbacks, bytes fetched, prompt tokens...)."""
+    if not Enabled:
+        return
+    with _lock:
+        Counters[name] = Counters.get(name, 0) + amount
+
+def RecordError(where, error):
+    """Count a handled failure and put it in the trace next to the spans around it."""
+    if not Enabled:
+        return
+    Count(f"errors_{where}")
+    RecordSpan(f"error.{where}", 0.0, error=repr(error))
+
+def _metric_name(name):
+    return "nova_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+def MetricsText():
+    """Counters and span timings in the Prometheus text exposition format."""
+    with _lock:
+        counters = dict(Counters)
+        spans = {name: list(totals) for name, totals in SpanTotals.items()}
+
+    lines = []
+    for name, value in sorted(counters.items()):
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    if spans:
+        lines.append("# TYPE nova_span_seconds summary")
+        for name, (count, seconds, errors) in sorted(spans.items()):
+            lines.append(f'nova_span_seconds_count{{span="{name}"}} {count}')
+            lines.append(f'nova_span_seconds_sum{{span="{name}"}} {seconds:.6f}')
+        lines.append("# TYPE nova_span_errors_total counter")
+        for name, (count, seconds, errors) in sorted(spans.items()):
+            lines.append(f'nova_span_errors_total{{span="{name}"}} {errors}')
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = MetricsText().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def StartMetricsServer(port=None, host="127.0.0.1"):
+    """Serve /metrics for Prometheus on a background thread; returns the server."""
+    server = ThreadingHTTPServer((host, MetricsPort if port is None else port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    return server
@@ -0,0 +1,45 @@
+import datetime # expected dates
+from FastAnswer import ExtractFacts, FactType, FastAnswer # the extractive answer path
+
+JacksonSnippets = [
+    "Michael Jackson - Wikipedia\nMichael Joseph Jackson (August 29, 1958 - June 25, 2009) was an American singer. Born August 29, 1958 in Gary, Indiana.",
+    "Michael Jackson biography\nJackson was born on August 29, 1958. He died on June 25, 2009, at his home in Los Angeles.",
+    "Remembering Michael Jackson\nMichael Jackson died June 25, 2009 of cardiac arrest; he was born August 29, 1958.",
+]
+
+MuskSnippets = [
+    "Musk's fortune tops $480 billion as Tesla rallies\nElon Musk's net worth climbed past $480 billion on Wednesday.",
+    "Elon Musk Net Worth - Bloomberg\nThe richest person has a net worth of $451 billion, up $18.2 billion this year.",
+    "Elon Musk in 2012\nBack then Elon Musk was building SpaceX and Tesla.",
+]
+
+def test_death_date_is_not_the_birth_date():
+    assert FastAnswer("when did michael jackson die", JacksonSnippets) == "June 25, 2009, according to 2 of 2 search results."
+
+def test_birth_dates_alone_do_not_answer_a_death_question():
+    birth_only = [JacksonSnippets[0], "Michael Jackson\nThe singer was born on August 29, 1958 in Gary."]
+    assert ExtractFacts("when did michael jackson die", birth_only) is None
+    assert FastAnswer("when did michael jackson die", birth_only) is None
+
+def test_date_question_without_an_event_falls_through():
+    assert FactType("when is the super bowl") == (None, set())
+
+def test_worth_it_is_an_opinion_not_an_amount():
+    snippets = ["iPhone 16 review\nThe iPhone 16 starts at $799 and is it worth it?", "Apple iPhone 16\nPrice: $799 for 128 GB."] * 2
+    assert FactType("is the iphone 16 worth it")[0] is None
+    assert FastAnswer("is the iphone 16 worth it", snippets) is None
+
+def test_year_in_the_question_must_be_in_the_sentence():
+    assert FastAnswer("what was elon musk net worth in 2012", MuskSnippets) is None
+    dated = MuskSnippets + ["Forbes 2012\nIn 2012 Elon Musk had a net worth of $2 billion.",
+                            "Musk's wealth over time\nElon Musk's net worth in 2012 was about $2 billion."]
+    fact_type, value, support, _, _ = ExtractFacts("what was elon musk net worth in 2012", dated)
+    assert (fact_type, value, support) == ("money", 2e9, 2)
+
+def test_agreeing_sources_are_answered():
+    assert FastAnswer("what is networth of elon musk", MuskSnippets) == "About $480 billion, according to 2 of 2 search results."
+
+def test_release_date():
+    snippets = ["Python (programming language)\nPython was first released 20 February 1991.",
+                "History of Python\nGuido van Rossum released Python on February 20, 1991."]
+    assert ExtractFacts("when was python released", snippets)[:3] == ("date", datetime.date(1991, 2, 20), 2)